@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark for the DuckDuckGo result page parsers.
+
+Times the fast extractor and the BeautifulSoup reference parser over every
+saved result page in fixtures/duckduckgo and reports the per-page parse time
+of each. Parity between the two is checked by tests/test_search_parser.py.
+
+Usage: python benchmarks/bench_search_parser.py [--iterations 200]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from standalone_mcp_server import _parse_results_bs4, _parse_results_fast  # noqa: E402
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "duckduckgo"
+
+def time_parser(parser, page: str, iterations: int) -> float:
+    """Return mean milliseconds per parse"""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        parser(page, 50)
+    return (time.perf_counter() - start) * 1000 / iterations
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    pages = sorted(FIXTURES.glob("*.html"))
+    if not pages:
+        sys.exit(f"No fixtures found in {FIXTURES}")
+
+    print(f"{'page':<28} {'results':>7} {'bs4 ms':>9} {'fast ms':>9} {'speedup':>8}")
+    for path in pages:
+        page = path.read_text(encoding="utf-8")
+        results = len(_parse_results_fast(page, 50))
+        bs4_ms = time_parser(_parse_results_bs4, page, max(1, args.iterations // 10))
+        fast_ms = time_parser(_parse_results_fast, page, args.iterations)
+        print(f"{path.name:<28} {results:>7} {bs4_ms:>9.3f} {fast_ms:>9.3f} {bs4_ms / fast_ms:>7.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for DuckDuckGo and the sites fetch_content reads.
+
+Serves the saved result pages in fixtures/duckduckgo from /html (the
+DuckDuckGo HTML endpoint, chosen per query so repeated queries get the same
+page) and any fixture as an article from /page/<name>, after a configurable
+simulated latency. Used by load_test.py; it can also be run on its own and
+targeted with DDG_BASE_URL.
+
+Usage: python benchmarks/fake_upstream.py [--port 8765] [--latency 0.05] [--jitter 0.02]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import os
+import random
+from pathlib import Path
+
+import uvicorn
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import HTMLResponse
+
+FIXTURES = Path(__file__).resolve().parent / "fixtures" / "duckduckgo"
+
+def create_app(latency: float = 0.0, jitter: float = 0.0) -> FastAPI:
+    pages = {path.stem: path.read_text(encoding="utf-8") for path in sorted(FIXTURES.glob("*.html"))}
+    if not pages:
+        raise SystemExit(f"No fixtures found in {FIXTURES}")
+    names = sorted(pages)
+    app = FastAPI()
+
+    async def delay():
+        seconds = latency + random.uniform(-jitter, jitter) if jitter else latency
+        if seconds > 0:
+            await asyncio.sleep(seconds)
+
+    @app.get("/html", response_class=HTMLResponse)
+    async def search(q: str = ""):
+        await delay()
+        digest = int.from_bytes(hashlib.blake2b(q.encode("utf-8"), digest_size=4).digest(), "big")
+        return pages[names[digest % len(names)]]
+
+    @app.get("/page/{name}", response_class=HTMLResponse)
+    async def page(name: str):
+        await delay()
+        if name not in pages:
+            raise HTTPException(status_code=404)
+        return pages[name]
+
+    @app.get("/health")
+    async def health():
+        return {"status": "ok", "pages": names}
+
+    return app
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=float(os.getenv("FAKE_UPSTREAM_LATENCY", "0.05")),
+                        help="Seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Uniform +/- jitter on the latency")
+    args = parser.parse_args()
+
+    uvicorn.run(create_app(args.latency, args.jitter), host=args.host, port=args.port, log_level="warning")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,314 @@
+#!/usr/bin/env python3
+"""
+Load test for the standalone MCP server against a local fake upstream.
+
+Starts benchmarks/fake_upstream.py and standalone_mcp_server.py as
+subprocesses (the server's DuckDuckGo endpoint pointed at the fake), then
+drives each scenario with a fixed number of concurrent closed-loop clients
+and reports throughput, p50/p95/p99 latency, server CPU time per request
+and server memory growth. Results are written as JSON named after the
+current commit so runs can be compared across commits.
+
+Usage: python benchmarks/load_test.py [--concurrency 32] [--requests 500]
+           [--scenarios search,fetch,mcp-search,mcp-fetch] [--latency 0.05]
+           [--env KEY=VALUE ...] [--compare benchmarks/results/<previous>.json]
+"""
+
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).resolve().parent.parent
+BENCHMARKS = ROOT / "benchmarks"
+RESULTS = BENCHMARKS / "results"
+FIXTURE_PAGES = sorted(path.stem for path in (BENCHMARKS / "fixtures" / "duckduckgo").glob("*.html"))
+SCENARIOS = ("search", "fetch", "mcp-search", "mcp-fetch")
+CLOCK_TICKS = os.sysconf("SC_CLK_TCK") if hasattr(os, "sysconf") else 100
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def process_tree(pid: int) -> list:
+    """pid and all of its descendants (parse pool workers included), Linux only"""
+    children = {}
+    for entry in Path("/proc").iterdir():
+        if entry.name.isdigit():
+            try:
+                ppid = int((entry / "stat").read_text().rsplit(")", 1)[1].split()[1])
+            except (OSError, IndexError, ValueError):
+                continue
+            children.setdefault(ppid, []).append(int(entry.name))
+    tree, stack = [], [pid]
+    while stack:
+        current = stack.pop()
+        tree.append(current)
+        stack.extend(children.get(current, []))
+    return tree
+
+def cpu_seconds(pid: int):
+    """User + system CPU of the server process tree, or None where /proc is unavailable"""
+    total = 0
+    try:
+        for member in process_tree(pid):
+            fields = Path(f"/proc/{member}/stat").read_text().rsplit(")", 1)[1].split()
+            total += int(fields[11]) + int(fields[12])
+    except OSError:
+        return None
+    return total / CLOCK_TICKS
+
+def rss_mb(pid: int):
+    """Resident memory of the server process tree in MiB"""
+    total = 0
+    try:
+        for member in process_tree(pid):
+            for line in Path(f"/proc/{member}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+    except OSError:
+        return None
+    return total / 1024
+
+def percentile(ordered: list, fraction: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(fraction * len(ordered))) - 1))]
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True).stdout.strip()
+        return commit + ("-dirty" if dirty else "")
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def make_request(scenario: str, i: int, upstream: str, unique: bool):
+    """(path, json body) for request number i of a scenario"""
+    # Unique requests never hit a cache entry left by an earlier request or scenario
+    tag = f"{scenario}-{i}" if unique else "0"
+    query = f"gdpr compliance requirements {tag}"
+    url = f"{upstream}/page/{FIXTURE_PAGES[i % len(FIXTURE_PAGES)]}?i={tag}"
+    if scenario == "search":
+        return "/search", {"query": query, "max_results": 10}
+    if scenario == "fetch":
+        return "/fetch", {"url": url}
+    name, arguments = ("search", {"query": query}) if scenario == "mcp-search" else ("fetch_content", {"url": url})
+    return "/mcp", {"jsonrpc": "2.0", "id": i, "method": "tools/call",
+                    "params": {"name": name, "arguments": arguments}}
+
+def is_error(response: httpx.Response) -> bool:
+    if response.status_code != 200:
+        return True
+    body = response.json()
+    return isinstance(body, dict) and "error" in body
+
+async def run_scenario(client: httpx.AsyncClient, scenario: str, args, upstream: str, server_pid: int) -> dict:
+    counter = itertools.count()
+
+    async def drive(total: int, latencies: list, errors: list):
+        async def worker():
+            while True:
+                i = next(counter)
+                if i >= total:
+                    return
+                path, body = make_request(scenario, i, upstream, not args.repeat)
+                started = time.perf_counter()
+                try:
+                    failed = is_error(await client.post(path, json=body))
+                except httpx.HTTPError:
+                    failed = True
+                latencies.append(time.perf_counter() - started)
+                if failed:
+                    errors.append(i)
+
+        await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+    await drive(args.warmup, [], [])
+    counter = itertools.count(args.warmup)
+
+    latencies, errors = [], []
+    rss_start, cpu_start = rss_mb(server_pid), cpu_seconds(server_pid)
+    started = time.perf_counter()
+    await drive(args.warmup + args.requests, latencies, errors)
+    elapsed = time.perf_counter() - started
+    rss_end, cpu_end = rss_mb(server_pid), cpu_seconds(server_pid)
+
+    ordered = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "latency_ms": {
+            "mean": round(sum(ordered) / len(ordered) * 1000, 2),
+            "p50": round(percentile(ordered, 0.50) * 1000, 2),
+            "p95": round(percentile(ordered, 0.95) * 1000, 2),
+            "p99": round(percentile(ordered, 0.99) * 1000, 2),
+            "max": round(ordered[-1] * 1000, 2)
+        },
+        "cpu_ms_per_request": (
+            round((cpu_end - cpu_start) * 1000 / len(latencies), 3) if cpu_start is not None else None
+        ),
+        "rss_mb_start": round(rss_start, 1) if rss_start is not None else None,
+        "rss_mb_end": round(rss_end, 1) if rss_end is not None else None,
+        "rss_growth_mb": round(rss_end - rss_start, 1) if rss_start is not None else None
+    }
+
+def server_environment(args, upstream: str, port: int) -> dict:
+    """Server settings for a capacity test: upstream pacing off, nothing persisted"""
+    env = dict(os.environ)
+    env.update({
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "LOG_LEVEL": "WARNING",
+        "DDG_BASE_URL": f"{upstream}/html",
+        "CACHE_STORE_PATH": "",
+        "SEARCH_RATE_LIMIT_PER_MINUTE": "1000000",
+        "SEARCH_RATE_LIMIT_BURST": "1000000",
+        "FETCH_RATE_LIMIT_PER_MINUTE": "1000000",
+        "FETCH_RATE_LIMIT_BURST": "1000000",
+        "FETCH_HOST_RATE_LIMIT_PER_MINUTE": "1000000",
+        "FETCH_HOST_RATE_LIMIT_BURST": "1000000",
+        "FETCH_MAX_CONCURRENCY": str(args.concurrency),
+        "FETCH_DOMAIN_MAX_CONCURRENCY": str(args.concurrency),
+        "PARSE_POOL_MAX_QUEUE": str(args.concurrency * 2)
+    })
+    for item in args.env:
+        key, _, value = item.partition("=")
+        env[key] = value
+    return env
+
+async def wait_ready(url: str, process: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if process.poll() is not None:
+                sys.exit(f"{url} exited with code {process.returncode} before becoming ready")
+            try:
+                if (await client.get(url, timeout=1.0)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    sys.exit(f"{url} did not become ready within {timeout:.0f}s")
+
+def print_comparison(current: dict, previous_path: str):
+    previous = json.loads(Path(previous_path).read_text())
+    print(f"\nCompared with {previous['commit']} ({previous_path}):")
+    print(f"{'scenario':<12} {'rps':>9} {'p50':>9} {'p95':>9} {'p99':>9} {'cpu/req':>9}")
+
+    def change(new, old):
+        if new is None or not old:
+            return "n/a"
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    for name, result in current["scenarios"].items():
+        old = previous["scenarios"].get(name)
+        if old is None:
+            continue
+        print(f"{name:<12} {change(result['throughput_rps'], old['throughput_rps']):>9} "
+              + " ".join(f"{change(result['latency_ms'][p], old['latency_ms'][p]):>9}" for p in ("p50", "p95", "p99"))
+              + f" {change(result['cpu_ms_per_request'], old.get('cpu_ms_per_request')):>9}")
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent clients per scenario")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=50, help="Unmeasured requests run first")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake upstream latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Fake upstream latency jitter in seconds")
+    parser.add_argument("--repeat", action="store_true",
+                        help="Reuse the same query and URL so requests are served from cache")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="Extra server environment, e.g. --env PARSE_POOL_KIND=thread")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<commit>-<time>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare against")
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        sys.exit(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    upstream_port, server_port = free_port(), free_port()
+    upstream = f"http://127.0.0.1:{upstream_port}"
+    server = f"http://127.0.0.1:{server_port}"
+    processes = []
+    try:
+        processes.append(subprocess.Popen([
+            sys.executable, str(BENCHMARKS / "fake_upstream.py"), "--port", str(upstream_port),
+            "--latency", str(args.latency), "--jitter", str(args.jitter)
+        ]))
+        await wait_ready(f"{upstream}/health", processes[0])
+        processes.append(subprocess.Popen(
+            [sys.executable, str(ROOT / "standalone_mcp_server.py")],
+            env=server_environment(args, upstream, server_port), cwd=ROOT
+        ))
+        await wait_ready(f"{server}/health", processes[1])
+
+        report = {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "concurrency": args.concurrency,
+                "requests": args.requests,
+                "warmup": args.warmup,
+                "upstream_latency": args.latency,
+                "upstream_jitter": args.jitter,
+                "repeat": args.repeat,
+                "env": args.env
+            },
+            "scenarios": {}
+        }
+
+        limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+        async with httpx.AsyncClient(base_url=server, limits=limits, timeout=60.0) as client:
+            print(f"{'scenario':<12} {'requests':>8} {'errors':>6} {'rps':>9} {'p50 ms':>9} {'p95 ms':>9} "
+                  f"{'p99 ms':>9} {'cpu ms/req':>10} {'rss +MB':>8}")
+            for scenario in scenarios:
+                result = await run_scenario(client, scenario, args, upstream, processes[1].pid)
+                report["scenarios"][scenario] = result
+                latency = result["latency_ms"]
+                cpu = result["cpu_ms_per_request"]
+                growth = result["rss_growth_mb"]
+                print(f"{scenario:<12} {result['requests']:>8} {result['errors']:>6} {result['throughput_rps']:>9.1f} "
+                      f"{latency['p50']:>9.1f} {latency['p95']:>9.1f} {latency['p99']:>9.1f} "
+                      f"{cpu if cpu is not None else 'n/a':>10} {growth if growth is not None else 'n/a':>8}")
+            report["server_metrics"] = (await client.get("/metrics")).json()
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    output = Path(args.output) if args.output else RESULTS / (
+        f"{report['commit']}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2))
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        print_comparison(report, args.compare)
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -2,12 +2,17 @@ import logging
 import os
 import json
 import asyncio
-from typing import Dict, Any, List, Optional
+import time
+import random
+import itertools
+from collections import deque, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
 from contextlib import asynccontextmanager
 from datetime import datetime
 import hashlib
 
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Body
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field
 import uvicorn
 import httpx
@@ -32,19 +37,10 @@ except Exception as e:
     DAPR_AGENTS_AVAILABLE = False
     logger.warning(f"Dapr-agents not available: {e}")
 
-# Try to import MCP client
-try:
-    from mcp.client.stdio import stdio_client
-    from mcp.client.session import ClientSession
-    MCP_AVAILABLE = True
-    logger.info("MCP client imported successfully")
-except Exception as e:
-    MCP_AVAILABLE = False
-    logger.warning(f"MCP client not available: {e}")
-
 # Try to import Dapr SDK for pub/sub
 try:
-    from dapr.clients import DaprClient
+    from dapr.aio.clients import DaprClient
+    from dapr.aio.clients.grpc.client import StateItem
     from dapr.ext.fastapi import DaprApp
     from cloudevents.http import CloudEvent
     DAPR_SDK_AVAILABLE = True
@@ -61,6 +57,7 @@ class InsightRequest(BaseModel):
     assessment_id: Optional[str] = None
     session_id: Optional[str] = "default"
     max_results: Optional[int] = 10
+    refresh: bool = False  # Skip cached insights and harvest again
 
 class ComplianceInsight(BaseModel):
     category: str
@@ -70,6 +67,13 @@ class ComplianceInsight(BaseModel):
     source: str
     confidence: float
 
+class InsightCacheInfo(BaseModel):
+    status: str  # miss, memory, state_store, coalesced, refresh, disabled
+    degraded: bool = False  # The web search failed; insights are rule-based only
+    age_seconds: float = 0.0
+    stored_at: Optional[str] = None
+    expires_in_seconds: Optional[float] = None
+
 class InsightResponse(BaseModel):
     assessment_id: Optional[str]
     framework: str
@@ -79,6 +83,18 @@ class InsightResponse(BaseModel):
     generated_at: str
     sources_used: List[str] = Field(default_factory=list)
     processing_time_ms: Optional[int] = None
+    cache: Optional[InsightCacheInfo] = None
+
+class BatchInsightRequest(BaseModel):
+    requests: List[InsightRequest]
+    concurrency: Optional[int] = None  # Capped by HARVESTER_BATCH_MAX_CONCURRENCY
+    company_search: bool = False  # Also run one company-specific search per request
+
+class InsightCacheInvalidation(BaseModel):
+    framework: Optional[str] = None  # Omitted fields match everything
+    company_name: Optional[str] = None
+    industry: Optional[str] = None
+    reason: Optional[str] = None
 
 class SearchQuery(BaseModel):
     query: str
@@ -98,6 +114,741 @@ class WorkflowTrigger(BaseModel):
     payload: Dict[str, Any]
     session_id: Optional[str] = "default"
 
+# MCP client for standalone_mcp_server replicas (JSON-RPC over HTTP)
+class MCPError(Exception):
+    """JSON-RPC error returned by an MCP server"""
+
+    def __init__(self, code: int, message: str, data: Any = None):
+        self.code = code
+        self.data = data
+        super().__init__(f"MCP error {code}: {message}")
+
+class MCPToolError(Exception):
+    """A tool call that returned a result flagged isError"""
+
+class MCPUnavailable(Exception):
+    """No MCP server replica could be reached"""
+
+class MCPReplica:
+    """Connection state of one MCP server replica"""
+
+    def __init__(self, url: str):
+        self.url = url
+        self.initialized = False
+        self.in_flight = 0
+        self.consecutive_failures = 0
+        self.retry_at = 0.0
+        self.last_error: Optional[str] = None
+
+    def available(self) -> bool:
+        return self.consecutive_failures == 0 or time.monotonic() >= self.retry_at
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "initialized": self.initialized,
+            "in_flight": self.in_flight,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_in_seconds": round(max(0.0, self.retry_at - time.monotonic()), 3),
+            "last_error": self.last_error
+        }
+
+class MCPTool:
+    """A tool discovered on the MCP servers, callable through the pool"""
+
+    def __init__(self, pool: "MCPClientPool", spec: Dict[str, Any]):
+        self.pool = pool
+        self.name = spec["name"]
+        self.description = spec.get("description", "")
+        self.input_schema = spec.get("inputSchema", {})
+
+    async def execute(self, **arguments) -> str:
+        return await self.pool.call_tool(self.name, arguments)
+
+class MCPClientPool:
+    """Long-lived client for one or more standalone_mcp_server replicas.
+
+    One keep-alive HTTP connection pool is shared by all calls, so concurrent
+    tool calls run in parallel over reused connections instead of paying
+    connection setup each time. Each replica is initialized once and tools are
+    discovered once. Calls go to the least busy available replica; a replica
+    that fails is skipped for an exponentially growing backoff and then
+    re-initialized on its next use. Per-tool call latency is tracked.
+    """
+
+    LATENCY_SAMPLES = 512
+    # Rate limits and upstream circuit breakers are per replica, so another
+    # replica may still have budget or a closed breaker
+    RETRYABLE_CODES = {-32029, -32030}
+
+    def __init__(self):
+        urls = os.getenv("MCP_SERVER_URLS") or os.getenv("MCP_SERVER_URL", "http://localhost:8080/mcp")
+        self.replicas = [MCPReplica(url.strip()) for url in urls.split(",") if url.strip()]
+        self.timeout = float(os.getenv("MCP_CALL_TIMEOUT_SECONDS", "30"))
+        self.backoff_base = float(os.getenv("MCP_RECONNECT_BACKOFF_SECONDS", "0.5"))
+        self.backoff_max = float(os.getenv("MCP_RECONNECT_BACKOFF_MAX_SECONDS", "30"))
+        max_connections = int(os.getenv("MCP_MAX_CONNECTIONS", "20"))
+        headers = {"Authorization": f"Bearer {os.getenv('MCP_API_TOKEN')}"} if os.getenv("MCP_API_TOKEN") else {}
+        self.client = httpx.AsyncClient(
+            timeout=httpx.Timeout(self.timeout, connect=5.0),
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections),
+            headers=headers
+        )
+        self.tools: Dict[str, MCPTool] = {}
+        self.server_info: Dict[str, Any] = {}
+        self._ids = itertools.count(1)
+        self._init_locks: Dict[str, asyncio.Lock] = {}
+        self.latencies: Dict[str, deque] = {}
+        self.calls: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    @property
+    def connected(self) -> bool:
+        return any(replica.initialized and replica.available() for replica in self.replicas)
+
+    async def connect(self):
+        """Initialize every replica and discover tools; unreachable replicas are retried later"""
+        await asyncio.gather(*(self._ensure_initialized(replica) for replica in self.replicas),
+                             return_exceptions=True)
+        if not self.connected:
+            raise MCPUnavailable(f"No MCP server reachable at {', '.join(r.url for r in self.replicas)}")
+
+    async def _post(self, replica: MCPReplica, payload: Any) -> Any:
+        response = await self.client.post(replica.url, json=payload)
+        response.raise_for_status()
+        return response.json() if response.status_code != 204 else None
+
+    async def _ensure_initialized(self, replica: MCPReplica):
+        if replica.initialized:
+            return
+        lock = self._init_locks.setdefault(replica.url, asyncio.Lock())
+        async with lock:
+            if replica.initialized:
+                return
+            try:
+                result = self._result(await self._post(replica, {
+                    "jsonrpc": "2.0", "id": next(self._ids), "method": "initialize",
+                    "params": {
+                        "protocolVersion": "2025-06-18",
+                        "capabilities": {},
+                        "clientInfo": {"name": "harvester-insights-agent", "version": "1.0.0"}
+                    }
+                }))
+                await self._post(replica, {"jsonrpc": "2.0", "method": "notifications/initialized"})
+                if not self.tools:
+                    listing = self._result(await self._post(replica, {
+                        "jsonrpc": "2.0", "id": next(self._ids), "method": "tools/list"
+                    }))
+                    self.tools = {spec["name"]: MCPTool(self, spec) for spec in listing.get("tools", [])}
+                    logger.info(f"Discovered MCP tools: {', '.join(self.tools)}")
+            except (httpx.HTTPError, ValueError, MCPError) as e:
+                self._mark_failed(replica, e)
+                raise
+            replica.initialized = True
+            replica.consecutive_failures = 0
+            self.server_info = result.get("serverInfo", self.server_info)
+            logger.info(f"MCP session initialized with {replica.url}")
+
+    def _mark_failed(self, replica: MCPReplica, error: Exception):
+        replica.initialized = False
+        replica.consecutive_failures += 1
+        replica.last_error = f"{type(error).__name__}: {error}"
+        backoff = min(self.backoff_max, self.backoff_base * 2 ** (replica.consecutive_failures - 1))
+        # Jitter keeps replicas of this agent from reconnecting in lockstep
+        replica.retry_at = time.monotonic() + backoff * random.uniform(0.5, 1.0)
+        logger.warning(f"MCP server {replica.url} failed ({replica.last_error}), retrying in {backoff:.1f}s")
+
+    @staticmethod
+    def _result(message: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" in message:
+            error = message["error"]
+            raise MCPError(error.get("code", -32603), error.get("message", ""), error.get("data"))
+        return message.get("result", {})
+
+    def _candidates(self) -> List[MCPReplica]:
+        available = [replica for replica in self.replicas if replica.available()]
+        if not available:
+            raise MCPUnavailable("All MCP server replicas are backing off after failures")
+        return sorted(available, key=lambda replica: (replica.in_flight, random.random()))
+
+    def _record(self, name: str, elapsed: float, failed: bool):
+        self.calls[name] = self.calls.get(name, 0) + 1
+        if failed:
+            self.errors[name] = self.errors.get(name, 0) + 1
+        self.latencies.setdefault(name, deque(maxlen=self.LATENCY_SAMPLES)).append(elapsed)
+
+    async def call_tool(self, name: str, arguments: Dict[str, Any]) -> str:
+        """Call a tool and return its text content"""
+        started = time.perf_counter()
+        last_error: Optional[Exception] = None
+        try:
+            for replica in self._candidates():
+                try:
+                    await self._ensure_initialized(replica)
+                except (httpx.HTTPError, ValueError, MCPError) as e:
+                    last_error = e
+                    continue
+                replica.in_flight += 1
+                try:
+                    message = await self._post(replica, {
+                        "jsonrpc": "2.0", "id": next(self._ids), "method": "tools/call",
+                        "params": {"name": name, "arguments": arguments}
+                    })
+                    result = self._result(message)
+                except MCPError as e:
+                    if e.code not in self.RETRYABLE_CODES:
+                        raise
+                    last_error = e
+                    continue
+                except (httpx.HTTPError, ValueError) as e:
+                    self._mark_failed(replica, e)
+                    last_error = e
+                    continue
+                finally:
+                    replica.in_flight -= 1
+                replica.consecutive_failures = 0
+                text = "\n".join(item.get("text", "") for item in result.get("content", []) if item.get("type") == "text")
+                if result.get("isError"):
+                    raise MCPToolError(text or f"Tool {name} failed")
+                self._record(name, time.perf_counter() - started, False)
+                return text
+            raise last_error or MCPUnavailable("No MCP server replica available")
+        except Exception:
+            self._record(name, time.perf_counter() - started, True)
+            raise
+
+    async def close(self):
+        await self.client.aclose()
+
+    def health(self) -> Dict[str, str]:
+        """Per-replica state: connected, backing_off after failures, or idle until first use"""
+        states = {}
+        for replica in self.replicas:
+            if not replica.available():
+                states[replica.url] = "backing_off"
+            elif replica.initialized:
+                states[replica.url] = "connected"
+            else:
+                states[replica.url] = "idle"
+        return states
+
+    def stats(self) -> Dict[str, Any]:
+        tools = {}
+        for name, samples in self.latencies.items():
+            ordered = sorted(samples)
+            tools[name] = {
+                "calls": self.calls.get(name, 0),
+                "errors": self.errors.get(name, 0),
+                "latency_ms_p50": round(ordered[len(ordered) // 2] * 1000, 1),
+                "latency_ms_p95": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000, 1),
+                "latency_ms_mean": round(sum(ordered) / len(ordered) * 1000, 1)
+            }
+        return {
+            "connected": self.connected,
+            "server": self.server_info,
+            "tools_discovered": list(self.tools),
+            "replicas": {replica.url: replica.stats() for replica in self.replicas},
+            "tool_calls": tools
+        }
+
+# Background queue for side effects (state saves, event publishing) that do not
+# affect the response
+class PersistenceQueue:
+    """Bounded queue drained by a few worker tasks.
+
+    Producers wait for space when the queue is full (backpressure) for up to
+    put_timeout seconds, after which the job is dropped and counted. Workers
+    take up to batch_size jobs at a time. State writes are grouped per store
+    into one save_bulk_state call, and events per topic into one bulk publish,
+    so sidecar round trips scale with batches rather than records. Events the
+    broker refuses count as failed one by one, not as a failed batch. On
+    shutdown pending jobs are flushed before the Dapr client is closed.
+    """
+
+    def __init__(self):
+        self.max_size = int(os.getenv("HARVESTER_QUEUE_MAX_SIZE", "1000"))
+        self.worker_count = int(os.getenv("HARVESTER_QUEUE_WORKERS", "2"))
+        self.batch_size = int(os.getenv("HARVESTER_QUEUE_BATCH_SIZE", "100"))
+        self.put_timeout = float(os.getenv("HARVESTER_QUEUE_PUT_TIMEOUT_SECONDS", "5"))
+        self.flush_timeout = float(os.getenv("HARVESTER_QUEUE_FLUSH_TIMEOUT_SECONDS", "10"))
+        self.dapr_client = None
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        self.enqueued_at = deque()
+        self.in_progress = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.sidecar_calls = 0
+        self.last_batch_size = 0
+        self.last_lag_seconds = 0.0
+        self.max_lag_seconds = 0.0
+
+    def start(self):
+        """Start the workers (needs a running event loop)"""
+        if self.workers:
+            return
+        if self.dapr_client and not hasattr(self.dapr_client, "publish_events"):
+            logger.warning("Dapr SDK has no bulk publish on the asyncio client (needs dapr>=1.18); "
+                           "events will be published one request at a time")
+        self.queue = asyncio.Queue(maxsize=self.max_size)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(max(1, self.worker_count))]
+
+    async def _put(self, kind: str, target: Any, payload: Any, name: str) -> bool:
+        if self.queue is None:
+            # Not started or already stopped: run inline, but fail the way a worker would
+            try:
+                failed = await self._run(kind, target, [payload])
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Inline {kind} for {name} failed: {e}")
+                return False
+            self.processed += 1 - failed
+            self.failed += failed
+            return not failed
+        enqueued = time.monotonic()
+        self.enqueued_at.append(enqueued)
+        try:
+            await asyncio.wait_for(self.queue.put((kind, target, payload, enqueued)), timeout=self.put_timeout)
+        except (asyncio.CancelledError, asyncio.TimeoutError) as e:
+            # The job never made it into the queue
+            self.enqueued_at.remove(enqueued)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.dropped += 1
+            logger.error(f"Persistence queue full for {self.put_timeout}s, dropped {name}")
+            return False
+        return True
+
+    async def submit(self, name: str, func, *args, **kwargs) -> bool:
+        """Queue func(*args, **kwargs); runs it inline if the queue is not running.
+
+        Returns False if the job was dropped or, when run inline, failed.
+        """
+        return await self._put("call", name, (func, args, kwargs), name)
+
+    async def save_state(self, store_name: str, key: str, value: str,
+                         metadata: Optional[Dict[str, str]] = None) -> bool:
+        """Queue a state write, saved in bulk with others for the same store"""
+        if not self.dapr_client:
+            logger.warning("Dapr client not available for saving state")
+            return False
+        return await self._put("save_state", store_name, (key, value, metadata), f"state {key}")
+
+    async def publish(self, topic: str, data: Dict[str, Any], pubsub_name: str = "messagepubsub") -> bool:
+        """Queue an event, published in bulk with others for the same topic"""
+        if not self.dapr_client:
+            logger.warning("Dapr client not available for publishing events")
+            return False
+        return await self._put("publish", (pubsub_name, topic), json.dumps(data), f"event on {topic}")
+
+    async def _run(self, kind: str, target: Any, payloads: List[Any]) -> int:
+        """Run jobs of one kind for one target; returns how many of them failed
+        when only some did (a failure of all of them raises)"""
+        if kind == "call":
+            for func, args, kwargs in payloads:
+                await func(*args, **kwargs)
+        elif kind == "save_state":
+            # Later writes to a key win, as they would one at a time
+            latest = {key: (value, metadata) for key, value, metadata in payloads}
+            self.sidecar_calls += 1
+            await self.dapr_client.save_bulk_state(
+                store_name=target,
+                states=[StateItem(key=key, value=value, metadata=metadata or {})
+                        for key, (value, metadata) in latest.items()]
+            )
+            logger.info(f"Saved {len(latest)} records to {target}")
+        elif kind == "publish":
+            pubsub_name, topic = target
+            return await self._publish_bulk(pubsub_name, topic, payloads)
+        return 0
+
+    async def _publish_bulk(self, pubsub_name: str, topic: str, events: List[str]) -> int:
+        publish_events = getattr(self.dapr_client, "publish_events", None)
+        if publish_events is None or len(events) == 1:
+            # dapr<1.18 has no bulk publish on the asyncio client
+            self.sidecar_calls += len(events)
+            results = await asyncio.gather(*(self.dapr_client.publish_event(
+                pubsub_name=pubsub_name, topic_name=topic, data=event,
+                data_content_type="application/json"
+            ) for event in events), return_exceptions=True)
+            errors = [str(result) for result in results if isinstance(result, BaseException)]
+        else:
+            self.sidecar_calls += 1
+            response = await publish_events(
+                pubsub_name=pubsub_name, topic_name=topic, data=events,
+                data_content_type="application/json"
+            )
+            errors = [entry.error for entry in response.failed_entries]
+        if len(errors) == len(events):
+            raise RuntimeError(f"All {len(events)} events failed: {errors[0]}")
+        if errors:
+            logger.error(f"{len(errors)} of {len(events)} events to topic {topic} failed: {errors[0]}")
+        logger.info(f"Published {len(events) - len(errors)} events to topic: {topic}")
+        return len(errors)
+
+    async def _worker(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except asyncio.QueueEmpty:
+                    break
+            now = time.monotonic()
+            for *_, enqueued in batch:
+                if self.enqueued_at:
+                    self.enqueued_at.popleft()
+                self.last_lag_seconds = now - enqueued
+                self.max_lag_seconds = max(self.max_lag_seconds, self.last_lag_seconds)
+            self.last_batch_size = len(batch)
+            self.in_progress += len(batch)
+            groups: "OrderedDict[Tuple[str, Any], List[Any]]" = OrderedDict()
+            for kind, target, payload, _ in batch:
+                if kind == "call":
+                    groups[(kind, len(groups))] = [(target, payload)]
+                else:
+                    groups.setdefault((kind, target), []).append(payload)
+            try:
+                for (kind, target), payloads in groups.items():
+                    if kind == "call":
+                        target, payloads = payloads[0][0], [payloads[0][1]]
+                    try:
+                        failed = await self._run(kind, target, payloads)
+                    except Exception as e:
+                        self.failed += len(payloads)
+                        logger.error(f"Background {kind} for {target} failed ({len(payloads)} jobs): {e}")
+                    else:
+                        self.processed += len(payloads) - failed
+                        self.failed += failed
+            finally:
+                self.in_progress -= len(batch)
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def flush_and_stop(self):
+        """Wait for pending jobs (up to flush_timeout), then stop the workers"""
+        if self.queue is None:
+            return
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout=self.flush_timeout)
+            logger.info("Persistence queue flushed")
+        except asyncio.TimeoutError:
+            logger.warning(f"Persistence queue flush timed out with {self.queue.qsize()} jobs pending")
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        self.queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.queue.qsize() if self.queue else 0,
+            "in_progress": self.in_progress,
+            "max_size": self.max_size,
+            "workers": len(self.workers),
+            "batch_size": self.batch_size,
+            "last_batch_size": self.last_batch_size,
+            "oldest_pending_seconds": round(time.monotonic() - self.enqueued_at[0], 3) if self.enqueued_at else 0.0,
+            "last_lag_seconds": round(self.last_lag_seconds, 3),
+            "max_lag_seconds": round(self.max_lag_seconds, 3),
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "sidecar_calls": self.sidecar_calls
+        }
+
+# Cache of harvested insights shared across sessions and replicas
+class InsightCache:
+    """Insights keyed by (framework, company_name, industry).
+
+    A bounded in-process LRU sits in front of a Dapr state store, so a result
+    harvested by one replica is reused by the others. Entries expire after
+    ttl_seconds. An invalidation records a watermark for its scope in the state
+    store, and entries stored before a matching watermark count as stale.
+    Replicas re-read the watermarks every sync_seconds, and save them with the
+    ETag of the read they merged into, so concurrent invalidations on two
+    replicas do not overwrite each other. Watermarks older than the TTL cover
+    only expired entries and are pruned. Both timestamps come from the wall
+    clock of the replica that wrote them, so clocks skewed by more than the
+    time between a harvest and an invalidation can misorder the two; replicas
+    are expected to run NTP-synced clocks. Concurrent misses for
+    the same key share a single harvest, run in a task of its own so a
+    cancelled requester does not fail the others. A harvest whose web search
+    failed is degraded: it is kept in memory only, for degraded_ttl_seconds.
+    """
+
+    INVALIDATION_TOPIC = os.getenv("INSIGHT_CACHE_INVALIDATION_TOPIC", "regulatory-update")
+    WATERMARK_KEY = "insight_invalidations"
+    WATERMARK_SAVE_ATTEMPTS = 5
+
+    def __init__(self, persistence: "PersistenceQueue"):
+        self.ttl_seconds = int(os.getenv("INSIGHT_CACHE_TTL_SECONDS", "3600"))
+        self.degraded_ttl_seconds = int(os.getenv("INSIGHT_CACHE_DEGRADED_TTL_SECONDS", "30"))
+        self.max_entries = int(os.getenv("INSIGHT_CACHE_MAX_ENTRIES", "256"))
+        self.store_name = os.getenv("INSIGHT_CACHE_STORE", "searchresultsstore")
+        self.sync_seconds = float(os.getenv("INSIGHT_CACHE_SYNC_SECONDS", "10"))
+        self.persistence = persistence
+        self.dapr_client = None
+        self.entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.watermarks: Dict[str, float] = {}
+        self.watermarks_synced_at: Optional[float] = None
+        self.inflight: Dict[str, asyncio.Task] = {}
+        self.counts = {"memory_hits": 0, "store_hits": 0, "misses": 0, "coalesced": 0,
+                       "stale": 0, "degraded": 0, "invalidations": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0
+
+    @staticmethod
+    def scope(framework: Optional[str], company_name: Optional[str] = None,
+              industry: Optional[str] = None) -> Tuple[str, str, str]:
+        return tuple(" ".join((value or "").split()).lower() for value in (framework, company_name, industry))
+
+    @staticmethod
+    def key(scope: Tuple[str, str, str]) -> str:
+        return "insight_" + hashlib.sha256("\x1f".join(scope).encode()).hexdigest()[:32]
+
+    def ttl_for(self, entry: Dict[str, Any]) -> int:
+        return self.degraded_ttl_seconds if entry.get("degraded") else self.ttl_seconds
+
+    def _stale(self, entry: Dict[str, Any], now: float) -> bool:
+        if now - entry["stored_at"] >= self.ttl_for(entry):
+            return True
+        # An invalidation with empty fields covers every value of those fields
+        for pattern in itertools.product(*((value, "") for value in entry["scope"])):
+            watermark = self.watermarks.get("\x1f".join(pattern))
+            if watermark is not None and entry["stored_at"] <= watermark:
+                return True
+        return False
+
+    def _prune_watermarks(self):
+        # An entry stored before the horizon has expired whatever the watermarks say
+        horizon = time.time() - max(self.ttl_seconds, self.degraded_ttl_seconds)
+        for pattern in [pattern for pattern, watermark in self.watermarks.items() if watermark < horizon]:
+            del self.watermarks[pattern]
+
+    def _remember(self, key: str, entry: Dict[str, Any]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def _store_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.dapr_client:
+            return None
+        try:
+            state = await self.dapr_client.get_state(store_name=self.store_name, key=key)
+            return json.loads(state.data) if state.data else None
+        except Exception as e:
+            logger.warning(f"Insight cache read from {self.store_name} failed: {e}")
+            return None
+
+    async def _sync_watermarks(self, force: bool = False):
+        if not self.dapr_client:
+            return
+        now = time.monotonic()
+        if not force and self.watermarks_synced_at is not None and now - self.watermarks_synced_at < self.sync_seconds:
+            return
+        self.watermarks_synced_at = now
+        try:
+            await self._read_watermarks()
+        except Exception as e:
+            logger.warning(f"Insight cache read from {self.store_name} failed: {e}")
+
+    async def _read_watermarks(self) -> Optional[str]:
+        """Merge the stored watermarks into ours; returns the ETag they were read with"""
+        state = await self.dapr_client.get_state(store_name=self.store_name, key=self.WATERMARK_KEY)
+        stored = json.loads(state.data) if state.data else {}
+        for pattern, watermark in stored.items():
+            self.watermarks[pattern] = max(watermark, self.watermarks.get(pattern, 0.0))
+        self._prune_watermarks()
+        return state.etag or None
+
+    async def _save_watermarks(self):
+        """Save our watermarks merged with the stored ones.
+
+        A save by another replica between our read and write changes the
+        ETag, so our write is rejected instead of dropping its invalidation;
+        the merge is then redone from a fresh read. Only the save that creates
+        the key has no ETag to send.
+        """
+        for attempt in range(1, self.WATERMARK_SAVE_ATTEMPTS + 1):
+            try:
+                etag = await self._read_watermarks()
+                await self.dapr_client.save_state(
+                    store_name=self.store_name, key=self.WATERMARK_KEY,
+                    value=json.dumps(self.watermarks), etag=etag
+                )
+                return
+            except Exception as e:
+                if attempt == self.WATERMARK_SAVE_ATTEMPTS:
+                    logger.error(f"Error saving insight cache invalidation: {e}")
+                    return
+                logger.info(f"Insight cache invalidation save failed ({e}), retrying")
+                await asyncio.sleep(random.uniform(0, 0.05 * attempt))
+
+    async def get(self, scope: Tuple[str, str, str]) -> Optional[Tuple[Dict[str, Any], str]]:
+        """Return (entry, "memory" | "state_store") for a fresh entry, else None"""
+        await self._sync_watermarks()
+        key = self.key(scope)
+        now = time.time()
+        entry = self.entries.get(key)
+        if entry is not None:
+            if not self._stale(entry, now):
+                self.entries.move_to_end(key)
+                self.counts["memory_hits"] += 1
+                return entry, "memory"
+            del self.entries[key]
+            self.counts["stale"] += 1
+        entry = await self._store_get(key)
+        if entry is not None:
+            if not self._stale(entry, now):
+                self._remember(key, entry)
+                self.counts["store_hits"] += 1
+                return entry, "state_store"
+            self.counts["stale"] += 1
+        return None
+
+    async def put(self, scope: Tuple[str, str, str], response: Dict[str, Any], degraded: bool = False) -> Dict[str, Any]:
+        key = self.key(scope)
+        entry = {"scope": list(scope), "stored_at": time.time(), "response": response, "degraded": degraded}
+        if degraded:
+            # Retry the search soon, and never share the result with other replicas
+            self.counts["degraded"] += 1
+            if self.degraded_ttl_seconds > 0:
+                self._remember(key, entry)
+            else:
+                self.entries.pop(key, None)
+            return entry
+        self._remember(key, entry)
+        if self.dapr_client:
+            await self.persistence.save_state(self.store_name, key, json.dumps(entry),
+                                              {"ttlInSeconds": str(self.ttl_seconds)})
+        return entry
+
+    async def get_or_create(self, scope: Tuple[str, str, str], create, refresh: bool = False) -> Tuple[Dict[str, Any], str]:
+        """Return (entry, provenance) for scope.
+
+        On a miss create() is called and must return (response dict, complete),
+        where complete is False when the harvest had to do without search results.
+        """
+        if not refresh:
+            cached = await self.get(scope)
+            if cached is not None:
+                return cached
+        key = self.key(scope)
+        task = self.inflight.get(key)
+        if task is not None:
+            self.counts["coalesced"] += 1
+            return await asyncio.shield(task), "coalesced"
+        self.counts["misses"] += 1
+        task = asyncio.create_task(self._create(scope, key, create))
+        # Mark a failure nobody waited for as retrieved
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self.inflight[key] = task
+        return await asyncio.shield(task), "refresh" if refresh else "miss"
+
+    async def _create(self, scope: Tuple[str, str, str], key: str, create) -> Dict[str, Any]:
+        try:
+            response, complete = await create()
+            return await self.put(scope, response, degraded=not complete)
+        finally:
+            del self.inflight[key]
+
+    async def invalidate(self, framework: Optional[str] = None, company_name: Optional[str] = None,
+                         industry: Optional[str] = None, invalidated_at: Optional[float] = None) -> int:
+        """Invalidate entries in a scope; returns the number of local entries dropped"""
+        scope = self.scope(framework, company_name, industry)
+        pattern = "\x1f".join(scope)
+        invalidated_at = invalidated_at or time.time()
+        self.watermarks[pattern] = max(invalidated_at, self.watermarks.get(pattern, 0.0))
+        self._prune_watermarks()
+        matching = [key for key, entry in self.entries.items()
+                    if all(not wanted or wanted == value for wanted, value in zip(scope, entry["scope"]))]
+        for key in matching:
+            del self.entries[key]
+        self.counts["invalidations"] += 1
+        if self.dapr_client:
+            await self._save_watermarks()
+        logger.info(f"Invalidated insight cache scope {scope} ({len(matching)} local entries)")
+        return len(matching)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counts["memory_hits"] + self.counts["store_hits"] + self.counts["misses"] + self.counts["coalesced"]
+        hits = lookups - self.counts["misses"]
+        return {
+            "enabled": self.enabled,
+            "entries": len(self.entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "degraded_ttl_seconds": self.degraded_ttl_seconds,
+            "store": self.store_name if self.dapr_client else None,
+            "inflight": len(self.inflight),
+            "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            **self.counts
+        }
+
+# Research shared by the companies of one batch
+class SharedResearch:
+    """Framework- and industry-level search results computed once per batch.
+
+    The first request for a (framework, industry) pair starts the search and
+    later ones wait on the same task. A failed search is forgotten so the next
+    company retries it. With company_search, each request also gets its own
+    company-specific search, appended to the shared results.
+    """
+
+    def __init__(self, agent: "EnhancedHarvesterAgent", requests: List[InsightRequest], company_search: bool = False):
+        self.agent = agent
+        self.company_search = company_search
+        self.tasks: Dict[Tuple[str, str, str], asyncio.Task] = {}
+        self.max_results: Dict[Tuple[str, str, str], int] = {}
+        for request in requests:
+            key = InsightCache.scope(request.framework, None, request.industry)
+            self.max_results[key] = max(self.max_results.get(key, 0), request.max_results or 10)
+        self.searches = 0
+        self.reused = 0
+
+    async def _search(self, request: InsightRequest, max_results: int) -> Dict[str, Any]:
+        query = f"{request.framework} compliance requirements"
+        if request.industry:
+            query += f" {request.industry} industry"
+        self.searches += 1
+        result = await self.agent.search_web(query, max_results)
+        if result.get("success"):
+            await self.agent.save_search_results(query, str(result.get("results", "")), request.session_id or "default")
+        return result
+
+    async def __call__(self, request: InsightRequest) -> Dict[str, Any]:
+        key = InsightCache.scope(request.framework, None, request.industry)
+        task = self.tasks.get(key)
+        if task is None:
+            task = asyncio.create_task(self._search(request, self.max_results.get(key, request.max_results or 10)))
+            self.tasks[key] = task
+        else:
+            self.reused += 1
+        shared = await asyncio.shield(task)
+        if not shared.get("success") and self.tasks.get(key) is task:
+            del self.tasks[key]
+        if not self.company_search:
+            return shared
+        company = await self.agent.search_web(
+            f"{request.framework} compliance {request.company_name}", request.max_results or 10
+        )
+        return {
+            "results": f"{shared.get('results', '')}\n\n{company.get('results', '')}",
+            "source": shared.get("source") if shared.get("success") else company.get("source"),
+            "success": shared.get("success", False) or company.get("success", False)
+        }
+
+    def close(self):
+        for task in self.tasks.values():
+            task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"searches": self.searches, "reused": self.reused}
+
 # Enhanced Harvester Agent with MCP and Pub/Sub integration
 class EnhancedHarvesterAgent:
     def __init__(self):
@@ -107,6 +858,8 @@ class EnhancedHarvesterAgent:
         self.mcp_client = None
         self.mcp_tools = []
         self.dapr_client = None
+        self.persistence = PersistenceQueue()
+        self.insight_cache = InsightCache(self.persistence)
         self.initialized = False
         
     async def initialize(self):
@@ -148,16 +901,19 @@ class EnhancedHarvesterAgent:
                     tools=[]  # Will be populated with MCP tools
                 )
                 
-                # Initialize MCP client
-                await self.initialize_mcp_client()
-                
                 logger.info("Dapr Agent initialized successfully")
             
+            # Connect to the MCP servers for web search
+            await self.initialize_mcp_client()
+            
             # Initialize Dapr SDK client for pub/sub
             if DAPR_SDK_AVAILABLE:
                 self.dapr_client = DaprClient()
+                self.insight_cache.dapr_client = self.dapr_client
+                self.persistence.dapr_client = self.dapr_client
                 logger.info("Dapr SDK client initialized")
-                
+            
+            self.persistence.start()
             self.initialized = True
             
         except Exception as e:
@@ -165,55 +921,29 @@ class EnhancedHarvesterAgent:
             raise
     
     async def initialize_mcp_client(self):
-        """Initialize MCP client for web search tools"""
+        """Open the pooled MCP client and discover the servers' tools"""
+        self.mcp_client = MCPClientPool()
         try:
-            if not MCP_AVAILABLE:
-                logger.warning("MCP not available, skipping MCP client initialization")
-                return
-                
-            # For now, we'll implement a basic MCP client placeholder
-            # In production, this would connect to the actual MCP server
-            logger.info("MCP client initialization placeholder - would connect to MCP server")
-            
-            # Simulate MCP tools availability
-            self.mcp_tools = [
-                type('MockTool', (), {
-                    'name': 'duckduckgo_search',
-                    'description': 'Search the web using DuckDuckGo',
-                    'execute': self.mock_web_search
-                })()
-            ]
-            
-            if self.agent and hasattr(self.agent, 'tools'):
-                # Add mock tools to agent (in production, these would be real MCP tools)
-                pass
-            
-            logger.info(f"MCP client initialized with {len(self.mcp_tools)} mock tools")
-            
+            await self.mcp_client.connect()
+            self.mcp_tools = list(self.mcp_client.tools.values())
+            logger.info(f"MCP client initialized with {len(self.mcp_tools)} tools")
         except Exception as e:
-            logger.warning(f"MCP client initialization failed: {e}")
-            self.mcp_client = None
-    
-    async def mock_web_search(self, query: str, max_results: int = 10) -> str:
-        """Mock web search for testing purposes"""
-        return f"Mock search results for: {query} (max_results: {max_results})"
+            # Keep the pool: unreachable replicas are retried with backoff on first use
+            logger.warning(f"MCP servers not reachable yet: {e}")
     
     async def search_web(self, query: str, max_results: int = 10) -> Dict[str, Any]:
-        """Perform web search using MCP tools or fallback"""
+        """Perform web search through the MCP servers"""
         try:
-            if self.mcp_tools:
-                # Use MCP tools for web search
-                search_tool = next((tool for tool in self.mcp_tools if "search" in tool.name.lower()), None)
-                if search_tool:
-                    result = await search_tool.execute(query, max_results)
-                    return {
-                        "results": result,
-                        "source": "MCP_DuckDuckGo",
-                        "success": True
-                    }
-            
-            # Fallback to direct HTTP search (if available)
-            return await self.fallback_web_search(query, max_results)
+            if not self.mcp_client:
+                raise MCPUnavailable("MCP client not initialized")
+            result = await self.mcp_client.call_tool("search", {"query": query, "max_results": max_results})
+            if not self.mcp_tools:
+                self.mcp_tools = list(self.mcp_client.tools.values())
+            return {
+                "results": result,
+                "source": "MCP_DuckDuckGo",
+                "success": True
+            }
             
         except Exception as e:
             logger.error(f"Web search failed: {e}")
@@ -223,27 +953,8 @@ class EnhancedHarvesterAgent:
                 "success": False
             }
     
-    async def fallback_web_search(self, query: str, max_results: int = 10) -> Dict[str, Any]:
-        """Fallback web search implementation"""
-        try:
-            # This would integrate with DuckDuckGo API or other search services
-            # For now, return a structured response
-            return {
-                "results": f"Fallback search results for: {query}",
-                "source": "Fallback_Search",
-                "success": True,
-                "note": "This is a fallback implementation. Configure MCP server for full functionality."
-            }
-        except Exception as e:
-            logger.error(f"Fallback search failed: {e}")
-            return {
-                "results": f"All search methods failed: {str(e)}",
-                "source": "Error",
-                "success": False
-            }
-    
     async def save_search_results(self, query: str, response: str, session_id: str = "default"):
-        """Save search results to Dapr state store"""
+        """Queue search results for a bulk save to the Dapr state store"""
         try:
             if not self.dapr_client:
                 logger.warning("Dapr client not available for saving results")
@@ -264,15 +975,9 @@ class EnhancedHarvesterAgent:
                 }
             }
             
-            # Save to state store
+            # Save to state store in the background
             key = f"search_{hashlib.md5(query.encode()).hexdigest()}_{int(datetime.now().timestamp())}"
-            await self.dapr_client.save_state(
-                store_name="searchresultsstore",
-                key=key,
-                value=json.dumps(result_record)
-            )
-            
-            logger.info(f"Saved search results for query: {query[:50]}...")
+            await self.persistence.save_state("searchresultsstore", key, json.dumps(result_record))
             
         except Exception as e:
             logger.error(f"Error saving search results: {e}")
@@ -296,8 +1001,51 @@ class EnhancedHarvesterAgent:
         except Exception as e:
             logger.error(f"Error publishing event: {e}")
     
-    async def process_compliance_query(self, request: InsightRequest) -> InsightResponse:
-        """Process compliance insight request"""
+    async def process_compliance_query(self, request: InsightRequest, research=None) -> InsightResponse:
+        """Process compliance insight request, reusing cached insights for the same scope"""
+        start_time = datetime.now()
+        cache = self.insight_cache
+        if cache.enabled:
+            scope = cache.scope(request.framework, request.company_name, request.industry)
+            entry, status = await cache.get_or_create(
+                scope, lambda: self.harvest_insights(request, research), refresh=request.refresh
+            )
+            age = max(0.0, time.time() - entry["stored_at"])
+            response = InsightResponse(**{
+                **entry["response"],
+                "assessment_id": request.assessment_id,
+                "cache": InsightCacheInfo(
+                    status=status,
+                    degraded=entry.get("degraded", False),
+                    age_seconds=round(age, 3),
+                    stored_at=datetime.fromtimestamp(entry["stored_at"]).isoformat(),
+                    expires_in_seconds=round(max(0.0, cache.ttl_for(entry) - age), 3)
+                )
+            })
+            if status not in ("miss", "refresh"):
+                response.processing_time_ms = int((datetime.now() - start_time).total_seconds() * 1000)
+        else:
+            fields, complete = await self.harvest_insights(request, research)
+            response = InsightResponse(**fields, cache=InsightCacheInfo(status="disabled", degraded=not complete))
+        
+        await self.persistence.publish("harvester-complete", {
+            "assessment_id": request.assessment_id,
+            "framework": request.framework,
+            "company_name": request.company_name,
+            "insights_count": len(response.insights),
+            "processing_time_ms": response.processing_time_ms,
+            "cache_status": response.cache.status
+        })
+        return response
+    
+    async def harvest_insights(self, request: InsightRequest, research=None) -> Tuple[Dict[str, Any], bool]:
+        """Search and analyze from scratch.
+
+        Returns the response fields shared by every requester, and whether the
+        web search succeeded. research, when given, is an async callable
+        returning the search result for the request (see SharedResearch), used
+        instead of a fresh search.
+        """
         start_time = datetime.now()
         
         try:
@@ -307,7 +1055,10 @@ class EnhancedHarvesterAgent:
                 search_query += f" {request.industry} industry"
             
             # Perform web search
-            search_result = await self.search_web(search_query, request.max_results or 10)
+            if research is not None:
+                search_result = await research(request)
+            else:
+                search_result = await self.search_web(search_query, request.max_results or 10)
             
             # Process with AI agent if available
             if self.agent and DAPR_AGENTS_AVAILABLE:
@@ -346,18 +1097,9 @@ class EnhancedHarvesterAgent:
             # Calculate processing time
             processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
             
-            # Save results
+            # Save results in the background; it does not affect the response
             await self.save_search_results(search_query, response_content, request.session_id or "default")
             
-            # Publish completion event
-            await self.publish_event("harvester-complete", {
-                "assessment_id": request.assessment_id,
-                "framework": request.framework,
-                "company_name": request.company_name,
-                "insights_count": len(insights),
-                "processing_time_ms": processing_time
-            })
-            
             return InsightResponse(
                 assessment_id=request.assessment_id,
                 framework=request.framework,
@@ -367,7 +1109,7 @@ class EnhancedHarvesterAgent:
                 generated_at=datetime.now().isoformat(),
                 sources_used=[search_result.get('source', 'Unknown')],
                 processing_time_ms=processing_time
-            )
+            ).model_dump(exclude={"cache"}), bool(search_result.get("success"))
             
         except Exception as e:
             logger.error(f"Error processing compliance query: {e}")
@@ -529,12 +1271,15 @@ class EnhancedHarvesterAgent:
     async def shutdown(self):
         """Graceful shutdown"""
         try:
+            # Pending saves and events still need the Dapr client
+            await self.persistence.flush_and_stop()
+            
             if self.mcp_client:
                 await self.mcp_client.close()
                 logger.info("MCP client connection closed")
             
             if self.dapr_client:
-                self.dapr_client.close()
+                await self.dapr_client.close()
                 logger.info("Dapr client connection closed")
                 
         except Exception as e:
@@ -578,13 +1323,14 @@ if DAPR_SDK_AVAILABLE:
 @app.get("/health")
 async def health_check():
     """Health check endpoint."""
+    mcp_client = harvester_agent.mcp_client if harvester_agent else None
     return {
         "status": "healthy",
         "service": "harvester-insights-agent",
         "dapr_agents_available": DAPR_AGENTS_AVAILABLE,
         "dapr_sdk_available": DAPR_SDK_AVAILABLE,
-        "mcp_available": MCP_AVAILABLE,
-        "mcp_connected": harvester_agent.mcp_client is not None if harvester_agent else False,
+        "mcp_connected": mcp_client.connected if mcp_client else False,
+        "mcp_replicas": mcp_client.health() if mcp_client else {},
         "agent_initialized": harvester_agent is not None and harvester_agent.initialized
     }
 
@@ -630,6 +1376,61 @@ async def harvest_compliance_insights(request: InsightRequest):
         logger.error(f"Error harvesting insights: {e}")
         raise HTTPException(status_code=500, detail=f"Insight harvesting failed: {str(e)}")
 
+# Batch compliance insights endpoint
+@app.post("/harvest-insights/batch")
+async def harvest_compliance_insights_batch(request: BatchInsightRequest):
+    """Harvest insights for many companies, streaming one NDJSON line per company as it completes."""
+    
+    if not harvester_agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    max_requests = int(os.getenv("HARVESTER_BATCH_MAX_REQUESTS", "1000"))
+    if len(request.requests) > max_requests:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_requests} requests")
+    max_concurrency = int(os.getenv("HARVESTER_BATCH_MAX_CONCURRENCY", "8"))
+    concurrency = max(1, min(request.concurrency or max_concurrency, max_concurrency))
+    
+    logger.info(f"Harvesting insights for a batch of {len(request.requests)} companies (concurrency {concurrency})")
+    research = SharedResearch(harvester_agent, request.requests, request.company_search)
+    semaphore = asyncio.Semaphore(concurrency)
+    
+    async def harvest_one(index: int, item: InsightRequest) -> Dict[str, Any]:
+        async with semaphore:
+            line = {"index": index, "framework": item.framework, "company_name": item.company_name}
+            try:
+                result = await harvester_agent.process_compliance_query(item, research)
+                status = "degraded" if result.cache and result.cache.degraded else "ok"
+                return {**line, "status": status, "result": result.model_dump()}
+            except Exception as e:
+                detail = e.detail if isinstance(e, HTTPException) else str(e)
+                logger.error(f"Batch harvest failed for {item.company_name}: {detail}")
+                return {**line, "status": "error", "error": detail}
+    
+    async def stream():
+        start_time = datetime.now()
+        tasks = [asyncio.create_task(harvest_one(index, item)) for index, item in enumerate(request.requests)]
+        counts = {"ok": 0, "degraded": 0, "error": 0}
+        try:
+            for completed in asyncio.as_completed(tasks):
+                line = await completed
+                counts[line["status"]] += 1
+                yield json.dumps(line) + "\n"
+            yield json.dumps({"summary": {
+                "total": len(tasks),
+                "succeeded": counts["ok"],
+                "degraded": counts["degraded"],
+                "failed": counts["error"],
+                "shared_research": research.stats(),
+                "processing_time_ms": int((datetime.now() - start_time).total_seconds() * 1000)
+            }}) + "\n"
+        finally:
+            # The client may disconnect mid-stream; stop the remaining work
+            for task in tasks:
+                task.cancel()
+            research.close()
+    
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
 # Web search endpoint
 @app.post("/search", response_model=SearchResponse)
 async def search_web_endpoint(request: SearchQuery):
@@ -647,7 +1448,7 @@ async def search_web_endpoint(request: SearchQuery):
         # Calculate processing time
         processing_time = int((datetime.now() - start_time).total_seconds() * 1000)
         
-        # Save results
+        # Save results in the background
         response_content = str(search_result.get('results', ''))
         await harvester_agent.save_search_results(request.query, response_content, request.session_id or "default")
         
@@ -664,6 +1465,30 @@ async def search_web_endpoint(request: SearchQuery):
         logger.error(f"Error in web search: {e}")
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+# Insight cache invalidation endpoint
+@app.post("/insights/cache/invalidate")
+async def invalidate_insight_cache(request: InsightCacheInvalidation):
+    """Invalidate cached insights and announce it on the regulatory update topic."""
+    
+    if not harvester_agent:
+        raise HTTPException(status_code=503, detail="Agent not initialized")
+    
+    invalidated_at = time.time()
+    removed = await harvester_agent.insight_cache.invalidate(
+        request.framework, request.company_name, request.industry, invalidated_at
+    )
+    await harvester_agent.publish_event(InsightCache.INVALIDATION_TOPIC, {
+        **request.model_dump(),
+        "invalidated_at": invalidated_at,
+        "source": "harvester-agent"
+    })
+    return {
+        "status": "invalidated",
+        "scope": harvester_agent.insight_cache.scope(request.framework, request.company_name, request.industry),
+        "local_entries_removed": removed,
+        "timestamp": datetime.fromtimestamp(invalidated_at).isoformat()
+    }
+
 # Workflow trigger endpoint
 @app.post("/trigger-workflow")
 async def trigger_workflow(request: WorkflowTrigger):
@@ -708,6 +1533,24 @@ if DAPR_SDK_AVAILABLE:
         except Exception as e:
             logger.error(f"Error handling harvest request: {e}")
     
+    @dapr_app.subscribe(pubsub="messagepubsub", topic=InsightCache.INVALIDATION_TOPIC)
+    async def handle_regulatory_update(event: Dict[str, Any] = Body(...)) -> None:
+        """Drop cached insights that new regulatory information makes stale."""
+        try:
+            data = event.get("data", event)
+            if isinstance(data, str):
+                data = json.loads(data)
+            logger.info(f"Received regulatory update: {data}")
+            
+            if harvester_agent:
+                await harvester_agent.insight_cache.invalidate(
+                    data.get("framework"), data.get("company_name"), data.get("industry"),
+                    data.get("invalidated_at")
+                )
+            
+        except Exception as e:
+            logger.error(f"Error handling regulatory update: {e}")
+    
     @dapr_app.subscribe(pubsub="messagepubsub", topic="compliance-query")
     def handle_compliance_query(event_data) -> None:
         """Handle compliance query from pub/sub."""
@@ -780,10 +1623,13 @@ async def get_metrics():
             "service_invocation": DAPR_SDK_AVAILABLE
         },
         "capabilities": {
-            "web_search": harvester_agent.mcp_client is not None,
+            "web_search": harvester_agent.mcp_client.connected if harvester_agent.mcp_client else False,
             "ai_analysis": harvester_agent.agent is not None,
             "event_publishing": harvester_agent.dapr_client is not None
-        }
+        },
+        "persistence_queue": harvester_agent.persistence.stats(),
+        "insight_cache": harvester_agent.insight_cache.stats(),
+        "mcp_client": harvester_agent.mcp_client.stats() if harvester_agent.mcp_client else None
     }
 
 if __name__ == "__main__":
@@ -5,18 +5,40 @@ No Docker-in-Docker dependency - pure Python implementation
 """
 
 import asyncio
+import base64
 import json
+import socket
+import ipaddress
 import httpx
+import httpcore
 from bs4 import BeautifulSoup
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Union
 from fastapi import FastAPI, HTTPException, WebSocket, WebSocketDisconnect
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 import logging
 import urllib.parse
 import re
-from datetime import datetime, timedelta
+import codecs
+from html.parser import HTMLParser
+import html
+import time
+import fcntl
+import mmap
+import struct
+import hashlib
+import tempfile
+import sqlite3
+import zlib
+import threading
+import multiprocessing
+import signal
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, contextmanager
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
 import os
 
 # Configure logging
@@ -24,178 +46,2570 @@ log_level = os.getenv("LOG_LEVEL", "INFO").upper()
 logging.basicConfig(level=getattr(logging, log_level))
 logger = logging.getLogger(__name__)
 
+# Redis is only needed for the cluster-wide rate limit backend
+try:
+    import redis.asyncio as redis_asyncio
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+# HTTP/2 needs the optional h2 package
+try:
+    import h2  # noqa: F401
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+# Shared upstream HTTP client configuration
+HTTP2_ENABLED = os.getenv("HTTP2_ENABLED", "true").lower() == "true" and HTTP2_AVAILABLE
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("HTTP_MAX_KEEPALIVE_CONNECTIONS", "40"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_WRITE_TIMEOUT = float(os.getenv("HTTP_WRITE_TIMEOUT", "10"))
+HTTP_POOL_TIMEOUT = float(os.getenv("HTTP_POOL_TIMEOUT", "5"))
+DNS_CACHE_TTL_SECONDS = float(os.getenv("DNS_CACHE_TTL_SECONDS", "300"))
+DNS_CACHE_MAX_ENTRIES = int(os.getenv("DNS_CACHE_MAX_ENTRIES", "512"))
+
+# Upstream traffic: "live", "record" (live, saving every exchange to the archive)
+# or "replay" (served from the archive only). Replay latency is a fixed number of
+# seconds or "recorded" to reproduce the captured response times.
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").lower()
+UPSTREAM_ARCHIVE_PATH = os.getenv(
+    "UPSTREAM_ARCHIVE_PATH", os.path.join(tempfile.gettempdir(), "ddg-mcp-upstream-archive")
+)
+REPLAY_LATENCY = os.getenv("REPLAY_LATENCY", "0")
+
+# DuckDuckGo HTML endpoint; point it at a fake upstream for offline load tests
+DDG_BASE_URL = os.getenv("DDG_BASE_URL", "https://html.duckduckgo.com/html")
+
+# Search result cache configuration
+SEARCH_CACHE_TTL_SECONDS = float(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+SEARCH_CACHE_MAX_ENTRIES = int(os.getenv("SEARCH_CACHE_MAX_ENTRIES", "1024"))
+
+# Rate limiter configuration ("wait" parks the request, "reject" fails fast with a retry hint)
+RATE_LIMIT_MODE = os.getenv("RATE_LIMIT_MODE", "wait").lower()
+RATE_LIMIT_MAX_WAIT_SECONDS = float(os.getenv("RATE_LIMIT_MAX_WAIT_SECONDS", "10"))
+SEARCH_RATE_LIMIT_PER_MINUTE = int(os.getenv("SEARCH_RATE_LIMIT_PER_MINUTE", "30"))
+SEARCH_RATE_LIMIT_BURST = int(os.getenv("SEARCH_RATE_LIMIT_BURST", "5"))
+FETCH_RATE_LIMIT_PER_MINUTE = int(os.getenv("FETCH_RATE_LIMIT_PER_MINUTE", "120"))
+FETCH_RATE_LIMIT_BURST = int(os.getenv("FETCH_RATE_LIMIT_BURST", "20"))
+FETCH_HOST_RATE_LIMIT_PER_MINUTE = int(os.getenv("FETCH_HOST_RATE_LIMIT_PER_MINUTE", "10"))
+FETCH_HOST_RATE_LIMIT_BURST = int(os.getenv("FETCH_HOST_RATE_LIMIT_BURST", "3"))
+
+# Fetch scheduler: global and per-domain concurrency, served round-robin across domains
+FETCH_MAX_CONCURRENCY = int(os.getenv("FETCH_MAX_CONCURRENCY", "16"))
+FETCH_DOMAIN_MAX_CONCURRENCY = int(os.getenv("FETCH_DOMAIN_MAX_CONCURRENCY", "2"))
+FETCH_MAX_QUEUED = int(os.getenv("FETCH_MAX_QUEUED", "256"))
+
+# Circuit breakers per upstream (DuckDuckGo, each fetched host) and the negative
+# cache that remembers URLs whose fetch just failed
+CIRCUIT_FAILURE_THRESHOLD = int(os.getenv("CIRCUIT_FAILURE_THRESHOLD", "5"))
+CIRCUIT_RESET_SECONDS = float(os.getenv("CIRCUIT_RESET_SECONDS", "30"))
+CIRCUIT_HALF_OPEN_MAX_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_MAX_CALLS", "1"))
+NEGATIVE_CACHE_TTL_SECONDS = float(os.getenv("NEGATIVE_CACHE_TTL_SECONDS", "60"))
+NEGATIVE_CACHE_MAX_ENTRIES = int(os.getenv("NEGATIVE_CACHE_MAX_ENTRIES", "1024"))
+
+# Where bucket state lives: "local" (per process), "shm" (shared by workers on
+# one host) or "redis" (shared by every replica)
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "local").lower()
+RATE_LIMIT_SHM_PATH = os.getenv(
+    "RATE_LIMIT_SHM_PATH",
+    os.path.join("/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir(), "ddg-mcp-ratelimit")
+)
+RATE_LIMIT_SHM_SLOTS = int(os.getenv("RATE_LIMIT_SHM_SLOTS", "4096"))
+RATE_LIMIT_REDIS_URL = os.getenv("RATE_LIMIT_REDIS_URL", "redis://localhost:6379/0")
+RATE_LIMIT_KEY_PREFIX = os.getenv("RATE_LIMIT_KEY_PREFIX", "ddg-mcp:ratelimit:")
+
+# Search result page parser: "fast" (targeted scanner) or "bs4" (full DOM, reference)
+SEARCH_PARSER = os.getenv("SEARCH_PARSER", "fast").lower()
+
+# HTML parsing runs off the event loop: "process", "thread" or "inline"
+PARSE_POOL_KIND = os.getenv("PARSE_POOL_KIND", "process").lower()
+PARSE_POOL_WORKERS = int(os.getenv("PARSE_POOL_WORKERS", "2"))
+PARSE_POOL_MAX_QUEUE = int(os.getenv("PARSE_POOL_MAX_QUEUE", "32"))
+
+# Content fetch limits (per-call arguments override the character and byte caps)
+FETCH_STREAMING = os.getenv("FETCH_STREAMING", "true").lower() == "true"
+FETCH_MAX_DOCUMENT_CHARS = int(os.getenv("FETCH_MAX_DOCUMENT_CHARS", "200000"))
+FETCH_READ_AHEAD_CHARS = int(os.getenv("FETCH_READ_AHEAD_CHARS", "10000"))
+DOCUMENT_CACHE_TTL_SECONDS = float(os.getenv("DOCUMENT_CACHE_TTL_SECONDS", "900"))
+DOCUMENT_CACHE_MAX_ENTRIES = int(os.getenv("DOCUMENT_CACHE_MAX_ENTRIES", "256"))
+
+# JSON-RPC batches on /mcp
+MCP_BATCH_MAX_SIZE = int(os.getenv("MCP_BATCH_MAX_SIZE", "50"))
+MCP_BATCH_MAX_CONCURRENCY = int(os.getenv("MCP_BATCH_MAX_CONCURRENCY", "10"))
+
+# search_many fan-out limits
+SEARCH_MANY_MAX_QUERIES = int(os.getenv("SEARCH_MANY_MAX_QUERIES", "20"))
+SEARCH_MANY_CONCURRENCY = int(os.getenv("SEARCH_MANY_CONCURRENCY", "4"))
+
+# Near-duplicate collapsing of search results and batched fetches (SimHash + LSH)
+DEDUP_ENABLED = os.getenv("DEDUP_ENABLED", "true").lower() == "true"
+DEDUP_MAX_DISTANCE = int(os.getenv("DEDUP_MAX_DISTANCE", "3"))
+DEDUP_MIN_WORDS = int(os.getenv("DEDUP_MIN_WORDS", "8"))
+DEDUP_MAX_FEATURES = int(os.getenv("DEDUP_MAX_FEATURES", "512"))
+
+# Pair the search tools' structured content with the compact text rendering
+# instead of the markdown block, unless a call sets "structured"
+SEARCH_STRUCTURED_DEFAULT = os.getenv("SEARCH_STRUCTURED_DEFAULT", "false").lower() == "true"
+
+# Background prefetch of the top search hits into the document cache (0 disables)
+PREFETCH_TOP_K = int(os.getenv("PREFETCH_TOP_K", "0"))
+PREFETCH_MAX_INFLIGHT = int(os.getenv("PREFETCH_MAX_INFLIGHT", "4"))
+
+# Persistent on-disk cache tier (SQLite, "" disables it) for search results and
+# fetched pages. FETCH_CACHE_PATH is the older name of the same setting.
+CACHE_STORE_PATH = os.getenv(
+    "CACHE_STORE_PATH",
+    os.getenv("FETCH_CACHE_PATH", os.path.join(tempfile.gettempdir(), "ddg-mcp-cache.sqlite3"))
+)
+CACHE_STORE_MAX_BYTES = int(os.getenv("CACHE_STORE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_STORE_COMPRESSION_LEVEL = int(os.getenv("CACHE_STORE_COMPRESSION_LEVEL", "6"))
+CACHE_STORE_WARM_ON_START = os.getenv("CACHE_STORE_WARM_ON_START", "true").lower() == "true"
+SEARCH_STORE_TTL_SECONDS = float(os.getenv("SEARCH_STORE_TTL_SECONDS", "21600"))
+FETCH_STORE_RETENTION_SECONDS = float(os.getenv("FETCH_STORE_RETENTION_SECONDS", "604800"))
+
+# Freshness of stored pages; rules are "domain=seconds" pairs and a rule also
+# covers the domain's subdomains.
+FETCH_FRESHNESS_SECONDS = float(os.getenv("FETCH_FRESHNESS_SECONDS", "3600"))
+FETCH_FRESHNESS_RULES = os.getenv(
+    "FETCH_FRESHNESS_RULES",
+    "edpb.europa.eu=86400,ico.org.uk=86400,hhs.gov=86400,eur-lex.europa.eu=86400"
+)
+FETCH_MAX_CHARS = int(os.getenv("FETCH_MAX_CHARS", "5000"))
+FETCH_MAX_BYTES = int(os.getenv("FETCH_MAX_BYTES", str(2 * 1024 * 1024)))
+FETCH_STREAM_CHUNK_SIZE = int(os.getenv("FETCH_STREAM_CHUNK_SIZE", "16384"))
+FETCH_ALLOWED_CONTENT_TYPES = {
+    t.strip().lower() for t in os.getenv(
+        "FETCH_ALLOWED_CONTENT_TYPES",
+        "text/html,application/xhtml+xml,text/plain,text/xml,application/xml"
+    ).split(",") if t.strip()
+}
+
 app = FastAPI(
     title="DuckDuckGo MCP Server (Standalone)",
     version="1.0.0",
     description="Standalone MCP server for DuckDuckGo search - Kubernetes ready"
 )
 
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+# Add CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+class Counter:
+    """Monotonic counter with optional labels, rendered in Prometheus text format"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: tuple = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.values: Dict[tuple, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        self.values[key] = self.values.get(key, 0.0) + amount
+
+    def set_total(self, value: float, **labels):
+        """Mirror a monotonic count kept elsewhere, read by a collector at scrape time"""
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        self.values[key] = value
+
+    def samples(self):
+        for key, value in self.values.items():
+            yield self.name, dict(zip(self.labels, key)), value
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        self.values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+    DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, name: str, help_text: str, labels: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(sorted(buckets))
+        self.values: Dict[tuple, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(label, "")) for label in self.labels)
+        series = self.values.get(key)
+        if series is None:
+            # per-bucket counts, then sum and count
+            series = self.values[key] = [0] * len(self.buckets) + [0.0, 0]
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self):
+        for key, series in self.values.items():
+            labels = dict(zip(self.labels, key))
+            for bound, count in zip(self.buckets, series):
+                yield f"{self.name}_bucket", {**labels, "le": repr(float(bound))}, count
+            yield f"{self.name}_bucket", {**labels, "le": "+Inf"}, series[-1]
+            yield f"{self.name}_sum", labels, series[-2]
+            yield f"{self.name}_count", labels, series[-1]
+
+class MetricsRegistry:
+    """Holds the server's metrics and renders the Prometheus exposition format.
+
+    Collectors are callables run at scrape time to refresh gauges derived
+    from other components (cache stats, pool state).
+    """
+
+    def __init__(self):
+        self.metrics = []
+        self.collectors = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, labels: tuple = ()) -> Counter:
+        return self.register(Counter(name, help_text, labels))
+
+    def gauge(self, name: str, help_text: str, labels: tuple = ()) -> Gauge:
+        return self.register(Gauge(name, help_text, labels))
+
+    def histogram(self, name: str, help_text: str, labels: tuple = (), **kwargs) -> Histogram:
+        return self.register(Histogram(name, help_text, labels, **kwargs))
+
+    @staticmethod
+    def _format_labels(labels: Dict[str, str]) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(10), "").replace(chr(34), chr(92) + chr(34))}"'
+            for k, v in labels.items()
+        )
+        return "{" + ",".join(escaped) + "}"
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            try:
+                collect()
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help_text}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{self._format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics_registry = MetricsRegistry()
+HTTP_REQUESTS = metrics_registry.counter(
+    "mcp_http_requests_total", "HTTP requests handled", ("method", "path", "status"))
+HTTP_IN_FLIGHT = metrics_registry.gauge(
+    "mcp_http_requests_in_flight", "HTTP requests currently being handled")
+HTTP_DURATION = metrics_registry.histogram(
+    "mcp_http_request_duration_seconds", "HTTP request latency", ("path",))
+RPC_DURATION = metrics_registry.histogram(
+    "mcp_rpc_duration_seconds", "JSON-RPC method latency on /mcp", ("method", "outcome"))
+TOOL_DURATION = metrics_registry.histogram(
+    "mcp_tool_duration_seconds", "MCP tool call latency", ("tool", "outcome"))
+UPSTREAM_DURATION = metrics_registry.histogram(
+    "mcp_upstream_request_duration_seconds", "Latency of requests to DuckDuckGo and fetched sites",
+    ("upstream", "status"))
+UPSTREAM_BYTES = metrics_registry.counter(
+    "mcp_upstream_bytes_total", "Response body bytes downloaded from upstreams", ("upstream",))
+PARSE_DURATION = metrics_registry.histogram(
+    "mcp_parse_duration_seconds", "HTML parse and text extraction time, including pool queueing",
+    ("function",))
+RATE_LIMIT_WAIT = metrics_registry.histogram(
+    "mcp_rate_limit_wait_seconds", "Time admitted requests waited for a rate limit token", ("limiter",),
+    buckets=(0.0, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0))
+RATE_LIMIT_REJECTIONS = metrics_registry.counter(
+    "mcp_rate_limit_rejections_total", "Requests rejected by a rate limiter", ("limiter",))
+CACHE_LOOKUPS = metrics_registry.counter(
+    "mcp_cache_lookups_total", "Cache lookups by result", ("cache", "result"))
+CACHE_HIT_RATIO = metrics_registry.gauge(
+    "mcp_cache_hit_ratio", "Fraction of cache lookups served from the cache", ("cache",))
+CACHE_ENTRIES = metrics_registry.gauge(
+    "mcp_cache_entries", "Entries currently held in a cache", ("cache",))
+CACHE_STORE_BYTES = metrics_registry.gauge(
+    "mcp_cache_store_bytes", "Compressed bytes held by the persistent cache tier")
+PREFETCHES = metrics_registry.counter(
+    "mcp_prefetch_total", "Speculative document prefetches by outcome", ("outcome",))
+CIRCUIT_STATE = metrics_registry.gauge(
+    "mcp_circuit_state", "Circuit breaker state (0 closed, 1 half-open, 2 open)", ("upstream",))
+CIRCUIT_TRANSITIONS = metrics_registry.counter(
+    "mcp_circuit_transitions_total", "Circuit breaker state changes", ("upstream", "state"))
+CIRCUIT_REJECTIONS = metrics_registry.counter(
+    "mcp_circuit_rejections_total", "Calls failed fast by an open breaker or the negative cache", ("upstream",))
+FETCH_QUEUE_WAIT = metrics_registry.histogram(
+    "mcp_fetch_queue_wait_seconds", "Time fetches waited for a scheduler slot",
+    buckets=(0.0, 0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0))
+FETCH_SLOTS = metrics_registry.gauge(
+    "mcp_fetch_scheduler_fetches", "Fetches holding or waiting for a scheduler slot", ("state",))
+UPSTREAM_POOL_CONNECTIONS = metrics_registry.gauge(
+    "mcp_upstream_pool_connections", "Upstream HTTP pool connections by state", ("state",))
+UPSTREAM_POOL_UTILIZATION = metrics_registry.gauge(
+    "mcp_upstream_pool_utilization", "Fraction of the upstream connection limit in use")
+
+class RateLimitExceeded(Exception):
+    """Raised instead of waiting when a limiter runs in reject-fast mode"""
+
+    def __init__(self, limiter: str, retry_after: float):
+        self.limiter = limiter
+        self.retry_after = retry_after
+        super().__init__(f"Rate limit exceeded for {limiter}, retry after {retry_after:.1f}s")
+
+class RateLimiter:
+    """GCRA limiter (token bucket equivalent) with O(1) state.
+
+    The only state is the theoretical arrival time (TAT) of the next request.
+    A request is admitted while TAT - burst tolerance <= now; admitting it
+    pushes TAT forward by one emission interval.
+    """
+
+    def __init__(self, requests_per_minute: int = 30, burst: int = None, name: str = "default"):
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.burst = max(1, burst or requests_per_minute)
+        self.interval = 60.0 / requests_per_minute
+        self.tolerance = self.interval * (self.burst - 1)
+        self.tat = 0.0
+        self.admitted = 0
+        self.rejected = 0
+        self.wait_seconds_total = 0.0
+
+    def delay(self, now: float) -> float:
+        """Seconds until one more request would be admitted"""
+        return max(0.0, self.tat - self.tolerance - now)
+
+    def commit(self, at: float):
+        """Consume one token for a request admitted at the given time"""
+        self.tat = max(self.tat, at) + self.interval
+        self.admitted += 1
+
+    def available(self, now: float) -> int:
+        """Whole tokens currently left in the bucket"""
+        backlog = max(0.0, self.tat - now)
+        return max(0, int((self.tolerance + self.interval - backlog) / self.interval))
+
+    def idle(self, now: float) -> bool:
+        """True when the bucket is full again and can be dropped"""
+        return self.tat <= now
+
+    async def acquire(self, wait: bool = True):
+        await admit([self], wait)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self.requests_per_minute,
+            "burst": self.burst,
+            "available": self.available(time.time()),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "wait_seconds_total": round(self.wait_seconds_total, 3)
+        }
+
+class HostRateLimiters:
+    """Lazily created per-upstream-host limiters"""
+
+    def __init__(self, requests_per_minute: int, burst: int = None, max_hosts: int = 1024):
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.max_hosts = max_hosts
+        self.limiters: Dict[str, RateLimiter] = {}
+
+    def get(self, host: str) -> RateLimiter:
+        limiter = self.limiters.get(host)
+        if limiter is None:
+            if len(self.limiters) >= self.max_hosts:
+                # Full buckets carry no state, so forgetting them is lossless
+                now = time.time()
+                for idle_host in [h for h, l in self.limiters.items() if l.idle(now)]:
+                    del self.limiters[idle_host]
+            limiter = RateLimiter(self.requests_per_minute, self.burst, name=f"host:{host}")
+            self.limiters[host] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {host: limiter.stats() for host, limiter in self.limiters.items()}
+
+class LocalRateLimitBackend:
+    """Bucket state held in this process only"""
+
+    name = "local"
+
+    async def reserve(self, limiters: List[RateLimiter], max_delay: float):
+        """Charge every limiter if the combined delay is within max_delay.
+
+        Returns (delay, index of the limiter that imposed it, admitted).
+        """
+        now = time.time()
+        delays = [limiter.delay(now) for limiter in limiters]
+        delay = max(delays)
+        if delay > max_delay:
+            return delay, delays.index(delay), False
+        for limiter in limiters:
+            limiter.commit(now + delay)
+        return delay, delays.index(delay), True
+
+class SharedMemoryRateLimitBackend:
+    """Bucket state in a memory-mapped file shared by all workers on a host.
+
+    Each slot holds a 64-bit key hash and the bucket TAT (wall clock). An
+    exclusive flock around the check-and-charge makes admission atomic across
+    processes; the critical section is a handful of struct reads and writes
+    and never awaits, so the lock is not held across event loop turns.
+    """
+
+    name = "shm"
+    SLOT = struct.Struct("<Qd")
+    LOCK_RETRY_SECONDS = 0.001
+
+    def __init__(self, path: str = RATE_LIMIT_SHM_PATH, slots: int = RATE_LIMIT_SHM_SLOTS):
+        self.path = path
+        self.slots = slots
+        self._fd = None
+        self._map = None
+
+    def _open(self):
+        # Opened lazily so each worker process gets its own descriptor and lock
+        if self._map is None:
+            size = self.slots * self.SLOT.size
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            if os.fstat(self._fd).st_size < size:
+                os.ftruncate(self._fd, size)
+            self._map = mmap.mmap(self._fd, size)
+        return self._map
+
+    def _slot(self, key_hash: int, buf) -> int:
+        """Linear-probe for the slot owning key_hash (or the first empty one)"""
+        start = key_hash % self.slots
+        for probe in range(self.slots):
+            index = (start + probe) % self.slots
+            owner, _ = self.SLOT.unpack_from(buf, index * self.SLOT.size)
+            if owner in (key_hash, 0):
+                return index
+        # Table full: share the home slot, which only ever over-throttles
+        return start
+
+    async def _lock(self):
+        # A blocking flock would stall the event loop while another worker
+        # holds the lock, so poll instead; the hold time is microseconds
+        while True:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                return
+            except BlockingIOError:
+                await asyncio.sleep(self.LOCK_RETRY_SECONDS)
+
+    async def reserve(self, limiters: List[RateLimiter], max_delay: float):
+        buf = self._open()
+        await self._lock()
+        try:
+            now = time.time()
+            entries = []
+            for limiter in limiters:
+                key_hash = int.from_bytes(hashlib.blake2b(limiter.name.encode(), digest_size=8).digest(), "little") or 1
+                index = self._slot(key_hash, buf)
+                _, tat = self.SLOT.unpack_from(buf, index * self.SLOT.size)
+                limiter.tat = tat
+                entries.append((limiter, key_hash, index))
+
+            delays = [limiter.delay(now) for limiter, _, _ in entries]
+            delay = max(delays)
+            if delay > max_delay:
+                return delay, delays.index(delay), False
+
+            for limiter, key_hash, index in entries:
+                limiter.commit(now + delay)
+                self.SLOT.pack_into(buf, index * self.SLOT.size, key_hash, limiter.tat)
+            return delay, delays.index(delay), True
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+class RedisRateLimitBackend:
+    """Bucket state in Redis, shared by every replica.
+
+    Admission runs as one Lua script so the check-and-charge of all buckets
+    is atomic, and uses the Redis clock so replicas never disagree on "now".
+    """
+
+    name = "redis"
+    SCRIPT = """
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local max_delay = tonumber(ARGV[1])
+local tats = {}
+local delay = 0
+local blocking = 1
+for i = 1, #KEYS do
+    tats[i] = tonumber(redis.call('GET', KEYS[i]) or '0')
+    local d = tats[i] - tonumber(ARGV[2 * i + 1]) - now
+    if d > delay then
+        delay = d
+        blocking = i
+    end
+end
+if delay > max_delay then
+    return {tostring(delay), blocking, 0}
+end
+for i = 1, #KEYS do
+    local tat = math.max(tats[i], now + delay) + tonumber(ARGV[2 * i])
+    redis.call('SET', KEYS[i], tostring(tat), 'PX', math.ceil((tat - now) * 1000) + 1000)
+end
+return {tostring(delay), blocking, 1}
+"""
+
+    def __init__(self, url: str = RATE_LIMIT_REDIS_URL, prefix: str = RATE_LIMIT_KEY_PREFIX):
+        if not REDIS_AVAILABLE:
+            raise RuntimeError("RATE_LIMIT_BACKEND=redis requires the 'redis' package")
+        self.prefix = prefix
+        self.client = redis_asyncio.from_url(url)
+        self.script = self.client.register_script(self.SCRIPT)
+        self.fallback = LocalRateLimitBackend()
+
+    async def reserve(self, limiters: List[RateLimiter], max_delay: float):
+        keys = [self.prefix + limiter.name for limiter in limiters]
+        args = [max_delay]
+        for limiter in limiters:
+            args.extend([limiter.interval, limiter.tolerance])
+        try:
+            delay, blocking, admitted = await self.script(keys=keys, args=args)
+        except Exception as e:
+            # Keep serving on a per-process budget rather than failing every call
+            logger.warning(f"Redis rate limiter unavailable, using local buckets: {e}")
+            return await self.fallback.reserve(limiters, max_delay)
+        if admitted:
+            for limiter in limiters:
+                limiter.admitted += 1
+        return max(0.0, float(delay)), int(blocking) - 1, bool(admitted)
+
+def create_rate_limit_backend(name: str = RATE_LIMIT_BACKEND):
+    if name == "shm":
+        return SharedMemoryRateLimitBackend()
+    if name == "redis":
+        return RedisRateLimitBackend()
+    if name != "local":
+        logger.warning(f"Unknown RATE_LIMIT_BACKEND '{name}', using local buckets")
+    return LocalRateLimitBackend()
+
+rate_limit_backend = create_rate_limit_backend()
+
+async def admit(limiters: List[RateLimiter], wait: bool = None):
+    """Take one token from every limiter, waiting or rejecting when empty.
+
+    All buckets are checked before any is charged, so a rejected request
+    never consumes budget. In wait mode the coroutine sleeps at most
+    RATE_LIMIT_MAX_WAIT_SECONDS; longer waits are rejected with a hint.
+    """
+    if wait is None:
+        wait = RATE_LIMIT_MODE != "reject"
+
+    max_delay = RATE_LIMIT_MAX_WAIT_SECONDS if wait else 0.0
+    delay, blocking_index, admitted = await rate_limit_backend.reserve(limiters, max_delay)
+    blocking = limiters[blocking_index]
+
+    limiter_label = blocking.name.split(":")[0]
+    if not admitted:
+        blocking.rejected += 1
+        RATE_LIMIT_REJECTIONS.inc(limiter=limiter_label)
+        raise RateLimitExceeded(blocking.name, delay)
+
+    RATE_LIMIT_WAIT.observe(delay, limiter=limiter_label)
+    if delay > 0:
+        blocking.wait_seconds_total += delay
+        logger.info(f"Rate limit reached, waiting {delay:.1f} seconds")
+        await asyncio.sleep(delay)
+
+class TTLCache:
+    """Bounded in-process cache with per-entry TTL and LRU eviction.
+
+    Concurrent loads of the same key are coalesced (single-flight): the loader
+    runs once in a task of its own and every caller awaits its result, so a
+    cancelled caller does not take the others down with it.
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._inflight: Dict[Any, asyncio.Task] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        """Return the cached value for key, or None if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl_seconds: float = None):
+        """Store value under key, evicting the least recently used entries.
+
+        ttl_seconds can only shorten the cache's own TTL for this entry.
+        """
+        ttl = self.ttl_seconds if ttl_seconds is None else min(ttl_seconds, self.ttl_seconds)
+        if self.max_entries <= 0 or ttl <= 0:
+            return
+        self._entries[key] = (time.monotonic() + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_load(self, key, loader):
+        """Return the cached value or run loader() once for all concurrent callers"""
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            # The load runs in its own task so that cancelling the caller that
+            # started it (e.g. a client disconnect) does not fail the others
+            task = asyncio.create_task(self._load(key, loader))
+            task.add_done_callback(self._observe)
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _load(self, key, loader):
+        try:
+            value = await loader()
+            self.set(key, value)
+            return value
+        finally:
+            # Failures are not cached; waiting callers see the same error
+            self._inflight.pop(key, None)
+
+    @staticmethod
+    def _observe(task: asyncio.Task):
+        # Mark retrieved so a failure nobody waited for is not logged
+        if not task.cancelled():
+            task.exception()
+
+    def delete(self, key):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "inflight": len(self._inflight)
+        }
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling an upstream that is known to be failing"""
+
+    def __init__(self, upstream: str, retry_after: float, reason: str):
+        self.upstream = upstream
+        self.retry_after = retry_after
+        super().__init__(f"{upstream} unavailable ({reason}), retry after {retry_after:.1f}s")
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one upstream.
+
+    After failure_threshold consecutive failures the breaker opens and calls
+    fail fast for reset_seconds. It then lets up to half_open_max_calls trial
+    calls through: a success closes it again, a failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int = CIRCUIT_FAILURE_THRESHOLD,
+                 reset_seconds: float = CIRCUIT_RESET_SECONDS,
+                 half_open_max_calls: int = CIRCUIT_HALF_OPEN_MAX_CALLS):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.failures = 0
+        self.successes = 0
+        self.rejected = 0
+        self.last_error = None
+
+    def _transition(self, state: str):
+        self.state = state
+        CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+        if state == self.OPEN:
+            self.opened_at = time.monotonic()
+            logger.warning(f"Circuit for {self.name} opened: {self.last_error}")
+        elif state == self.CLOSED:
+            logger.info(f"Circuit for {self.name} closed")
+
+    def allow(self):
+        """Admit a call or raise UpstreamUnavailable"""
+        if self.state == self.OPEN:
+            remaining = self.opened_at + self.reset_seconds - time.monotonic()
+            if remaining > 0:
+                self.rejected += 1
+                CIRCUIT_REJECTIONS.inc(upstream=self.name)
+                raise UpstreamUnavailable(self.name, remaining, "circuit open")
+            self._transition(self.HALF_OPEN)
+            self.trials = 0
+        if self.state == self.HALF_OPEN:
+            if self.trials >= self.half_open_max_calls:
+                self.rejected += 1
+                CIRCUIT_REJECTIONS.inc(upstream=self.name)
+                raise UpstreamUnavailable(self.name, 1.0, "circuit half-open, trial in progress")
+            self.trials += 1
+
+    def record_success(self):
+        self.successes += 1
+        self.consecutive_failures = 0
+        if self.state == self.HALF_OPEN:
+            self.trials -= 1
+            self._transition(self.CLOSED)
+
+    def record_failure(self, error: BaseException):
+        self.failures += 1
+        self.consecutive_failures += 1
+        self.last_error = f"{type(error).__name__}: {error}"
+        if self.state == self.HALF_OPEN:
+            self.trials -= 1
+            self._transition(self.OPEN)
+        elif self.state == self.CLOSED and self.consecutive_failures >= self.failure_threshold:
+            self._transition(self.OPEN)
+
+    def release(self):
+        """End a call whose outcome says nothing about the upstream"""
+        if self.state == self.HALF_OPEN:
+            self.trials -= 1
+
+    @contextmanager
+    def guard(self, is_failure):
+        """Run the block as one call; is_failure(exc) decides what counts against the upstream"""
+        self.allow()
+        try:
+            yield
+        except BaseException as e:
+            if is_failure(e):
+                self.record_failure(e)
+            else:
+                self.release()
+            raise
+        else:
+            self.record_success()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "failures": self.failures,
+            "successes": self.successes,
+            "rejected": self.rejected,
+            "last_error": self.last_error
+        }
+        if self.state == self.OPEN:
+            stats["retry_after"] = round(max(0.0, self.opened_at + self.reset_seconds - time.monotonic()), 3)
+        return stats
+
+class HostCircuitBreakers:
+    """Lazily created per-upstream-host breakers"""
+
+    def __init__(self, max_hosts: int = 256):
+        self.max_hosts = max_hosts
+        self.breakers: Dict[str, CircuitBreaker] = {}
+
+    def get(self, host: str) -> CircuitBreaker:
+        breaker = self.breakers.get(host)
+        if breaker is None:
+            if len(self.breakers) >= self.max_hosts:
+                # Closed breakers without recent failures carry no state worth keeping
+                for healthy_host in [h for h, b in self.breakers.items()
+                                     if b.state == CircuitBreaker.CLOSED and not b.consecutive_failures]:
+                    del self.breakers[healthy_host]
+            breaker = CircuitBreaker(f"host:{host}")
+            self.breakers[host] = breaker
+        return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        return {host: breaker.stats() for host, breaker in self.breakers.items()}
+
+def is_upstream_failure(error: BaseException, failure_statuses=frozenset({429})) -> bool:
+    """Timeouts, connection errors and 5xx (plus failure_statuses) mean the upstream is unhealthy"""
+    if isinstance(error, httpx.TransportError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return status >= 500 or status in failure_statuses
+    return False
+
+class CachingDNSBackend(httpcore.AsyncNetworkBackend):
+    """httpcore network backend that caches getaddrinfo results.
+
+    Connections are opened to the cached IP addresses; TLS still verifies
+    and sends SNI for the original hostname because httpcore passes the
+    origin host to start_tls separately.
+    """
+
+    def __init__(self, ttl_seconds: float = DNS_CACHE_TTL_SECONDS, max_entries: int = DNS_CACHE_MAX_ENTRIES):
+        self._backend = httpcore.AnyIOBackend()
+        self._cache = TTLCache(max_entries, ttl_seconds)
+
+    async def _resolve(self, host: str, port: int) -> List[str]:
+        try:
+            ipaddress.ip_address(host)
+            return [host]
+        except ValueError:
+            pass
+
+        async def lookup():
+            try:
+                infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+            except socket.gaierror as e:
+                # Surface as a connect error so httpx maps it to httpx.ConnectError
+                raise httpcore.ConnectError(str(e)) from e
+            return list(dict.fromkeys(info[4][0] for info in infos))
+
+        return await self._cache.get_or_load(host, lookup)
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        addresses = await self._resolve(host, port)
+        last_error = None
+        for address in addresses:
+            try:
+                return await self._backend.connect_tcp(
+                    address, port, timeout=timeout, local_address=local_address, socket_options=socket_options
+                )
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                last_error = e
+        # Every cached address failed; resolve again next time
+        self._cache.delete(host)
+        raise last_error
+
+    async def connect_unix_socket(self, path, timeout=None, socket_options=None):
+        return await self._backend.connect_unix_socket(path, timeout=timeout, socket_options=socket_options)
+
+    async def sleep(self, seconds: float):
+        await self._backend.sleep(seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        return self._cache.stats()
+
+@contextmanager
+def map_httpcore_errors():
+    """Re-raise httpcore exceptions as the httpx exceptions of the same name"""
+    try:
+        yield
+    except (httpcore.TimeoutException, httpcore.NetworkError, httpcore.ProtocolError,
+            httpcore.ProxyError, httpcore.UnsupportedProtocol) as e:
+        raise _httpx_error(e) from e
+
+def _httpx_error(error: Exception) -> httpx.TransportError:
+    for cls in type(error).__mro__:
+        mapped = getattr(httpx, cls.__name__, None)
+        if isinstance(mapped, type) and issubclass(mapped, httpx.TransportError):
+            return mapped(str(error))
+    return httpx.TransportError(str(error))
+
+class PoolResponseStream(httpx.AsyncByteStream):
+    """Body of an httpcore response, exposed as an httpx stream"""
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    async def __aiter__(self):
+        with map_httpcore_errors():
+            async for chunk in self._stream:
+                yield chunk
+
+    async def aclose(self):
+        if hasattr(self._stream, "aclose"):
+            await self._stream.aclose()
+
+class UpstreamTransport(httpx.AsyncBaseTransport):
+    """httpx transport over an httpcore connection pool that resolves through CachingDNSBackend.
+
+    httpx's own transport has no option for the network backend, so this
+    builds the pool with httpcore's public API and does the small amount of
+    request and response mapping AsyncHTTPTransport would do.
+    """
+
+    def __init__(self, network_backend: httpcore.AsyncNetworkBackend, limits: httpx.Limits, http2: bool):
+        self.max_connections = limits.max_connections
+        self._pool = httpcore.AsyncConnectionPool(
+            ssl_context=httpx.create_ssl_context(),
+            max_connections=limits.max_connections,
+            max_keepalive_connections=limits.max_keepalive_connections,
+            keepalive_expiry=limits.keepalive_expiry,
+            http1=True,
+            http2=http2,
+            network_backend=network_backend
+        )
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        core_request = httpcore.Request(
+            method=request.method,
+            url=httpcore.URL(
+                scheme=request.url.raw_scheme,
+                host=request.url.raw_host,
+                port=request.url.port,
+                target=request.url.raw_path
+            ),
+            headers=request.headers.raw,
+            content=request.stream,
+            extensions=request.extensions
+        )
+        with map_httpcore_errors():
+            response = await self._pool.handle_async_request(core_request)
+        return httpx.Response(
+            status_code=response.status,
+            headers=response.headers,
+            stream=PoolResponseStream(response.stream),
+            extensions=response.extensions
+        )
+
+    async def aclose(self):
+        await self._pool.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        connections = list(self._pool.connections)
+        idle = sum(1 for connection in connections if connection.is_idle())
+        http2_connections = sum(1 for connection in connections if "HTTP/2" in connection.info())
+        return {
+            "connections": len(connections),
+            "active": len(connections) - idle,
+            "idle": idle,
+            "http2_connections": http2_connections,
+            "max_connections": self.max_connections,
+            "utilization": round((len(connections) - idle) / self.max_connections, 4)
+        }
+
+class UpstreamArchive:
+    """On-disk archive of upstream exchanges, one JSON file per request.
+
+    Requests are keyed by method and URL. Each file holds every response
+    recorded for its request in order; replay walks through them and then
+    keeps serving the last one, so repeated runs see the same sequence.
+    """
+
+    # Describe the stored (already decoded) body, not the original transfer
+    DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection"}
+
+    def __init__(self, path: str = UPSTREAM_ARCHIVE_PATH):
+        self.path = path
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._cursors: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(request: httpx.Request) -> str:
+        # Conditional requests get their own key so a recorded 304 never answers a plain GET
+        conditional = "if-none-match" in request.headers or "if-modified-since" in request.headers
+        identity = f"{request.method} {request.url}{' conditional' if conditional else ''}".encode("utf-8")
+        return hashlib.sha256(identity + b"\0" + (request.content or b"")).hexdigest()
+
+    def _file(self, key: str) -> str:
+        return os.path.join(self.path, f"{key}.json")
+
+    def _load(self, key: str) -> Union[Dict[str, Any], None]:
+        if key not in self._entries:
+            try:
+                with open(self._file(key), encoding="utf-8") as f:
+                    self._entries[key] = json.load(f)
+            except FileNotFoundError:
+                return None
+        return self._entries[key]
+
+    def record(self, request: httpx.Request, response: httpx.Response, body: bytes, elapsed: float):
+        key = self.key(request)
+        with self._lock:
+            entry = self._load(key) or {"method": request.method, "url": str(request.url), "responses": []}
+            entry["responses"].append({
+                "status": response.status_code,
+                "headers": [
+                    [name, value] for name, value in response.headers.multi_items()
+                    if name.lower() not in self.DROPPED_HEADERS
+                ],
+                "body": base64.b64encode(body).decode("ascii"),
+                "elapsed": round(elapsed, 4)
+            })
+            self._entries[key] = entry
+            os.makedirs(self.path, exist_ok=True)
+            # Write-then-rename so concurrent workers never see a partial file
+            fd, temp_path = tempfile.mkstemp(dir=self.path, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self._file(key))
+
+    def next_response(self, request: httpx.Request) -> Union[Dict[str, Any], None]:
+        key = self.key(request)
+        with self._lock:
+            entry = self._load(key)
+            if entry is None or not entry["responses"]:
+                return None
+            cursor = self._cursors.get(key, 0)
+            self._cursors[key] = cursor + 1
+            return entry["responses"][min(cursor, len(entry["responses"]) - 1)]
+
+class RecordReplayTransport(httpx.AsyncBaseTransport):
+    """Wraps the upstream transport to record exchanges or replay them offline"""
+
+    def __init__(self, mode: str, inner: UpstreamTransport, archive: UpstreamArchive,
+                 latency: str = REPLAY_LATENCY):
+        self.mode = mode
+        self.inner = inner
+        self.archive = archive
+        self.latency = latency
+        self.recorded = 0
+        self.replayed = 0
+        self.misses = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if self.mode == "replay":
+            return await self._replay(request)
+
+        started = time.perf_counter()
+        response = await self.inner.handle_async_request(request)
+        try:
+            # Recording needs the whole body, so streaming reads stop early only on the client side
+            body = await response.aread()
+        finally:
+            await response.aclose()
+        elapsed = time.perf_counter() - started
+        await asyncio.to_thread(self.archive.record, request, response, body, elapsed)
+        self.recorded += 1
+        return httpx.Response(
+            response.status_code,
+            headers=[(name, value) for name, value in response.headers.multi_items()
+                     if name.lower() not in UpstreamArchive.DROPPED_HEADERS],
+            content=body,
+            request=request,
+            extensions={"http_version": response.extensions.get("http_version", b"HTTP/1.1")}
+        )
+
+    async def _replay(self, request: httpx.Request) -> httpx.Response:
+        recorded = await asyncio.to_thread(self.archive.next_response, request)
+        if recorded is None:
+            self.misses += 1
+            raise httpx.ConnectError(f"No recorded response for {request.method} {request.url}", request=request)
+
+        delay = recorded["elapsed"] if self.latency == "recorded" else float(self.latency)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.replayed += 1
+        return httpx.Response(
+            recorded["status"],
+            headers=recorded["headers"],
+            content=base64.b64decode(recorded["body"]),
+            request=request
+        )
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        return self.inner.stats()
+
+    def archive_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "archive": self.archive.path,
+            "latency": self.latency,
+            "recorded": self.recorded,
+            "replayed": self.replayed,
+            "misses": self.misses
+        }
+
+def create_upstream_client() -> httpx.AsyncClient:
+    """Build the HTTP client shared by the searcher and the fetcher"""
+    limits = httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(
+        connect=HTTP_CONNECT_TIMEOUT,
+        read=HTTP_READ_TIMEOUT,
+        write=HTTP_WRITE_TIMEOUT,
+        pool=HTTP_POOL_TIMEOUT
+    )
+    dns_backend = CachingDNSBackend()
+    transport = UpstreamTransport(dns_backend, limits, HTTP2_ENABLED)
+    if UPSTREAM_MODE in ("record", "replay"):
+        logger.info(f"Upstream traffic mode: {UPSTREAM_MODE} ({UPSTREAM_ARCHIVE_PATH})")
+        transport = RecordReplayTransport(UPSTREAM_MODE, transport, UpstreamArchive())
+    elif UPSTREAM_MODE != "live":
+        logger.warning(f"Unknown UPSTREAM_MODE '{UPSTREAM_MODE}', using live")
+    client = httpx.AsyncClient(transport=transport, timeout=timeout)
+    client.dns_backend = dns_backend
+    client.upstream_transport = transport
+    return client
+
+def unwrap_ddg_link(href: str) -> str:
+    """Return the destination of a DuckDuckGo /l/?uddg= redirect link"""
+    if "uddg=" not in href:
+        return href
+    parsed = urllib.parse.urlsplit(href)
+    if parsed.path.rstrip("/") != "/l":
+        return href
+    target = urllib.parse.parse_qs(parsed.query).get("uddg")
+    return target[0] if target else href
+
+def _collapse_whitespace(text: str) -> str:
+    return " ".join(text.split())
+
+def _parse_results_bs4(page: str, max_results: int) -> List[Dict[str, Any]]:
+    """Reference parser: builds the full DOM with BeautifulSoup"""
+    soup = BeautifulSoup(page, 'html.parser')
+    results = []
+
+    # Find search result containers
+    result_containers = soup.find_all('div', class_='result')
+
+    for i, container in enumerate(result_containers[:max_results]):
+        try:
+            # Extract title and link
+            title_link = container.find('a', class_='result__a')
+            if not title_link:
+                continue
+
+            title = _collapse_whitespace(title_link.get_text())
+            link = unwrap_ddg_link(title_link.get('href', ''))
+
+            # Extract snippet
+            snippet_elem = container.find('a', class_='result__snippet')
+            snippet = _collapse_whitespace(snippet_elem.get_text()) if snippet_elem else ""
+
+            if title and link:
+                results.append({
+                    'position': i + 1,
+                    'title': title,
+                    'link': link,
+                    'snippet': snippet
+                })
+
+        except Exception as e:
+            logger.warning(f"Error parsing result {i}: {e}")
+            continue
+
+    return results
+
+_SCRIPT_STYLE_RE = re.compile(r"<(script|style)\b.*?</\1\s*>", re.I | re.S)
+_RESULT_DIV_RE = re.compile(r"""<div\b[^>]*?\bclass\s*=\s*(["'])(.*?)\1[^>]*>""", re.I | re.S)
+_ANCHOR_RE = re.compile(r"<a\b([^>]*)>(.*?)</a\s*>", re.I | re.S)
+_CLASS_ATTR_RE = re.compile(r"""\bclass\s*=\s*(["'])(.*?)\1""", re.I | re.S)
+_HREF_ATTR_RE = re.compile(r"""\bhref\s*=\s*(["'])(.*?)\1""", re.I | re.S)
+_TAG_RE = re.compile(r"<[^>]*>")
+
+def _anchor_text(inner: str) -> str:
+    return _collapse_whitespace(html.unescape(_TAG_RE.sub("", inner)))
+
+def _parse_results_fast(page: str, max_results: int) -> List[Dict[str, Any]]:
+    """Targeted extractor for DuckDuckGo HTML result pages.
+
+    Instead of building a DOM it finds each div whose class list contains
+    "result", and scans the markup up to the next such div for the first
+    result__a and result__snippet anchors. Produces the same output as
+    _parse_results_bs4 on DuckDuckGo's flat result layout.
+    """
+    page = _SCRIPT_STYLE_RE.sub("", page)
+    starts = [
+        m.start() for m in _RESULT_DIV_RE.finditer(page)
+        if "result" in m.group(2).split()
+    ]
+    results = []
+
+    for i, start in enumerate(starts[:max_results]):
+        end = starts[i + 1] if i + 1 < len(starts) else len(page)
+        title = link = snippet = None
+
+        for anchor in _ANCHOR_RE.finditer(page, start, end):
+            class_attr = _CLASS_ATTR_RE.search(anchor.group(1))
+            classes = class_attr.group(2).split() if class_attr else ()
+            if title is None and "result__a" in classes:
+                href = _HREF_ATTR_RE.search(anchor.group(1))
+                title = _anchor_text(anchor.group(2))
+                link = unwrap_ddg_link(html.unescape(href.group(2))) if href else ""
+            elif snippet is None and "result__snippet" in classes:
+                snippet = _anchor_text(anchor.group(2))
+            if title is not None and snippet is not None:
+                break
+
+        if title and link:
+            results.append({
+                'position': i + 1,
+                'title': title,
+                'link': link,
+                'snippet': snippet or ""
+            })
+
+    return results
+
+def parse_search_results(page: str, max_results: int) -> List[Dict[str, Any]]:
+    """Extract title, link and snippet for each result on a DuckDuckGo page"""
+    if SEARCH_PARSER == "bs4":
+        return _parse_results_bs4(page, max_results)
+    return _parse_results_fast(page, max_results)
+
+def extract_page_text(page: str) -> str:
+    """Strip scripts and styles from a page and return its cleaned text"""
+    soup = BeautifulSoup(page, 'html.parser')
+
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+
+    # Get text content
+    text = soup.get_text()
+
+    # Clean up whitespace
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\\n'.join(chunk for chunk in chunks if chunk)
+
+class StreamingTextExtractor(HTMLParser):
+    """Incremental counterpart of extract_page_text.
+
+    Accepts the document in pieces, drops script and style content and
+    produces the same cleaned text, stopping once max_chars are collected.
+    """
+
+    SKIP_TAGS = {"script", "style"}
+    SEPARATOR = '\\n'
+
+    def __init__(self, max_chars: int, is_html: bool = True):
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.is_html = is_html
+        self.chunks: List[str] = []
+        self.length = 0
+        self._partial_line = ""
+        self._skip_depth = 0
+
+    @property
+    def full(self) -> bool:
+        return self.length >= self.max_chars
+
+    def feed(self, data: str):
+        if self.full:
+            return
+        if self.is_html:
+            super().feed(data)
+        else:
+            self._add_text(data)
+
+    def close(self):
+        if self.is_html:
+            super().close()
+        self._emit_line(self._partial_line)
+        self._partial_line = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in self.SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._add_text(data)
+
+    def _add_text(self, data: str):
+        if self.full:
+            return
+        lines = (self._partial_line + data).splitlines(keepends=True)
+        # The last piece may continue in the next chunk
+        self._partial_line = ""
+        if lines and len(lines[-1].splitlines()[0]) == len(lines[-1]):
+            self._partial_line = lines.pop()
+        for line in lines:
+            self._emit_line(line)
+            if self.full:
+                return
+
+    def _emit_line(self, line: str):
+        for phrase in line.strip().split("  "):
+            phrase = phrase.strip()
+            if phrase:
+                if self.chunks:
+                    self.length += len(self.SEPARATOR)
+                self.chunks.append(phrase)
+                self.length += len(phrase)
+
+    def text(self) -> str:
+        return self.SEPARATOR.join(self.chunks)
+
+class ParsePoolSaturated(Exception):
+    """Raised when the parse pool already has its maximum queue depth"""
+
+def _parse_worker_init():
+    # Ctrl-C reaches the whole process group; shutdown is the server's call
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+class ParsePool:
+    """Bounded executor for CPU-bound HTML parsing.
+
+    Keeps BeautifulSoup and text extraction off the event loop so one large
+    page cannot stall other requests or the health probe. At most
+    workers + max_queue jobs are admitted; beyond that callers fail fast.
+    Functions submitted must be module-level so they can be pickled.
+
+    Worker processes come from a forkserver (spawn where that is missing), not
+    a plain fork: by the time the pool starts the server already runs threads,
+    and a forked child could inherit locks they hold.
+    """
+
+    def __init__(self, kind: str = PARSE_POOL_KIND, workers: int = PARSE_POOL_WORKERS,
+                 max_queue: int = PARSE_POOL_MAX_QUEUE):
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_queue = max(0, max_queue)
+        self._executor = None
+        self._thread_executor = None
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.failed = 0
+        self.busy_seconds_total = 0.0
+        self.max_pending_seen = 0
+
+    def start(self):
+        """Create the executor up front instead of on the first parse"""
+        executor = self._get_executor()
+        if self.kind == "process":
+            # Workers spawn on demand and import this module; do that now
+            for _ in range(self.workers):
+                executor.submit(os.getpid)
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.kind == "process":
+                method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context(method),
+                                                     initializer=_parse_worker_init)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        return self._executor
+
+    def _get_thread_executor(self):
+        if self.kind != "process":
+            return self._get_executor()
+        if self._thread_executor is None:
+            self._thread_executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="parse")
+        return self._thread_executor
+
+    async def run(self, fn, *args):
+        """Run fn(*args) in the pool and return its result"""
+        return await self._submit(False, fn, *args)
+
+    async def run_threaded(self, fn, *args):
+        """Like run(), but always in a thread so fn may mutate in-process state"""
+        return await self._submit(True, fn, *args)
+
+    async def _submit(self, threaded: bool, fn, *args):
+        if self.kind == "inline":
+            started = time.perf_counter()
+            try:
+                result = fn(*args)
+            except Exception:
+                self.failed += 1
+                raise
+            finally:
+                PARSE_DURATION.observe(time.perf_counter() - started, function=fn.__qualname__)
+            self.completed += 1
+            return result
+
+        if self.pending >= self.workers + self.max_queue:
+            self.rejected += 1
+            raise ParsePoolSaturated(
+                f"Parse pool saturated ({self.pending} jobs in flight, limit {self.workers + self.max_queue})"
+            )
+
+        self.pending += 1
+        self.max_pending_seen = max(self.max_pending_seen, self.pending)
+        started = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_thread_executor() if threaded else self._get_executor()
+            result = await loop.run_in_executor(executor, fn, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. OOM on a huge page); start a fresh pool next time
+            self.failed += 1
+            broken, self._executor = self._executor, None
+            if broken is not None:
+                broken.shutdown(wait=False, cancel_futures=True)
+            raise
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            self.pending -= 1
+            self.busy_seconds_total += elapsed
+            PARSE_DURATION.observe(elapsed, function=fn.__qualname__)
+        self.completed += 1
+        return result
+
+    def shutdown(self):
+        """Cancel queued jobs and join the workers.
+
+        Waiting lets the executor reap its processes and release their
+        semaphores before the interpreter exits; otherwise the resource
+        tracker reports them as leaked.
+        """
+        for executor in (self._executor, self._thread_executor):
+            if executor is not None:
+                executor.shutdown(wait=True, cancel_futures=True)
+        self._executor = None
+        self._thread_executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        capacity = self.workers + self.max_queue
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "active": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "saturation": round(self.pending / capacity, 4),
+            "max_in_flight_seen": self.max_pending_seen,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "busy_seconds_total": round(self.busy_seconds_total, 3)
+        }
+
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+def simhash(text: str, shingle: int = 3, max_features: int = DEDUP_MAX_FEATURES) -> Union[int, None]:
+    """64-bit SimHash over word shingles, or None if text has fewer than DEDUP_MIN_WORDS words.
+
+    Texts that differ in a few words get fingerprints a few bits apart, so
+    near-duplicates are found by Hamming distance. Only the first
+    max_features distinct shingles count, which bounds the cost on long pages.
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < DEDUP_MIN_WORDS:
+        return None
+    features = {}
+    for i in range(max(1, len(words) - shingle + 1)):
+        features[" ".join(words[i:i + shingle])] = None
+        if len(features) >= max_features:
+            break
+    # Concatenated 64-bit strings: every 64th character is the same bit of
+    # each hash, so a slice and count() tally one bit position in C
+    bits = "".join(
+        f"{int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'big'):064b}"
+        for feature in features
+    )
+    threshold = len(features) / 2
+    fingerprint = 0
+    for position in range(64):
+        if bits[position::64].count("1") > threshold:
+            fingerprint |= 1 << (63 - position)
+    return fingerprint
+
+class SimHashIndex:
+    """LSH index finding fingerprints within max_distance bits of a query.
+
+    Fingerprints are split into max_distance + 1 bands; by the pigeonhole
+    principle two fingerprints that close agree exactly on at least one band,
+    so only items sharing a band are compared.
+    """
+
+    def __init__(self, max_distance: int = DEDUP_MAX_DISTANCE):
+        self.max_distance = max_distance
+        bands = max_distance + 1
+        self.band_bits = 64 // bands
+        self.bands = bands
+        self.buckets: List[Dict[int, List[tuple]]] = [{} for _ in range(bands)]
+
+    def _keys(self, fingerprint: int):
+        mask = (1 << self.band_bits) - 1
+        for band in range(self.bands):
+            yield band, (fingerprint >> (band * self.band_bits)) & mask
+
+    def find(self, fingerprint: int):
+        """Return the closest indexed item within max_distance, or None"""
+        best, best_distance = None, self.max_distance + 1
+        for band, key in self._keys(fingerprint):
+            for other, item in self.buckets[band].get(key, ()):
+                distance = (fingerprint ^ other).bit_count()
+                if distance < best_distance:
+                    best, best_distance = item, distance
+        return best
+
+    def add(self, fingerprint: int, item):
+        for band, key in self._keys(fingerprint):
+            self.buckets[band].setdefault(key, []).append((fingerprint, item))
+
+def collapse_near_duplicates(results: List[Dict[str, Any]], text_key: str = "snippet") -> List[Dict[str, Any]]:
+    """Drop results whose text near-duplicates an earlier one.
+
+    The kept result lists the dropped copies' URLs under "duplicates"; for
+    search_many results their per-query positions are merged in as well.
+    """
+    if not DEDUP_ENABLED:
+        return results
+    index = SimHashIndex()
+    kept = []
+    for result in results:
+        # Snippets are short, so single words are the features; shingles would
+        # let a one-word edit move a large share of them
+        fingerprint = simhash(result.get(text_key) or "", shingle=1)
+        original = index.find(fingerprint) if fingerprint is not None else None
+        if original is None:
+            result = dict(result)
+            kept.append(result)
+            if fingerprint is not None:
+                index.add(fingerprint, result)
+            continue
+        original.setdefault("duplicates", []).append(result["link"])
+        if "positions" in original:
+            original["positions"] = dict(original["positions"])
+            for query, position in result.get("positions", {}).items():
+                original["positions"][query] = min(position, original["positions"].get(query, position))
+    return kept
+
+# Errors raised on our side of the connection; they say nothing about the URL
+LOCAL_ERRORS = (RateLimitExceeded, UpstreamUnavailable, ParsePoolSaturated, asyncio.CancelledError)
+
+class DuckDuckGoSearcher:
+    BASE_URL = DDG_BASE_URL
+    CHALLENGE_STATUSES = frozenset({202, 403, 429})
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+    }
+
+    STORE_NAMESPACE = "search"
+
+    def __init__(self, client: httpx.AsyncClient, prefetcher: "Prefetcher" = None,
+                 store: "PersistentCache" = None):
+        # Search has a single upstream host, so its bucket doubles as the host bucket
+        self.rate_limiter = RateLimiter(SEARCH_RATE_LIMIT_PER_MINUTE, SEARCH_RATE_LIMIT_BURST, name="search")
+        self.breaker = CircuitBreaker("duckduckgo")
+        self.client = client
+        self.prefetcher = prefetcher
+        self.cache = TTLCache(SEARCH_CACHE_MAX_ENTRIES, SEARCH_CACHE_TTL_SECONDS)
+        self.store = store
+
+    @staticmethod
+    def cache_key(query: str, max_results: int) -> tuple:
+        """Normalize a query so trivially different spellings share a cache entry"""
+        return (" ".join(query.lower().split()), int(max_results))
+
+    async def search(self, query: str, max_results: int = 10, wait: bool = None) -> str:
+        """Search DuckDuckGo and return formatted results"""
+        results = await self.search_results(query, max_results, wait)
+
+        return self.format_results(query, results)
+
+    @staticmethod
+    def format_results(query: str, results: List[Dict[str, Any]]) -> str:
+        """Format results as markdown for LLM consumption"""
+        if not results:
+            return "No search results found."
+
+        parts = [f"Search results for '{query}':\\n\\n"]
+        for result in results:
+            parts.append(f"{result['position']}. **{result['title']}**\\n")
+            parts.append(f"   URL: {result['link']}\\n")
+            if result.get('duplicates'):
+                parts.append(f"   Also at: {', '.join(result['duplicates'])}\\n")
+            if result['snippet']:
+                parts.append(f"   {result['snippet']}\\n")
+            parts.append("\\n")
+        return "".join(parts)
+
+    @staticmethod
+    def structured_results(query: str, results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Results as MCP structured content, matching SEARCH_OUTPUT_SCHEMA"""
+        return {
+            "query": query,
+            "results": [
+                {
+                    "position": result['position'],
+                    "title": result['title'],
+                    "url": result['link'],
+                    "snippet": result['snippet'],
+                    **({"duplicates": result['duplicates']} if result.get('duplicates') else {})
+                }
+                for result in results
+            ]
+        }
+
+    @staticmethod
+    def compact_results(results: List[Dict[str, Any]]) -> str:
+        """Short plain-text rendering sent next to structured content"""
+        if not results:
+            return "No search results found."
+        return "\n".join(
+            f"{result['position']}. {result['title']} | {result['link']}"
+            + (f" (also at {', '.join(result['duplicates'])})" if result.get('duplicates') else "")
+            + (f" | {result['snippet']}" if result['snippet'] else "")
+            for result in results
+        )
+
+    async def search_results(self, query: str, max_results: int = 10, wait: bool = None) -> List[Dict[str, Any]]:
+        """Search DuckDuckGo and return the parsed result list"""
+        try:
+            results = await self.cache.get_or_load(
+                self.cache_key(query, max_results),
+                lambda: self._load_results(query, max_results, wait)
+            )
+        except (RateLimitExceeded, UpstreamUnavailable):
+            raise
+        except Exception as e:
+            logger.error(f"Search error: {e}")
+            raise Exception(f"Search failed: {str(e)}")
+
+        # Cached lists stay raw; syndicated copies are collapsed per response
+        results = collapse_near_duplicates(results)
+        if self.prefetcher:
+            self.prefetcher.schedule(results)
+        return results
+
+    async def search_many(self, queries: List[str], max_results: int = 10,
+                          max_concurrency: int = None) -> Dict[str, Any]:
+        """Run several queries concurrently and merge their results by URL.
+
+        Each merged result keeps the position it had in every query that
+        returned it. Results found by more queries rank first, then by best
+        position. Queries that fail are reported in "errors".
+        """
+        semaphore = asyncio.Semaphore(max(1, min(max_concurrency or SEARCH_MANY_CONCURRENCY, len(queries))))
+
+        async def run(query):
+            async with semaphore:
+                try:
+                    return query, await self.search_results(query, max_results), None
+                except Exception as e:
+                    return query, [], e
+
+        outcomes = await asyncio.gather(*(run(query) for query in queries))
+
+        merged: Dict[str, Dict[str, Any]] = {}
+        errors = {}
+        for query, results, error in outcomes:
+            if error is not None:
+                errors[query] = error
+                continue
+            for result in results:
+                entry = merged.setdefault(result['link'], {
+                    'title': result['title'],
+                    'link': result['link'],
+                    'snippet': result['snippet'],
+                    'positions': {}
+                })
+                entry['positions'].setdefault(query, result['position'])
+                if not entry['snippet']:
+                    entry['snippet'] = result['snippet']
+
+        if errors and len(errors) == len(queries):
+            # Nothing succeeded: surface the first failure (keeps retry hints intact)
+            raise next(iter(errors.values()))
+
+        # Collapse in best-first order so the copy kept is the best ranked one
+        ranked = sorted(
+            merged.values(),
+            key=lambda entry: (-len(entry['positions']), min(entry['positions'].values()))
+        )
+        ranked = sorted(
+            collapse_near_duplicates(ranked),
+            key=lambda entry: (-len(entry['positions']), min(entry['positions'].values()))
+        )
+        return {
+            'queries': queries,
+            'results': ranked,
+            'errors': {query: str(error) for query, error in errors.items()}
+        }
+
+    @staticmethod
+    def structured_merged_results(merged: Dict[str, Any]) -> Dict[str, Any]:
+        """search_many output as MCP structured content, matching SEARCH_MANY_OUTPUT_SCHEMA"""
+        return {
+            "queries": merged['queries'],
+            "results": [
+                {
+                    "title": result['title'],
+                    "url": result['link'],
+                    "snippet": result['snippet'],
+                    "positions": result['positions'],
+                    **({"duplicates": result['duplicates']} if result.get('duplicates') else {})
+                }
+                for result in merged['results']
+            ],
+            "errors": merged['errors']
+        }
+
+    @staticmethod
+    def compact_merged_results(merged: Dict[str, Any]) -> str:
+        """Short plain-text rendering of search_many output"""
+        lines = [
+            f"{rank}. {result['title']} | {result['link']}"
+            + (f" (also at {', '.join(result['duplicates'])})" if result.get('duplicates') else "")
+            + (f" | {result['snippet']}" if result['snippet'] else "")
+            for rank, result in enumerate(merged['results'], 1)
+        ] or ["No search results found."]
+        lines.extend(f"Query '{query}' failed: {error}" for query, error in merged['errors'].items())
+        return "\n".join(lines)
 
-class RateLimiter:
-    def __init__(self, requests_per_minute: int = 30):
-        self.requests_per_minute = requests_per_minute
-        self.requests = []
+    @staticmethod
+    def format_merged_results(merged: Dict[str, Any]) -> str:
+        """Format search_many output for LLM consumption"""
+        if not merged['results']:
+            text = "No search results found."
+        else:
+            text = f"Combined search results for {len(merged['queries'])} queries:\\n\\n"
+            for rank, result in enumerate(merged['results'], 1):
+                found_by = ", ".join(f"'{query}' (#{position})" for query, position in result['positions'].items())
+                text += f"{rank}. **{result['title']}**\\n"
+                text += f"   URL: {result['link']}\\n"
+                if result.get('duplicates'):
+                    text += f"   Also at: {', '.join(result['duplicates'])}\\n"
+                text += f"   Found by: {found_by}\\n"
+                if result['snippet']:
+                    text += f"   {result['snippet']}\\n"
+                text += "\\n"
+        for query, error in merged['errors'].items():
+            text += f"Query '{query}' failed: {error}\\n"
+        return text
 
-    async def acquire(self):
-        now = datetime.now()
-        # Remove requests older than 1 minute
-        self.requests = [
-            req for req in self.requests if now - req < timedelta(minutes=1)
-        ]
+    async def _load_results(self, query: str, max_results: int, wait: bool = None) -> List[Dict[str, Any]]:
+        """Read through the persistent store to DuckDuckGo"""
+        if self.store is None:
+            return await self._search_upstream(query, max_results, wait)
 
-        if len(self.requests) >= self.requests_per_minute:
-            # Wait until we can make another request
-            wait_time = 60 - (now - self.requests[0]).total_seconds()
-            if wait_time > 0:
-                logger.info(f"Rate limit reached, waiting {wait_time:.1f} seconds")
-                await asyncio.sleep(wait_time)
+        store_key = json.dumps(self.cache_key(query, max_results))
+        stored = await self.store.get(self.STORE_NAMESPACE, store_key)
+        if stored is not None:
+            logger.info(f"Serving stored results for: {query}")
+            return stored[0]
 
-        self.requests.append(now)
+        results = await self._search_upstream(query, max_results, wait)
+        await self.store.put(self.STORE_NAMESPACE, store_key, results, SEARCH_STORE_TTL_SECONDS)
+        return results
 
-class DuckDuckGoSearcher:
-    BASE_URL = "https://html.duckduckgo.com/html"
-    HEADERS = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
-    }
+    async def warm(self) -> int:
+        """Load the most recently used stored results into the in-memory cache"""
+        if self.store is None:
+            return 0
+        entries = await self.store.recent(self.STORE_NAMESPACE, self.cache.max_entries)
+        now = time.time()
+        for store_key, results, _, expires_at in reversed(entries):
+            self.cache.set(tuple(json.loads(store_key)), results, expires_at - now)
+        return len(entries)
 
-    def __init__(self):
-        self.rate_limiter = RateLimiter(30)  # 30 requests per minute
-        self.client = httpx.AsyncClient(timeout=30.0)
+    async def _search_upstream(self, query: str, max_results: int, wait: bool = None) -> List[Dict[str, Any]]:
+        """Query DuckDuckGo and parse the result page"""
+        params = {
+            'q': query,
+            'kl': 'us-en',
+            's': '0',
+            'dc': str(max_results)
+        }
+
+        # 202 and 403 are DuckDuckGo's bot challenge pages, not results
+        with self.breaker.guard(lambda e: is_upstream_failure(e, self.CHALLENGE_STATUSES)):
+            await admit([self.rate_limiter], wait)
 
-    async def search(self, query: str, max_results: int = 10) -> str:
-        """Search DuckDuckGo and return formatted results"""
-        try:
-            await self.rate_limiter.acquire()
-            
-            params = {
-                'q': query,
-                'kl': 'us-en',
-                's': '0',
-                'dc': str(max_results)
-            }
-            
             logger.info(f"Searching DuckDuckGo for: {query}")
-            
-            response = await self.client.get(
-                self.BASE_URL,
-                params=params,
-                headers=self.HEADERS,
-                follow_redirects=True
-            )
+
+            started = time.perf_counter()
+            status = "error"
+            try:
+                response = await self.client.get(
+                    self.BASE_URL,
+                    params=params,
+                    headers=self.HEADERS,
+                    follow_redirects=True
+                )
+                status = str(response.status_code)
+            finally:
+                UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream="duckduckgo", status=status)
+            UPSTREAM_BYTES.inc(len(response.content), upstream="duckduckgo")
+            if response.status_code in self.CHALLENGE_STATUSES:
+                raise httpx.HTTPStatusError(
+                    f"DuckDuckGo returned a challenge page (HTTP {response.status_code})",
+                    request=response.request, response=response
+                )
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            results = []
-            
-            # Find search result containers
-            result_containers = soup.find_all('div', class_='result')
-            
-            for i, container in enumerate(result_containers[:max_results]):
-                try:
-                    # Extract title and link
-                    title_link = container.find('a', class_='result__a')
-                    if not title_link:
-                        continue
-                    
-                    title = title_link.get_text(strip=True)
-                    link = title_link.get('href', '')
-                    
-                    # Clean up DuckDuckGo redirect URLs
-                    if link.startswith('/l/?uddg='):
-                        link = urllib.parse.unquote(link.split('uddg=')[1])
-                    
-                    # Extract snippet
-                    snippet_elem = container.find('a', class_='result__snippet')
-                    snippet = snippet_elem.get_text(strip=True) if snippet_elem else ""
-                    
-                    if title and link:
-                        results.append({
-                            'position': i + 1,
-                            'title': title,
-                            'link': link,
-                            'snippet': snippet
-                        })
-                        
-                except Exception as e:
-                    logger.warning(f"Error parsing result {i}: {e}")
+
+        results = await parse_pool.run(parse_search_results, response.text, max_results)
+
+        logger.info(f"Found {len(results)} results for query: {query}")
+        return results
+
+def parse_freshness_rules(spec: str) -> Dict[str, float]:
+    rules = {}
+    for item in spec.split(","):
+        if "=" in item:
+            domain, seconds = item.split("=", 1)
+            rules[domain.strip().lower().lstrip(".")] = float(seconds)
+    return rules
+
+class PersistentCache:
+    """SQLite-backed cache tier that survives restarts.
+
+    Values are JSON, zlib-compressed, and stored per namespace with an expiry
+    time (indexed, so expired rows are purged cheaply). When the stored bytes
+    exceed max_bytes the least recently used rows are evicted. SQLite calls
+    run in a worker thread so they never block the event loop; storage
+    errors are logged and treated as misses, never as request failures.
+    """
+
+    PURGE_EVERY = 256
+
+    def __init__(self, path: str = CACHE_STORE_PATH, max_bytes: int = CACHE_STORE_MAX_BYTES,
+                 compression_level: int = CACHE_STORE_COMPRESSION_LEVEL):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._conn = None
+        self._lock = threading.Lock()
+        self.total_bytes = None
+        self.puts_since_purge = 0
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.evictions = 0
+        self.expirations = 0
+        self.errors = 0
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, timeout=5, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, value BLOB NOT NULL, "
+                "size INTEGER NOT NULL, stored_at REAL NOT NULL, expires_at REAL NOT NULL, "
+                "last_access REAL NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_expiry ON cache_entries (expires_at)")
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_access ON cache_entries (namespace, last_access)"
+            )
+            # LRU eviction walks all namespaces by last access
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_entries_lru ON cache_entries (last_access)")
+            self._conn.commit()
+            self.total_bytes = self._conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM cache_entries"
+            ).fetchone()[0]
+        return self._conn
+
+    def _encode(self, value) -> bytes:
+        return zlib.compress(json.dumps(value, separators=(",", ":")).encode("utf-8"), self.compression_level)
+
+    @staticmethod
+    def _decode(blob: bytes):
+        return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+    def _get(self, namespace: str, key: str):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, stored_at, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (namespace, key)
+            ).fetchone()
+            if row is None or row[2] <= now:
+                return None
+            conn.execute(
+                "UPDATE cache_entries SET last_access = ? WHERE namespace = ? AND key = ?",
+                (now, namespace, key)
+            )
+            conn.commit()
+        return self._decode(row[0]), row[1], row[2]
+
+    def _put(self, namespace: str, key: str, value, ttl_seconds: float, stored_at: float = None):
+        now = time.time()
+        stored_at = now if stored_at is None else stored_at
+        blob = self._encode(value)
+        with self._lock:
+            conn = self._connect()
+            previous = conn.execute(
+                "SELECT size FROM cache_entries WHERE namespace = ? AND key = ?", (namespace, key)
+            ).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO cache_entries "
+                "(namespace, key, value, size, stored_at, expires_at, last_access) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, blob, len(blob), stored_at, stored_at + ttl_seconds, now)
+            )
+            self.total_bytes += len(blob) - (previous[0] if previous else 0)
+            self.puts_since_purge += 1
+            if self.puts_since_purge >= self.PURGE_EVERY or self.total_bytes > self.max_bytes:
+                self._purge(conn, now)
+            conn.commit()
+
+    def _purge(self, conn, now: float):
+        """Drop expired rows, then least recently used ones until under the size cap"""
+        self.puts_since_purge = 0
+        self.expirations += conn.execute("DELETE FROM cache_entries WHERE expires_at <= ?", (now,)).rowcount
+        # Other workers may write to the same file, so re-read the real total
+        self.total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache_entries").fetchone()[0]
+        if self.total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * 0.9
+        victims = []
+        for namespace, key, size in conn.execute(
+            "SELECT namespace, key, size FROM cache_entries ORDER BY last_access"
+        ):
+            if self.total_bytes <= target:
+                break
+            victims.append((namespace, key))
+            self.total_bytes -= size
+        conn.executemany("DELETE FROM cache_entries WHERE namespace = ? AND key = ?", victims)
+        self.evictions += len(victims)
+
+    def _touch(self, namespace: str, key: str, ttl_seconds: float):
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "UPDATE cache_entries SET stored_at = ?, expires_at = ?, last_access = ? "
+                "WHERE namespace = ? AND key = ?",
+                (now, now + ttl_seconds, now, namespace, key)
+            )
+            conn.commit()
+
+    def _recent(self, namespace: str, limit: int) -> List[tuple]:
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT key, value, stored_at, expires_at FROM cache_entries "
+                "WHERE namespace = ? AND expires_at > ? ORDER BY last_access DESC LIMIT ?",
+                (namespace, time.time(), limit)
+            ).fetchall()
+        return [(key, self._decode(value), stored_at, expires_at) for key, value, stored_at, expires_at in rows]
+
+    def _counts(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._connect().execute(
+                "SELECT namespace, COUNT(*) FROM cache_entries GROUP BY namespace"
+            ).fetchall())
+
+    async def _run(self, fn, *args, default=None):
+        try:
+            return await asyncio.to_thread(fn, *args)
+        except (sqlite3.Error, zlib.error, ValueError) as e:
+            self.errors += 1
+            logger.warning(f"Cache store error in {fn.__name__}: {e}")
+            return default
+
+    async def get(self, namespace: str, key: str):
+        """Return (value, stored_at, expires_at) or None"""
+        entry = await self._run(self._get, namespace, key)
+        counts = self.hits if entry is not None else self.misses
+        counts[namespace] = counts.get(namespace, 0) + 1
+        return entry
+
+    async def put(self, namespace: str, key: str, value, ttl_seconds: float, stored_at: float = None):
+        if ttl_seconds > 0:
+            await self._run(self._put, namespace, key, value, ttl_seconds, stored_at)
+
+    async def touch(self, namespace: str, key: str, ttl_seconds: float):
+        await self._run(self._touch, namespace, key, ttl_seconds)
+
+    async def recent(self, namespace: str, limit: int) -> List[tuple]:
+        """Most recently used live entries as (key, value, stored_at, expires_at)"""
+        return await self._run(self._recent, namespace, limit, default=[])
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    async def stats(self) -> Dict[str, Any]:
+        # Counting rows scans the table; keep it off the event loop like every other query
+        entries = await self._run(self._counts)
+        return {
+            "path": self.path,
+            "entries": entries,
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": dict(self.hits),
+            "misses": dict(self.misses),
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "errors": self.errors
+        }
+
+class RevalidationStore:
+    """Persistent copy of fetched pages with their HTTP validators.
+
+    Within a page's freshness window it is served without contacting the
+    upstream at all; after that it is revalidated with a conditional GET
+    (If-None-Match / If-Modified-Since) and a 304 reuses the stored text.
+    Pages live in the "page" namespace of the shared PersistentCache; those
+    with validators are retained for retention seconds past their freshness.
+    """
+
+    NAMESPACE = "page"
+
+    def __init__(self, cache: PersistentCache, default_freshness: float = FETCH_FRESHNESS_SECONDS,
+                 rules: str = FETCH_FRESHNESS_RULES, retention: float = FETCH_STORE_RETENTION_SECONDS):
+        self.cache = cache
+        self.default_freshness = default_freshness
+        self.rules = parse_freshness_rules(rules)
+        self.retention = retention
+        self.fresh_hits = 0
+        self.not_modified = 0
+        self.refreshed = 0
+
+    def freshness_for(self, url: str) -> float:
+        host = (urllib.parse.urlsplit(url).hostname or "").lower()
+        while host:
+            if host in self.rules:
+                return self.rules[host]
+            host = host.partition(".")[2]
+        return self.default_freshness
+
+    def is_fresh(self, entry: Dict[str, Any]) -> bool:
+        return time.time() - entry["stored_at"] < self.freshness_for(entry["url"])
+
+    def _ttl(self, url: str, revalidatable: bool) -> float:
+        return self.freshness_for(url) + (self.retention if revalidatable else 0)
+
+    async def get(self, url: str):
+        entry = await self.cache.get(self.NAMESPACE, url)
+        if entry is None:
+            return None
+        value, stored_at, _ = entry
+        return {"url": url, "stored_at": stored_at, **value}
+
+    async def put(self, url: str, text: str, complete: bool, headers, byte_cap: int = None) -> None:
+        etag, last_modified = headers.get("etag"), headers.get("last-modified")
+        await self.cache.put(self.NAMESPACE, url, {
+            "etag": etag,
+            "last_modified": last_modified,
+            "text": text,
+            "complete": complete,
+            "byte_cap": byte_cap
+        }, self._ttl(url, bool(etag or last_modified)))
+
+    async def touch(self, url: str):
+        await self.cache.touch(self.NAMESPACE, url, self._ttl(url, True))
+
+    async def recent(self, limit: int) -> List[Dict[str, Any]]:
+        """Most recently used pages that are still fresh"""
+        pages = []
+        for url, value, stored_at, _ in await self.cache.recent(self.NAMESPACE, limit):
+            entry = {"url": url, "stored_at": stored_at, **value}
+            if self.is_fresh(entry):
+                pages.append(entry)
+        return pages
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "fresh_hits": self.fresh_hits,
+            "not_modified": self.not_modified,
+            "refreshed": self.refreshed,
+            "default_freshness_seconds": self.default_freshness,
+            "retention_seconds": self.retention,
+            "domain_rules": self.rules
+        }
+
+class FetchScheduler:
+    """Politeness scheduler for page fetches.
+
+    At most max_concurrency fetches run at once overall and at most
+    domain_max_concurrency per domain. When slots free up, waiting fetches
+    are granted round-robin by domain, so one busy site cannot starve the
+    others and throughput grows with the number of distinct hosts.
+    """
+
+    def __init__(self, max_concurrency: int = FETCH_MAX_CONCURRENCY,
+                 domain_max_concurrency: int = FETCH_DOMAIN_MAX_CONCURRENCY,
+                 max_queued: int = FETCH_MAX_QUEUED):
+        self.max_concurrency = max(1, max_concurrency)
+        self.domain_max_concurrency = max(1, domain_max_concurrency)
+        self.max_queued = max_queued
+        self.active = 0
+        self.domain_active: Dict[str, int] = {}
+        self.waiting: "OrderedDict[str, deque]" = OrderedDict()
+        self.queued = 0
+        self.granted = 0
+
+    def _has_capacity(self, domain: str) -> bool:
+        return (self.active < self.max_concurrency
+                and self.domain_active.get(domain, 0) < self.domain_max_concurrency)
+
+    def _start(self, domain: str):
+        self.active += 1
+        self.domain_active[domain] = self.domain_active.get(domain, 0) + 1
+        self.granted += 1
+
+    def _release(self, domain: str):
+        self.active -= 1
+        remaining = self.domain_active.get(domain, 1) - 1
+        if remaining:
+            self.domain_active[domain] = remaining
+        else:
+            self.domain_active.pop(domain, None)
+        self._dispatch()
+
+    def _dispatch(self):
+        """Grant free slots to waiting domains in round-robin order"""
+        progressed = True
+        while progressed and self.active < self.max_concurrency:
+            progressed = False
+            for domain in list(self.waiting):
+                queue = self.waiting[domain]
+                if not self._has_capacity(domain):
                     continue
-            
-            # Format results for LLM consumption
-            if not results:
-                return "No search results found."
-            
-            formatted_results = f"Search results for '{query}':\\n\\n"
-            for result in results:
-                formatted_results += f"{result['position']}. **{result['title']}**\\n"
-                formatted_results += f"   URL: {result['link']}\\n"
-                if result['snippet']:
-                    formatted_results += f"   {result['snippet']}\\n"
-                formatted_results += "\\n"
-            
-            logger.info(f"Found {len(results)} results for query: {query}")
-            return formatted_results
-            
-        except Exception as e:
-            logger.error(f"Search error: {e}")
-            raise Exception(f"Search failed: {str(e)}")
+                waiter = queue.popleft()
+                self.queued -= 1
+                if queue:
+                    # Served domains go to the back of the line
+                    self.waiting.move_to_end(domain)
+                else:
+                    del self.waiting[domain]
+                self._start(domain)
+                waiter.set_result(None)
+                progressed = True
+                break
+
+    @asynccontextmanager
+    async def slot(self, domain: str):
+        """Hold a fetch slot for domain for the duration of the block"""
+        started = time.perf_counter()
+        if domain not in self.waiting and self._has_capacity(domain):
+            self._start(domain)
+        else:
+            if self.queued >= self.max_queued:
+                raise RateLimitExceeded("fetch_queue", 1.0)
+            waiter = asyncio.get_running_loop().create_future()
+            self.waiting.setdefault(domain, deque()).append(waiter)
+            self.queued += 1
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Granted just before cancellation: hand the slot on
+                    self._release(domain)
+                else:
+                    queue = self.waiting.get(domain)
+                    if queue is not None and waiter in queue:
+                        queue.remove(waiter)
+                        self.queued -= 1
+                        if not queue:
+                            del self.waiting[domain]
+                raise
+        FETCH_QUEUE_WAIT.observe(time.perf_counter() - started)
+        try:
+            yield
+        finally:
+            self._release(domain)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "domain_max_concurrency": self.domain_max_concurrency,
+            "active": self.active,
+            "queued": self.queued,
+            "granted": self.granted,
+            "active_domains": dict(self.domain_active),
+            "queued_domains": {domain: len(queue) for domain, queue in self.waiting.items()}
+        }
+
+class NotModified(Exception):
+    """Internal signal that a conditional GET returned 304"""
 
 class WebContentFetcher:
-    def __init__(self):
-        self.rate_limiter = RateLimiter(20)  # 20 requests per minute
-        self.client = httpx.AsyncClient(timeout=30.0)
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+    }
+
+    def __init__(self, client: httpx.AsyncClient, store: PersistentCache = None):
+        self.rate_limiter = RateLimiter(FETCH_RATE_LIMIT_PER_MINUTE, FETCH_RATE_LIMIT_BURST, name="fetch")
+        self.host_limiters = HostRateLimiters(FETCH_HOST_RATE_LIMIT_PER_MINUTE, FETCH_HOST_RATE_LIMIT_BURST)
+        self.scheduler = FetchScheduler()
+        self.breakers = HostCircuitBreakers()
+        self.failures = TTLCache(NEGATIVE_CACHE_MAX_ENTRIES, NEGATIVE_CACHE_TTL_SECONDS)
+        self.prefetcher: "Prefetcher" = None
+        self.client = client
+        self.documents = TTLCache(DOCUMENT_CACHE_MAX_ENTRIES, DOCUMENT_CACHE_TTL_SECONDS)
+        self.store = RevalidationStore(store) if store else None
 
-    async def fetch_content(self, url: str) -> str:
-        """Fetch and parse content from a webpage"""
+    async def fetch_content(self, url: str, wait: bool = None, max_chars: int = None,
+                            max_bytes: int = None, stream: bool = None, offset: int = 0) -> str:
+        """Fetch a webpage and return max_chars of its text starting at offset.
+
+        The extracted document is cached, so reading further pages of the
+        same URL costs neither an upstream request nor a re-parse.
+        """
+        max_chars = max_chars or FETCH_MAX_CHARS
+        offset = max(0, offset or 0)
+        joined_prefetch = self.prefetcher is not None and self.prefetcher.claim(url)
         try:
-            await self.rate_limiter.acquire()
-            
-            logger.info(f"Fetching content from: {url}")
-            
-            response = await self.client.get(
-                url,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
-                },
-                follow_redirects=True
-            )
-            response.raise_for_status()
-            
-            soup = BeautifulSoup(response.text, 'html.parser')
-            
-            # Remove script and style elements
-            for script in soup(["script", "style"]):
-                script.decompose()
-            
-            # Get text content
-            text = soup.get_text()
-            
-            # Clean up whitespace
-            lines = (line.strip() for line in text.splitlines())
-            chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-            text = '\\n'.join(chunk for chunk in chunks if chunk)
-            
-            # Truncate if too long
-            if len(text) > 5000:
-                text = text[:5000] + "\\n\\n[Content truncated...]"
-            
-            logger.info(f"Successfully fetched {len(text)} characters from {url}")
-            return text
-            
+            try:
+                document = await self.get_document(url, offset + max_chars, wait, max_bytes, stream)
+            except RateLimitExceeded:
+                if not joined_prefetch:
+                    raise
+                # The prefetch this call joined ran in reject mode; retry under our own wait policy
+                document = await self.get_document(url, offset + max_chars, wait, max_bytes, stream)
+        except (RateLimitExceeded, UpstreamUnavailable):
+            raise
         except Exception as e:
             logger.error(f"Content fetch error: {e}")
             raise Exception(f"Failed to fetch content: {str(e)}")
 
+        return self.render_page(document, offset, max_chars)
+
+    @staticmethod
+    def render_page(document: Dict[str, Any], offset: int, max_chars: int) -> str:
+        text = document["text"]
+        byte_cap = document.get("byte_cap")
+        total = len(text) if document["complete"] else f"at least {len(text)}"
+        if offset and offset >= len(text):
+            if byte_cap:
+                return (f"[No content at offset {offset}; the {byte_cap}-byte download limit ended "
+                        f"the document after {len(text)} characters]")
+            return f"[No content at offset {offset}; document has {total} characters]"
+
+        end = min(offset + max_chars, len(text))
+        page = text[offset:end]
+        if end == len(text) and byte_cap:
+            # Asking for the next offset would only hit the same limit again
+            page += (
+                f"\\n\\n[Content truncated at the {byte_cap}-byte download limit... showing characters "
+                f"{offset}-{end}. Call fetch_content with a larger max_bytes to read further.]"
+            )
+        elif end < len(text) or not document["complete"]:
+            page += (
+                f"\\n\\n[Content truncated... showing characters {offset}-{end} of {total}. "
+                f"Call fetch_content with offset={end} to continue.]"
+            )
+        return page
+
+    async def get_document(self, url: str, min_chars: int, wait: bool = None,
+                           max_bytes: int = None, stream: bool = None) -> Dict[str, Any]:
+        """Return the cached extracted document for url, fetching it if needed.
+
+        Extraction stops after min_chars plus a read-ahead of
+        FETCH_READ_AHEAD_CHARS (at most FETCH_MAX_DOCUMENT_CHARS), so the next
+        page or two is served from cache. A cached copy that was cut short
+        before min_chars is refetched with a larger budget, unless the byte
+        cap cut it and this call allows no more bytes.
+        """
+        budget = max(min_chars, min(min_chars + FETCH_READ_AHEAD_CHARS, FETCH_MAX_DOCUMENT_CHARS))
+        max_bytes = max_bytes or FETCH_MAX_BYTES
+
+        def load():
+            return self._load_document(url, min_chars, budget, wait, max_bytes,
+                                       FETCH_STREAMING if stream is None else stream)
+
+        document = self.documents.get(url)
+        if document is not None and self._too_short(document, min_chars, max_bytes):
+            self.documents.delete(url)
+        document = await self.documents.get_or_load(url, load)
+        if self._too_short(document, min_chars, max_bytes):
+            # Joined a load started for an earlier page; extend it with our budget
+            self.documents.delete(url)
+            document = await self.documents.get_or_load(url, load)
+        return document
+
+    @staticmethod
+    def _too_short(document: Dict[str, Any], min_chars: int, max_bytes: int) -> bool:
+        if document["complete"] or len(document["text"]) >= min_chars:
+            return False
+        # Refetching under the same download limit would end at the same place
+        byte_cap = document.get("byte_cap")
+        return byte_cap is None or max_bytes > byte_cap
+
+    async def _load_document(self, url: str, min_chars: int, budget: int, wait: bool, max_bytes: int,
+                             stream: bool) -> Dict[str, Any]:
+        stored = await self.store.get(url) if self.store else None
+        if stored and self._too_short(stored, min_chars, max_bytes):
+            # The stored copy is too short for this request, fetch in full
+            stored = None
+
+        if stored and self.store.is_fresh(stored):
+            self.store.fresh_hits += 1
+            logger.info(f"Serving fresh stored copy of: {url}")
+            return self._document(url, stored["text"], bool(stored["complete"]), stored.get("byte_cap"))
+
+        failure = self.failures.get(url)
+        if failure is not None:
+            failed_at, reason = failure
+            self.failures.hits += 1
+            CIRCUIT_REJECTIONS.inc(upstream="negative_cache")
+            retry_after = failed_at + self.failures.ttl_seconds - time.monotonic()
+            raise UpstreamUnavailable(url, max(0.0, retry_after), f"recently failed: {reason}")
+
+        host = urllib.parse.urlsplit(url).hostname or ""
+        headers = dict(self.HEADERS)
+        if stored:
+            if stored["etag"]:
+                headers["If-None-Match"] = stored["etag"]
+            if stored["last_modified"]:
+                headers["If-Modified-Since"] = stored["last_modified"]
+
+        try:
+            with self.breakers.get(host).guard(is_upstream_failure):
+                await admit([self.rate_limiter, self.host_limiters.get(host)], wait)
+
+                logger.info(f"Fetching content from: {url}")
+
+                try:
+                    async with self.scheduler.slot(host):
+                        if stream:
+                            text, truncated, byte_capped, response_headers = await self._fetch_streaming(
+                                url, budget, max_bytes, headers)
+                        else:
+                            text, truncated, byte_capped, response_headers = await self._fetch_buffered(
+                                url, budget, headers)
+                except NotModified:
+                    self.store.not_modified += 1
+                    await self.store.touch(url)
+                    logger.info(f"Not modified, reusing stored copy of: {url}")
+                    return self._document(url, stored["text"], bool(stored["complete"]), stored.get("byte_cap"))
+        except LOCAL_ERRORS:
+            raise
+        except Exception as e:
+            self.failures.set(url, (time.monotonic(), str(e) or type(e).__name__))
+            raise
+
+        byte_cap = None
+        if byte_capped:
+            logger.info(f"Stopped reading {url} at the {max_bytes}-byte download limit")
+            if len(text) <= budget:
+                # The text ends where the download did, not at our budget
+                byte_cap = max_bytes
+        text = text[:budget]
+        if self.store:
+            self.store.refreshed += 1
+            await self.store.put(url, text, not truncated, response_headers, byte_cap)
+
+        logger.info(f"Successfully fetched {len(text)} characters from {url}")
+        return self._document(url, text, not truncated, byte_cap)
+
+    async def warm(self) -> int:
+        """Load the most recently used fresh pages into the document cache"""
+        if self.store is None:
+            return 0
+        pages = await self.store.recent(self.documents.max_entries)
+        now = time.time()
+        for page in reversed(pages):
+            remaining = page["stored_at"] + self.store.freshness_for(page["url"]) - now
+            document = self._document(page["url"], page["text"], bool(page["complete"]), page.get("byte_cap"))
+            self.documents.set(page["url"], document, remaining)
+        return len(pages)
+
+    @staticmethod
+    def _document(url: str, text: str, complete: bool, byte_cap: int = None) -> Dict[str, Any]:
+        """byte_cap is the download limit that ended an incomplete text, if that is what did"""
+        return {
+            "url": url,
+            "text": text,
+            "complete": complete,
+            "byte_cap": byte_cap,
+            "fetched_at": datetime.now().isoformat()
+        }
+
+    async def _fetch_buffered(self, url: str, max_chars: int, headers: Dict[str, str]) -> tuple:
+        """Download the whole body, then extract its text"""
+        started = time.perf_counter()
+        status = "error"
+        try:
+            response = await self.client.get(url, headers=headers, follow_redirects=True)
+            status = str(response.status_code)
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream="fetch", status=status)
+        UPSTREAM_BYTES.inc(len(response.content), upstream="fetch")
+        if response.status_code == 304:
+            raise NotModified()
+        response.raise_for_status()
+
+        text = await parse_pool.run(extract_page_text, response.text)
+        return text, len(text) > max_chars, False, response.headers
+
+    async def _fetch_streaming(self, url: str, max_chars: int, max_bytes: int,
+                               headers: Dict[str, str]) -> tuple:
+        """Read the body in chunks, extracting text until either budget is spent.
+
+        The content type is checked before any of the body is read, and the
+        connection is dropped as soon as max_chars of text or max_bytes of
+        body have been consumed. Returns (text, truncated, byte_capped,
+        headers); byte_capped is set when the body was longer than max_bytes.
+        """
+        started = time.perf_counter()
+        status = "error"
+        bytes_read = 0
+        try:
+            async with self.client.stream("GET", url, headers=headers, follow_redirects=True) as response:
+                status = str(response.status_code)
+                if response.status_code == 304:
+                    raise NotModified()
+                response.raise_for_status()
+
+                mime_type = response.headers.get("content-type", "").split(";")[0].strip().lower()
+                if mime_type and mime_type not in FETCH_ALLOWED_CONTENT_TYPES:
+                    raise Exception(f"Unsupported content type: {mime_type}")
+
+                try:
+                    decoder = codecs.getincrementaldecoder(response.charset_encoding or "utf-8")(errors="replace")
+                except LookupError:
+                    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                extractor = StreamingTextExtractor(max_chars, is_html=mime_type != "text/plain")
+
+                # Any early exit leaves part of the body unread, so the text is partial
+                truncated = byte_capped = False
+                async for chunk in response.aiter_bytes(FETCH_STREAM_CHUNK_SIZE):
+                    if bytes_read + len(chunk) > max_bytes:
+                        chunk = chunk[:max_bytes - bytes_read]
+                        truncated = byte_capped = True
+                    bytes_read += len(chunk)
+                    await parse_pool.run_threaded(extractor.feed, decoder.decode(chunk))
+                    if byte_capped or extractor.full:
+                        truncated = True
+                        break
+                else:
+                    extractor.feed(decoder.decode(b"", final=True))
+        finally:
+            UPSTREAM_DURATION.observe(time.perf_counter() - started, upstream="fetch", status=status)
+            UPSTREAM_BYTES.inc(bytes_read, upstream="fetch")
+
+        extractor.close()
+        logger.debug(f"Read {bytes_read} bytes from {url}")
+        return extractor.text(), truncated or extractor.length > max_chars, byte_capped, response.headers
+
+class Prefetcher:
+    """Warms the document cache with the top search hits in the background.
+
+    Agents usually fetch a few of the first results right after a search, one
+    turn at a time; prefetching them means those calls are served from the
+    cache. Prefetches go through the normal fetch path (per-domain scheduler,
+    rate limits, circuit breakers) in reject mode, so they only use budget that
+    is free right now and never wait for it.
+    """
+
+    def __init__(self, fetcher: WebContentFetcher, top_k: int = PREFETCH_TOP_K,
+                 max_inflight: int = PREFETCH_MAX_INFLIGHT):
+        self.fetcher = fetcher
+        self.top_k = top_k
+        self.max_inflight = max(1, max_inflight)
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # Prefetched URLs not yet asked for, to measure how often prefetching pays off
+        self.unclaimed: "OrderedDict[str, None]" = OrderedDict()
+        self.counts = {"scheduled": 0, "skipped": 0, "dropped": 0,
+                       "completed": 0, "failed": 0, "used": 0}
+        fetcher.prefetcher = self
+
+    def _count(self, outcome: str):
+        self.counts[outcome] += 1
+        PREFETCHES.inc(outcome=outcome)
+
+    def schedule(self, results: List[Dict[str, Any]]):
+        """Start background fetches for the first top_k result links"""
+        for result in results[:self.top_k]:
+            url = result.get("link") or ""
+            if not url.startswith(("http://", "https://")) or url in self.tasks:
+                continue
+            if (urllib.parse.urlsplit(url).hostname or "").endswith("duckduckgo.com"):
+                # Sponsored results are click-tracking redirects, not documents
+                continue
+            if self.fetcher.documents.get(url) is not None or self.fetcher.failures.get(url) is not None:
+                self._count("skipped")
+                continue
+            if len(self.tasks) >= self.max_inflight:
+                self._count("dropped")
+                continue
+            self._count("scheduled")
+            self.tasks[url] = asyncio.create_task(self._prefetch(url))
+
+    async def _prefetch(self, url: str):
+        try:
+            await self.fetcher.get_document(url, FETCH_MAX_CHARS, wait=False)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._count("failed")
+            logger.debug(f"Prefetch of {url} skipped: {e}")
+        else:
+            self._count("completed")
+            self.unclaimed[url] = None
+            while len(self.unclaimed) > self.fetcher.documents.max_entries:
+                self.unclaimed.popitem(last=False)
+        finally:
+            self.tasks.pop(url, None)
+
+    def claim(self, url: str) -> bool:
+        """Note that a fetch asked for url and count a hit if it was prefetched.
+
+        Returns True when the prefetch is still in flight, i.e. the fetch will
+        join it rather than start its own.
+        """
+        inflight = url in self.tasks
+        if inflight or url in self.unclaimed:
+            self.unclaimed.pop(url, None)
+            self._count("used")
+        return inflight
+
+    async def close(self):
+        tasks = list(self.tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "top_k": self.top_k,
+            "max_inflight": self.max_inflight,
+            "inflight": len(self.tasks),
+            **self.counts
+        }
+
 # Global instances
-searcher = DuckDuckGoSearcher()
-fetcher = WebContentFetcher()
+parse_pool = ParsePool()
+upstream_client = create_upstream_client()
+cache_store = PersistentCache() if CACHE_STORE_PATH else None
+fetcher = WebContentFetcher(upstream_client, cache_store)
+prefetcher = Prefetcher(fetcher) if PREFETCH_TOP_K > 0 else None
+searcher = DuckDuckGoSearcher(upstream_client, prefetcher, cache_store)
 
 # Metrics tracking
 request_count = 0
@@ -203,22 +2617,44 @@ error_count = 0
 
 @app.middleware("http")
 async def track_requests(request, call_next):
-    global request_count
+    global request_count, error_count
     request_count += 1
+    HTTP_IN_FLIGHT.inc()
+    started = time.perf_counter()
+    status = 500
     
     try:
         response = await call_next(request)
+        status = response.status_code
         return response
-    except Exception as e:
-        global error_count
-        error_count += 1
-        raise
+    finally:
+        if status >= 500:
+            error_count += 1
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_IN_FLIGHT.dec()
+        HTTP_DURATION.observe(time.perf_counter() - started, path=path)
+        HTTP_REQUESTS.inc(method=request.method, path=path, status=status)
+
+@app.on_event("startup")
+async def startup_event():
+    """Start the parse pool and warm the in-memory caches from the persistent store"""
+    if parse_pool.kind != "inline":
+        parse_pool.start()
+    if cache_store and CACHE_STORE_WARM_ON_START:
+        searches, pages = await searcher.warm(), await fetcher.warm()
+        logger.info(f"Warmed caches from {cache_store.path}: {searches} searches, {pages} pages")
 
 @app.on_event("shutdown")
 async def shutdown_event():
     """Clean up on shutdown"""
-    await searcher.client.aclose()
-    await fetcher.client.aclose()
+    if prefetcher:
+        await prefetcher.close()
+    await upstream_client.aclose()
+    # Joining workers blocks; keep the loop free for the connections still draining
+    await asyncio.to_thread(parse_pool.shutdown)
+    if cache_store:
+        cache_store.close()
     logger.info("MCP server shutdown complete")
 
 @app.get("/")
@@ -234,7 +2670,8 @@ async def root():
             "search": "/search (POST) - Direct search endpoint",
             "fetch": "/fetch (POST) - Direct content fetch endpoint",
             "tools": "/tools (GET) - List available tools",
-            "metrics": "/metrics (GET) - Server metrics"
+            "metrics": "/metrics (GET) - Server metrics",
+            "prometheus": "/metrics/prometheus (GET) - Prometheus metrics"
         },
         "kubernetes_ready": True
     }
@@ -242,9 +2679,18 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Health check endpoint for Kubernetes"""
+    # Open circuits degrade results but the server itself keeps serving, so
+    # they are reported rather than failing the probe
     return {
         "status": "healthy",
         "server": "operational",
+        "upstream_circuits": {
+            "search": searcher.breaker.state,
+            "fetch_hosts_not_closed": sorted(
+                host for host, breaker in fetcher.breakers.breakers.items()
+                if breaker.state != CircuitBreaker.CLOSED
+            )
+        },
         "timestamp": datetime.now().isoformat()
     }
 
@@ -255,12 +2701,157 @@ async def metrics():
         "requests_total": request_count,
         "errors_total": error_count,
         "uptime_seconds": (datetime.now() - start_time).total_seconds(),
+        "worker_pid": os.getpid(),
         "rate_limits": {
-            "search_requests_in_window": len(searcher.rate_limiter.requests),
-            "fetch_requests_in_window": len(fetcher.rate_limiter.requests)
+            "mode": RATE_LIMIT_MODE,
+            "backend": rate_limit_backend.name,
+            "search": searcher.rate_limiter.stats(),
+            "fetch": fetcher.rate_limiter.stats(),
+            "fetch_hosts": fetcher.host_limiters.stats()
+        },
+        "search_cache": searcher.cache.stats(),
+        "document_cache": fetcher.documents.stats(),
+        "cache_store": await cache_store.stats() if cache_store else None,
+        "fetch_store": fetcher.store.stats() if fetcher.store else None,
+        "fetch_scheduler": fetcher.scheduler.stats(),
+        "prefetch": prefetcher.stats() if prefetcher else None,
+        "circuit_breakers": {
+            "search": searcher.breaker.stats(),
+            "fetch_hosts": fetcher.breakers.stats()
+        },
+        "negative_cache": {
+            key: value for key, value in fetcher.failures.stats().items()
+            if key in ("entries", "max_entries", "ttl_seconds", "hits", "evictions")
+        },
+        "parse_pool": parse_pool.stats(),
+        "upstream_mode": (
+            upstream_client.upstream_transport.archive_stats()
+            if isinstance(upstream_client.upstream_transport, RecordReplayTransport) else {"mode": "live"}
+        ),
+        "upstream_pool": {
+            "http2": HTTP2_ENABLED,
+            **upstream_client.upstream_transport.stats(),
+            "dns_cache": upstream_client.dns_backend.stats()
         }
     }
 
+def collect_cache_metrics():
+    for name, cache in (("search", searcher.cache), ("document", fetcher.documents)):
+        stats = cache.stats()
+        CACHE_LOOKUPS.set_total(stats["hits"], cache=name, result="hit")
+        CACHE_LOOKUPS.set_total(stats["misses"], cache=name, result="miss")
+        CACHE_LOOKUPS.set_total(stats["coalesced"], cache=name, result="coalesced")
+        CACHE_HIT_RATIO.set(stats["hit_ratio"], cache=name)
+        CACHE_ENTRIES.set(stats["entries"], cache=name)
+    if cache_store:
+        for namespace in set(cache_store.hits) | set(cache_store.misses):
+            hits, misses = cache_store.hits.get(namespace, 0), cache_store.misses.get(namespace, 0)
+            CACHE_LOOKUPS.set_total(hits, cache=f"store_{namespace}", result="hit")
+            CACHE_LOOKUPS.set_total(misses, cache=f"store_{namespace}", result="miss")
+            CACHE_HIT_RATIO.set(hits / (hits + misses), cache=f"store_{namespace}")
+        if cache_store.total_bytes is not None:
+            CACHE_STORE_BYTES.set(cache_store.total_bytes)
+
+def collect_circuit_metrics():
+    # Rebuilt each scrape so breakers dropped for idle hosts disappear
+    CIRCUIT_STATE.values.clear()
+    for breaker in [searcher.breaker, *fetcher.breakers.breakers.values()]:
+        CIRCUIT_STATE.set(CircuitBreaker.STATE_VALUES[breaker.state], upstream=breaker.name)
+    CACHE_ENTRIES.set(fetcher.failures.stats()["entries"], cache="negative")
+
+def collect_pool_metrics():
+    FETCH_SLOTS.set(fetcher.scheduler.active, state="active")
+    FETCH_SLOTS.set(fetcher.scheduler.queued, state="queued")
+    pool = upstream_client.upstream_transport.stats()
+    UPSTREAM_POOL_CONNECTIONS.set(pool["active"], state="active")
+    UPSTREAM_POOL_CONNECTIONS.set(pool["idle"], state="idle")
+    UPSTREAM_POOL_UTILIZATION.set(pool["utilization"])
+    dns = upstream_client.dns_backend.stats()
+    CACHE_LOOKUPS.set_total(dns["hits"], cache="dns", result="hit")
+    CACHE_LOOKUPS.set_total(dns["misses"], cache="dns", result="miss")
+    CACHE_HIT_RATIO.set(dns["hit_ratio"], cache="dns")
+    CACHE_ENTRIES.set(dns["entries"], cache="dns")
+
+metrics_registry.collectors.append(collect_cache_metrics)
+metrics_registry.collectors.append(collect_pool_metrics)
+metrics_registry.collectors.append(collect_circuit_metrics)
+
+@app.get("/metrics/prometheus")
+async def prometheus_metrics():
+    """Metrics in the Prometheus text exposition format"""
+    return Response(
+        content=metrics_registry.render(),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+SEARCH_RESULT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "title": {"type": "string"},
+        "url": {"type": "string"},
+        "snippet": {"type": "string"},
+        "duplicates": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "URLs of near-identical copies collapsed into this result"
+        }
+    },
+    "required": ["title", "url", "snippet"]
+}
+
+SEARCH_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "query": {"type": "string"},
+        "results": {
+            "type": "array",
+            "items": {
+                **SEARCH_RESULT_SCHEMA,
+                "properties": {**SEARCH_RESULT_SCHEMA["properties"], "position": {"type": "integer"}},
+                "required": ["position", "title", "url", "snippet"]
+            }
+        }
+    },
+    "required": ["query", "results"]
+}
+
+SEARCH_MANY_OUTPUT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "queries": {"type": "array", "items": {"type": "string"}},
+        "results": {
+            "type": "array",
+            "items": {
+                **SEARCH_RESULT_SCHEMA,
+                "properties": {
+                    **SEARCH_RESULT_SCHEMA["properties"],
+                    "positions": {
+                        "type": "object",
+                        "additionalProperties": {"type": "integer"},
+                        "description": "Position of this URL in each query that returned it"
+                    }
+                },
+                "required": ["title", "url", "snippet", "positions"]
+            }
+        },
+        "errors": {"type": "object", "additionalProperties": {"type": "string"}}
+    },
+    "required": ["queries", "results", "errors"]
+}
+
+STRUCTURED_ARGUMENT = {
+    "type": "boolean",
+    "default": SEARCH_STRUCTURED_DEFAULT,
+    "description": "Send a compact text rendering instead of the markdown block; structured content is always included"
+}
+
+def tool_result(text: str, structured: Dict[str, Any] = None) -> Dict[str, Any]:
+    """Build an MCP tools/call result, optionally carrying structured content"""
+    result = {"content": [{"type": "text", "text": text}]}
+    if structured is not None:
+        result["structuredContent"] = structured
+    return result
+
 @app.get("/tools")
 async def list_tools():
     """List available MCP tools"""
@@ -273,10 +2864,32 @@ async def list_tools():
                     "type": "object",
                     "properties": {
                         "query": {"type": "string", "description": "Search query"},
-                        "max_results": {"type": "integer", "default": 10, "description": "Maximum results"}
+                        "max_results": {"type": "integer", "default": 10, "description": "Maximum results"},
+                        "structured": STRUCTURED_ARGUMENT
                     },
                     "required": ["query"]
-                }
+                },
+                "outputSchema": SEARCH_OUTPUT_SCHEMA
+            },
+            {
+                "name": "search_many",
+                "description": "Run several related searches at once and return merged results, deduplicated by URL",
+                "inputSchema": {
+                    "type": "object",
+                    "properties": {
+                        "queries": {
+                            "type": "array",
+                            "items": {"type": "string"},
+                            "maxItems": SEARCH_MANY_MAX_QUERIES,
+                            "description": "Search queries"
+                        },
+                        "max_results": {"type": "integer", "default": 10, "description": "Maximum results per query"},
+                        "max_concurrency": {"type": "integer", "default": SEARCH_MANY_CONCURRENCY, "description": "Queries run at the same time"},
+                        "structured": STRUCTURED_ARGUMENT
+                    },
+                    "required": ["queries"]
+                },
+                "outputSchema": SEARCH_MANY_OUTPUT_SCHEMA
             },
             {
                 "name": "fetch_content",
@@ -284,7 +2897,10 @@ async def list_tools():
                 "inputSchema": {
                     "type": "object",
                     "properties": {
-                        "url": {"type": "string", "description": "URL to fetch content from"}
+                        "url": {"type": "string", "description": "URL to fetch content from"},
+                        "offset": {"type": "integer", "default": 0, "description": "Character offset to start reading from, for paging through long documents"},
+                        "max_chars": {"type": "integer", "default": FETCH_MAX_CHARS, "description": "Maximum characters of text to return (page size)"},
+                        "max_bytes": {"type": "integer", "default": FETCH_MAX_BYTES, "description": "Maximum bytes of the page body to download"}
                     },
                     "required": ["url"]
                 }
@@ -293,21 +2909,128 @@ async def list_tools():
     }
 
 @app.post("/mcp")
-async def mcp_endpoint(request: Dict[str, Any]):
-    """MCP JSON-RPC endpoint"""
+async def mcp_endpoint(request: Union[Dict[str, Any], List[Any]]):
+    """MCP JSON-RPC endpoint, accepting a single request or a JSON-RPC 2.0 batch"""
+    if not isinstance(request, list):
+        return await handle_mcp_message(request)
+
+    if not request or len(request) > MCP_BATCH_MAX_SIZE:
+        return {
+            "jsonrpc": "2.0",
+            "id": None,
+            "error": {
+                "code": -32600,
+                "message": f"Batch must contain between 1 and {MCP_BATCH_MAX_SIZE} requests"
+            }
+        }
+
+    # Entries run concurrently; the rate limiters still pace upstream calls
+    semaphore = asyncio.Semaphore(MCP_BATCH_MAX_CONCURRENCY)
+
+    async def run_entry(message):
+        if not isinstance(message, dict):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+        async with semaphore:
+            response = await handle_mcp_message(message)
+        # Notifications (no id) never produce a response entry
+        return response if "id" in message else None
+
+    responses = await asyncio.gather(*(run_entry(message) for message in request))
+    fetches = sum(1 for message in request if isinstance(message, dict) and tool_name(message) == "fetch_content")
+    if DEDUP_ENABLED and fetches > 1:
+        try:
+            # Hashing page text is CPU work; keep it off the event loop
+            await parse_pool.run_threaded(collapse_duplicate_fetches, request, responses)
+        except ParsePoolSaturated:
+            logger.warning("Parse pool saturated, returning batch without duplicate collapsing")
+    responses = [response for response in responses if response is not None]
+    if not responses:
+        return Response(status_code=204)
+    return responses
+
+def collapse_duplicate_fetches(messages: List[Any], responses: List[Any]):
+    """Replace fetch_content results in a batch that near-duplicate an earlier entry's text.
+
+    Mirrored pages come back nearly identical; the later copies are swapped
+    for a short pointer to the entry that carries the text.
+    """
+    if not DEDUP_ENABLED:
+        return
+    index = SimHashIndex()
+    for message, response in zip(messages, responses):
+        if not isinstance(message, dict) or not isinstance(response, dict) or "result" not in response:
+            continue
+        if message.get("method") != "tools/call" or tool_name(message) != "fetch_content":
+            continue
+        arguments = message["params"].get("arguments")
+        url = arguments.get("url") if isinstance(arguments, dict) else None
+        content = response["result"].get("content") or []
+        if not content or content[0].get("type") != "text":
+            continue
+        fingerprint = simhash(content[0]["text"])
+        if fingerprint is None:
+            continue
+        original = index.find(fingerprint)
+        if original is None:
+            index.add(fingerprint, (response.get("id"), url))
+            continue
+        original_id, original_url = original
+        content[0]["text"] = (
+            f"[Near-duplicate of {original_url} (request id {original_id} in this batch); "
+            f"content omitted. Source: {url}]"
+        )
+
+# Newest first; outputSchema and structuredContent arrived in 2025-06-18
+MCP_PROTOCOL_VERSIONS = ("2025-06-18", "2025-03-26", "2024-11-05")
+
+MCP_METHODS = {"initialize", "initialized", "notifications/initialized", "tools/list", "tools/call"}
+MCP_TOOLS = {"search", "search_many", "fetch_content"}
+
+def tool_name(message: Dict[str, Any]):
+    """Tool named by a tools/call message, or None (params may be malformed)"""
+    params = message.get("params")
+    return params.get("name") if isinstance(params, dict) else None
+
+async def handle_mcp_message(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Dispatch one JSON-RPC message, recording per-method and per-tool latency"""
+    started = time.perf_counter()
+    response = await dispatch_mcp_message(request)
+    elapsed = time.perf_counter() - started
+
+    outcome = "error" if isinstance(response, dict) and "error" in response else "ok"
+    method = request.get("method")
+    RPC_DURATION.observe(elapsed, method=method if method in MCP_METHODS else "unknown", outcome=outcome)
+    if method == "tools/call":
+        tool = tool_name(request)
+        TOOL_DURATION.observe(elapsed, tool=tool if tool in MCP_TOOLS else "unknown", outcome=outcome)
+    return response
+
+async def dispatch_mcp_message(request: Dict[str, Any]) -> Dict[str, Any]:
+    """Dispatch one JSON-RPC message and build its response"""
     try:
         method = request.get("method")
-        params = request.get("params", {})
+        params = request.get("params") or {}
         request_id = request.get("id")
         
         logger.debug(f"MCP request: {method}")
         
+        # No MCP method takes positional (array) params
+        if not isinstance(params, dict):
+            return {
+                "jsonrpc": "2.0",
+                "id": request_id,
+                "error": {"code": -32602, "message": "Invalid params: expected an object"}
+            }
+        
         if method == "initialize":
+            # Agree on the client's version if we speak it, otherwise offer our newest
+            requested = params.get("protocolVersion")
+            version = requested if requested in MCP_PROTOCOL_VERSIONS else MCP_PROTOCOL_VERSIONS[0]
             return {
                 "jsonrpc": "2.0",
                 "id": request_id,
                 "result": {
-                    "protocolVersion": "2024-11-05",
+                    "protocolVersion": version,
                     "capabilities": {
                         "tools": {"listChanged": False},
                         "resources": {"subscribe": False, "listChanged": False},
@@ -320,7 +3043,7 @@ async def mcp_endpoint(request: Dict[str, Any]):
                 }
             }
         
-        elif method == "initialized":
+        elif method in ("initialized", "notifications/initialized"):
             # Notification, no response needed
             return {"status": "ok"}
         
@@ -333,32 +3056,79 @@ async def mcp_endpoint(request: Dict[str, Any]):
             }
         
         elif method == "tools/call":
-            tool_name = params.get("name")
-            arguments = params.get("arguments", {})
+            name = params.get("name")
+            arguments = params.get("arguments")
+            if arguments is None:
+                arguments = {}
+            
+            if not isinstance(arguments, dict):
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "error": {"code": -32602, "message": "Invalid params: arguments must be an object"}
+                }
             
-            if tool_name == "search":
+            if name == "search":
                 query = arguments.get("query")
                 max_results = arguments.get("max_results", 10)
                 
                 if not query:
                     raise HTTPException(status_code=400, detail="Query parameter is required")
                 
-                result = await searcher.search(query, max_results)
+                results = await searcher.search_results(query, max_results)
+                # The tool declares an outputSchema, so structured content is always sent
+                result = tool_result(
+                    searcher.compact_results(results)
+                    if arguments.get("structured", SEARCH_STRUCTURED_DEFAULT)
+                    else searcher.format_results(query, results),
+                    searcher.structured_results(query, results)
+                )
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
-                    "result": {
-                        "content": [{"type": "text", "text": result}]
-                    }
+                    "result": result
+                }
+            
+            elif name == "search_many":
+                queries = [q for q in arguments.get("queries") or [] if isinstance(q, str) and q.strip()]
+                
+                if not queries:
+                    raise HTTPException(status_code=400, detail="Queries parameter is required")
+                if len(queries) > SEARCH_MANY_MAX_QUERIES:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"At most {SEARCH_MANY_MAX_QUERIES} queries are allowed"
+                    )
+                
+                merged = await searcher.search_many(
+                    queries,
+                    arguments.get("max_results", 10),
+                    arguments.get("max_concurrency")
+                )
+                result = tool_result(
+                    searcher.compact_merged_results(merged)
+                    if arguments.get("structured", SEARCH_STRUCTURED_DEFAULT)
+                    else searcher.format_merged_results(merged),
+                    searcher.structured_merged_results(merged)
+                )
+                return {
+                    "jsonrpc": "2.0",
+                    "id": request_id,
+                    "result": result
                 }
             
-            elif tool_name == "fetch_content":
+            elif name == "fetch_content":
                 url = arguments.get("url")
                 
                 if not url:
                     raise HTTPException(status_code=400, detail="URL parameter is required")
                 
-                result = await fetcher.fetch_content(url)
+                result = await fetcher.fetch_content(
+                    url,
+                    offset=arguments.get("offset", 0),
+                    max_chars=arguments.get("max_chars"),
+                    max_bytes=arguments.get("max_bytes")
+                )
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
@@ -371,7 +3141,7 @@ async def mcp_endpoint(request: Dict[str, Any]):
                 return {
                     "jsonrpc": "2.0",
                     "id": request_id,
-                    "error": {"code": -32601, "message": f"Unknown tool: {tool_name}"}
+                    "error": {"code": -32601, "message": f"Unknown tool: {name}"}
                 }
         
         else:
@@ -381,6 +3151,28 @@ async def mcp_endpoint(request: Dict[str, Any]):
                 "error": {"code": -32601, "message": f"Unknown method: {method}"}
             }
             
+    except UpstreamUnavailable as e:
+        logger.warning(f"MCP request failed fast: {e}")
+        return {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "error": {
+                "code": -32030,
+                "message": str(e),
+                "data": {"upstream": e.upstream, "retry_after": round(e.retry_after, 3)}
+            }
+        }
+    except RateLimitExceeded as e:
+        logger.warning(f"MCP request rejected: {e}")
+        return {
+            "jsonrpc": "2.0",
+            "id": request.get("id"),
+            "error": {
+                "code": -32029,
+                "message": str(e),
+                "data": {"limiter": e.limiter, "retry_after": round(e.retry_after, 3)}
+            }
+        }
     except Exception as e:
         logger.error(f"Error in MCP endpoint: {e}")
         return {
@@ -389,6 +3181,14 @@ async def mcp_endpoint(request: Dict[str, Any]):
             "error": {"code": -32603, "message": str(e)}
         }
 
+def rate_limit_http_error(e: Union[RateLimitExceeded, UpstreamUnavailable]) -> HTTPException:
+    """Translate a rejected admission into a 429 (or 503 for a failing upstream) with a Retry-After header"""
+    return HTTPException(
+        status_code=503 if isinstance(e, UpstreamUnavailable) else 429,
+        detail=str(e),
+        headers={"Retry-After": str(max(1, int(e.retry_after + 0.999)))}
+    )
+
 @app.post("/search")
 async def search_endpoint(request: Dict[str, Any]):
     """Direct search endpoint"""
@@ -399,9 +3199,18 @@ async def search_endpoint(request: Dict[str, Any]):
         if not query:
             raise HTTPException(status_code=400, detail="Query parameter is required")
         
+        if request.get("structured", SEARCH_STRUCTURED_DEFAULT):
+            results = await searcher.search_results(query, max_results)
+            return {
+                "result": searcher.compact_results(results),
+                **searcher.structured_results(query, results)
+            }
+        
         result = await searcher.search(query, max_results)
         return {"result": result}
         
+    except (RateLimitExceeded, UpstreamUnavailable) as e:
+        raise rate_limit_http_error(e)
     except Exception as e:
         logger.error(f"Error in search endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -415,9 +3224,16 @@ async def fetch_content_endpoint(request: Dict[str, Any]):
         if not url:
             raise HTTPException(status_code=400, detail="URL parameter is required")
         
-        result = await fetcher.fetch_content(url)
+        result = await fetcher.fetch_content(
+            url,
+            offset=request.get("offset", 0),
+            max_chars=request.get("max_chars"),
+            max_bytes=request.get("max_bytes")
+        )
         return {"result": result}
         
+    except (RateLimitExceeded, UpstreamUnavailable) as e:
+        raise rate_limit_http_error(e)
     except Exception as e:
         logger.error(f"Error in fetch endpoint: {e}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -428,8 +3244,17 @@ start_time = datetime.now()
 if __name__ == "__main__":
     port = int(os.getenv("PORT", 8081))
     host = os.getenv("HOST", "0.0.0.0")
+    workers = int(os.getenv("WORKERS", "1"))
     
     logger.info(f"Starting Standalone DuckDuckGo MCP Server on {host}:{port}")
     logger.info("Kubernetes-ready with health checks and metrics")
     
-    uvicorn.run(app, host=host, port=port, log_level=log_level.lower())
+    if workers > 1:
+        if RATE_LIMIT_BACKEND == "local":
+            logger.warning(
+                f"Running {workers} workers with local rate limit buckets; "
+                "upstream traffic will be multiplied. Set RATE_LIMIT_BACKEND=shm or redis."
+            )
+        uvicorn.run("standalone_mcp_server:app", host=host, port=port, workers=workers, log_level=log_level.lower())
+    else:
+        uvicorn.run(app, host=host, port=port, log_level=log_level.lower())
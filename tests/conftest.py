@@ -0,0 +1,82 @@
+import os
+import sys
+from pathlib import Path
+
+import httpx
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+FIXTURES = ROOT / "benchmarks" / "fixtures" / "duckduckgo"
+
+# The server reads its configuration at import time: keep the tests offline,
+# in-process and free of state left behind on disk
+os.environ.setdefault("PARSE_POOL_KIND", "inline")
+os.environ.setdefault("CACHE_STORE_PATH", "")
+os.environ.setdefault("RATE_LIMIT_BACKEND", "local")
+os.environ.setdefault("UPSTREAM_MODE", "live")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+# Tests build their own limiters when they exercise rate limiting
+for name in ("SEARCH", "FETCH", "FETCH_HOST"):
+    os.environ.setdefault(f"{name}_RATE_LIMIT_PER_MINUTE", "60000")
+    os.environ.setdefault(f"{name}_RATE_LIMIT_BURST", "1000")
+
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "hackathon-dapr" / "harvester-insights-agent"))
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+class Upstream:
+    """httpx.MockTransport handler that records every request it serves"""
+
+    def __init__(self, handler):
+        self.handler = handler
+        self.requests = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        self.requests.append(request)
+        return self.handler(request)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(transport=httpx.MockTransport(self))
+
+
+@pytest.fixture
+def make_fetcher():
+    """Build a WebContentFetcher whose upstream is the given handler"""
+    from standalone_mcp_server import WebContentFetcher
+
+    def make(handler, store=None):
+        upstream = Upstream(handler)
+        fetcher = WebContentFetcher(upstream.client(), store)
+        return fetcher, upstream
+
+    return make
+
+
+def web(request: httpx.Request) -> httpx.Response:
+    """A small internet: DuckDuckGo answers with a saved result page, any other
+    host with a page naming its URL"""
+    if request.url.host == "html.duckduckgo.com":
+        page = (FIXTURES / "gdpr_requirements.html").read_text(encoding="utf-8")
+        return httpx.Response(200, text=page, headers={"content-type": "text/html"})
+    return httpx.Response(200, text=f"<p>Page at {request.url}</p>", headers={"content-type": "text/html"})
+
+
+@pytest.fixture
+def mcp(monkeypatch):
+    """TestClient for the server app with its searcher and fetcher on the fake web"""
+    from fastapi.testclient import TestClient
+
+    import standalone_mcp_server as server
+
+    upstream = Upstream(web)
+    client = upstream.client()
+    monkeypatch.setattr(server, "fetcher", server.WebContentFetcher(client))
+    monkeypatch.setattr(server, "searcher", server.DuckDuckGoSearcher(client))
+    test_client = TestClient(server.app)
+    test_client.upstream = upstream
+    return test_client
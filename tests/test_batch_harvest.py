@@ -0,0 +1,172 @@
+import asyncio
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+import harvester_agent
+from harvester_agent import EnhancedHarvesterAgent, InsightRequest, MCPUnavailable, SharedResearch
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeMCP:
+    """Stands in for MCPClientPool: records each search and how many overlap"""
+
+    def __init__(self, delay=0.01):
+        self.delay = delay
+        self.queries = []
+        self.failing = set()
+        self.in_flight = 0
+        self.peak = 0
+        self.tools = {}
+
+    async def call_tool(self, name, arguments):
+        self.queries.append(arguments)
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+            if any(word in arguments["query"] for word in self.failing):
+                raise MCPUnavailable("All MCP server replicas are backing off after failures")
+            return f"Results for {arguments['query']}"
+        finally:
+            self.in_flight -= 1
+
+
+@pytest.fixture
+def agent(monkeypatch):
+    agent = EnhancedHarvesterAgent()
+    agent.mcp_client = FakeMCP()
+    monkeypatch.setattr(harvester_agent, "harvester_agent", agent)
+    return agent
+
+
+@pytest.fixture
+def client():
+    return TestClient(harvester_agent.app)
+
+
+def company(name, framework="GDPR", industry="Retail", **fields):
+    return {"framework": framework, "company_name": name, "industry": industry, **fields}
+
+
+def run_batch(client, requests, **options):
+    response = client.post("/harvest-insights/batch", json={"requests": requests, **options})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    return lines[:-1], lines[-1]["summary"]
+
+
+def test_companies_sharing_framework_and_industry_share_one_search(agent, client):
+    lines, summary = run_batch(client, [company(f"Company {i}") for i in range(4)])
+    assert sorted(line["index"] for line in lines) == [0, 1, 2, 3]
+    assert {line["status"] for line in lines} == {"ok"}
+    assert all(line["result"]["sources_used"] == ["MCP_DuckDuckGo"] for line in lines)
+    assert [query["query"] for query in agent.mcp_client.queries] == ["GDPR compliance requirements Retail industry"]
+    assert summary["total"] == 4 and summary["succeeded"] == 4 and summary["failed"] == 0
+    assert summary["shared_research"] == {"searches": 1, "reused": 3}
+
+
+def test_each_framework_and_industry_pair_is_searched_once_with_the_largest_limit(agent, client):
+    requests = [company("A", max_results=5), company("B", max_results=20),
+                company("C", industry="Health"), company("D", framework="HIPAA", industry="Health")]
+    _, summary = run_batch(client, requests)
+    searches = {query["query"]: query["max_results"] for query in agent.mcp_client.queries}
+    assert searches == {
+        "GDPR compliance requirements Retail industry": 20,
+        "GDPR compliance requirements Health industry": 10,
+        "HIPAA compliance requirements Health industry": 10
+    }
+    assert summary["shared_research"] == {"searches": 3, "reused": 1}
+
+
+def test_company_search_adds_one_search_per_company(agent, client):
+    lines, summary = run_batch(client, [company("Acme"), company("Globex")], company_search=True)
+    queries = sorted(query["query"] for query in agent.mcp_client.queries)
+    assert queries == ["GDPR compliance Acme", "GDPR compliance Globex",
+                       "GDPR compliance requirements Retail industry"]
+    assert summary["succeeded"] == 2
+
+
+def test_failed_shared_search_is_retried_and_reported_degraded(agent, client):
+    agent.mcp_client.failing.add("GDPR")
+    lines, summary = run_batch(client, [company(f"Company {i}") for i in range(3)], concurrency=1)
+    assert {line["status"] for line in lines} == {"degraded"}
+    assert all(line["result"]["cache"]["degraded"] for line in lines)
+    # Run one at a time, each company retries the search that failed before it
+    assert len(agent.mcp_client.queries) == 3
+    assert summary["degraded"] == 3 and summary["succeeded"] == 0
+
+
+def test_concurrency_is_bounded(agent, client, monkeypatch):
+    requests = [company(f"Company {i}", industry=f"Industry {i}") for i in range(6)]
+    run_batch(client, requests, concurrency=2)
+    assert agent.mcp_client.peak == 2
+
+    monkeypatch.setenv("HARVESTER_BATCH_MAX_CONCURRENCY", "3")
+    agent.mcp_client.peak = 0
+    run_batch(client, [dict(request, refresh=True) for request in requests], concurrency=50)
+    assert agent.mcp_client.peak == 3
+
+
+def test_failure_of_one_company_does_not_fail_the_batch(agent, client, monkeypatch):
+    process = agent.process_compliance_query
+
+    async def process_or_fail(request, research=None):
+        if request.company_name == "Broken":
+            raise RuntimeError("analysis crashed")
+        return await process(request, research)
+
+    monkeypatch.setattr(agent, "process_compliance_query", process_or_fail)
+    lines, summary = run_batch(client, [company("Acme"), company("Broken")])
+    by_company = {line["company_name"]: line for line in lines}
+    assert by_company["Acme"]["status"] == "ok"
+    assert by_company["Broken"] == {"index": 1, "framework": "GDPR", "company_name": "Broken",
+                                    "status": "error", "error": "analysis crashed"}
+    assert summary["succeeded"] == 1 and summary["failed"] == 1
+
+
+def test_repeated_batch_is_served_from_the_insight_cache(agent, client):
+    requests = [company("Acme"), company("Globex")]
+    run_batch(client, requests)
+    lines, summary = run_batch(client, requests)
+    assert {line["result"]["cache"]["status"] for line in lines} == {"memory"}
+    assert len(agent.mcp_client.queries) == 1
+    assert summary["shared_research"] == {"searches": 0, "reused": 0}
+
+
+def test_oversized_batch_is_rejected(agent, client, monkeypatch):
+    monkeypatch.setenv("HARVESTER_BATCH_MAX_REQUESTS", "2")
+    response = client.post("/harvest-insights/batch", json={"requests": [company(str(i)) for i in range(3)]})
+    assert response.status_code == 413
+    assert agent.mcp_client.queries == []
+
+
+def test_batch_needs_an_agent(monkeypatch, client):
+    monkeypatch.setattr(harvester_agent, "harvester_agent", None)
+    assert client.post("/harvest-insights/batch", json={"requests": [company("Acme")]}).status_code == 503
+
+
+async def test_shared_search_survives_a_cancelled_requester(agent):
+    requests = [InsightRequest(**company("Acme")), InsightRequest(**company("Globex"))]
+    research = SharedResearch(agent, requests)
+    first = asyncio.create_task(research(requests[0]))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(research(requests[1]))
+    await asyncio.sleep(0)
+    first.cancel()
+    assert (await second)["success"]
+    assert research.stats() == {"searches": 1, "reused": 1}
+
+
+async def test_close_cancels_searches_still_running(agent):
+    agent.mcp_client.delay = 10
+    request = InsightRequest(**company("Acme"))
+    research = SharedResearch(agent, [request])
+    pending = asyncio.create_task(research(request))
+    await asyncio.sleep(0)
+    research.close()
+    with pytest.raises(asyncio.CancelledError):
+        await pending
@@ -0,0 +1,112 @@
+import httpx
+import pytest
+
+import standalone_mcp_server as server
+from standalone_mcp_server import CircuitBreaker, UpstreamUnavailable, is_upstream_failure
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(server.time, "monotonic", lambda: now[0])
+    return now
+
+
+def fail(breaker, error=None):
+    with pytest.raises(httpx.ConnectError):
+        with breaker.guard(is_upstream_failure):
+            raise error or httpx.ConnectError("refused")
+
+
+def test_opens_after_threshold_and_fails_fast(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=3, reset_seconds=30)
+    for _ in range(3):
+        fail(breaker)
+    assert breaker.state == CircuitBreaker.OPEN
+    with pytest.raises(UpstreamUnavailable) as excinfo:
+        breaker.allow()
+    assert excinfo.value.retry_after == pytest.approx(30)
+    assert breaker.rejected == 1
+
+
+def test_half_open_trial_closes_or_reopens(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1, reset_seconds=30, half_open_max_calls=1)
+    fail(breaker)
+    clock[0] += 30
+    breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    # Only one trial at a time
+    with pytest.raises(UpstreamUnavailable):
+        breaker.allow()
+    breaker.record_failure(httpx.ReadTimeout("slow"))
+    assert breaker.state == CircuitBreaker.OPEN
+
+    clock[0] += 30
+    with breaker.guard(is_upstream_failure):
+        pass
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_client_errors_do_not_count(clock):
+    breaker = CircuitBreaker("upstream", failure_threshold=1)
+    request = httpx.Request("GET", "https://upstream.example/")
+    not_found = httpx.HTTPStatusError("404", request=request, response=httpx.Response(404, request=request))
+    with pytest.raises(httpx.HTTPStatusError):
+        with breaker.guard(is_upstream_failure):
+            raise not_found
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.parametrize("status, failure", [(500, True), (503, True), (429, True), (404, False), (403, False)])
+def test_status_classification(status, failure):
+    request = httpx.Request("GET", "https://upstream.example/")
+    error = httpx.HTTPStatusError("", request=request, response=httpx.Response(status, request=request))
+    assert is_upstream_failure(error) is failure
+
+
+async def test_failed_url_is_negatively_cached(make_fetcher):
+    fetcher, upstream = make_fetcher(lambda request: httpx.Response(503))
+    with pytest.raises(Exception, match="503"):
+        await fetcher.fetch_content("https://down.example/page")
+    with pytest.raises(UpstreamUnavailable, match="recently failed"):
+        await fetcher.fetch_content("https://down.example/page")
+    assert len(upstream.requests) == 1
+
+
+async def test_host_breaker_opens_for_other_urls_on_the_host(make_fetcher):
+    fetcher, upstream = make_fetcher(lambda request: httpx.Response(502))
+    breaker = fetcher.breakers.get("down.example")
+    breaker.failure_threshold = 2
+    for page in ("a", "b"):
+        with pytest.raises(Exception):
+            await fetcher.fetch_content(f"https://down.example/{page}")
+    with pytest.raises(UpstreamUnavailable, match="circuit open"):
+        await fetcher.fetch_content("https://down.example/c")
+    assert len(upstream.requests) == 2
+
+
+def test_fail_fast_maps_to_jsonrpc_and_http_errors(mcp, monkeypatch):
+    async def unavailable(*args, **kwargs):
+        raise UpstreamUnavailable("host:down.example", 12.5, "circuit open")
+
+    monkeypatch.setattr(server.fetcher, "fetch_content", unavailable)
+    error = mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": {
+        "name": "fetch_content", "arguments": {"url": "https://down.example/"}}}).json()["error"]
+    assert error["code"] == -32030
+    assert error["data"] == {"upstream": "host:down.example", "retry_after": 12.5}
+
+    response = mcp.post("/fetch", json={"url": "https://down.example/"})
+    assert response.status_code == 503
+    assert response.headers["retry-after"] == "13"
+
+
+def test_health_reports_upstream_circuits(mcp):
+    breaker = server.fetcher.breakers.get("down.example")
+    breaker.failure_threshold = 1
+    server.fetcher.breakers.get("up.example")
+    fail(breaker)
+    health = mcp.get("/health").json()
+    assert health["status"] == "healthy"
+    assert health["upstream_circuits"] == {"search": "closed", "fetch_hosts_not_closed": ["down.example"]}
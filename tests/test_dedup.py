@@ -0,0 +1,66 @@
+import httpx
+
+import standalone_mcp_server as server
+from conftest import Upstream
+from standalone_mcp_server import SimHashIndex, collapse_near_duplicates, simhash
+
+ARTICLE = (
+    "The General Data Protection Regulation requires controllers to report a personal data "
+    "breach to the supervisory authority within seventy two hours of becoming aware of it "
+    "unless the breach is unlikely to result in a risk to the rights and freedoms of people"
+)
+
+
+def test_near_identical_texts_have_close_fingerprints():
+    edited = ARTICLE.replace("seventy two", "72")
+    unrelated = ("Small businesses handling health records must sign business associate agreements "
+                 "with every vendor that stores or transmits protected health information for them")
+    assert (simhash(ARTICLE) ^ simhash(edited)).bit_count() <= 12
+    assert (simhash(ARTICLE) ^ simhash(unrelated)).bit_count() > 12
+
+
+def test_short_texts_have_no_fingerprint():
+    assert simhash("too few words here") is None
+
+
+def test_feature_cap_bounds_the_work():
+    long_text = " ".join(f"word{i}" for i in range(5000))
+    assert simhash(long_text, max_features=16) == simhash(" ".join(f"word{i}" for i in range(18)), max_features=16)
+
+
+def test_index_finds_fingerprints_within_distance():
+    index = SimHashIndex(max_distance=3)
+    index.add(0b1011 << 40, "original")
+    assert index.find((0b1011 << 40) ^ 0b111) == "original"
+    assert index.find((0b1011 << 40) ^ 0b1111) is None
+
+
+def test_duplicate_results_collapse_into_the_first():
+    snippet = "Controllers must notify the supervisory authority of a personal data breach within 72 hours"
+    results = [
+        {"link": "https://a.example", "snippet": snippet, "positions": {"q1": 1}},
+        {"link": "https://b.example", "snippet": "Unrelated guidance about encryption of laptops and phones at rest"},
+        {"link": "https://mirror.example", "snippet": snippet + ".", "positions": {"q2": 1, "q1": 4}},
+    ]
+    kept = collapse_near_duplicates(results)
+    assert [result["link"] for result in kept] == ["https://a.example", "https://b.example"]
+    assert kept[0]["duplicates"] == ["https://mirror.example"]
+    assert kept[0]["positions"] == {"q1": 1, "q2": 1}
+    # The input is not modified
+    assert "duplicates" not in results[0]
+
+
+def test_batched_fetches_of_mirrored_pages_are_collapsed(mcp):
+    def mirrors(request: httpx.Request) -> httpx.Response:
+        text = ARTICLE if request.url.host != "other.example" else ARTICLE.replace("breach", "incident")[::-1]
+        return httpx.Response(200, text=f"<p>{text}</p>", headers={"content-type": "text/html"})
+
+    upstream = Upstream(mirrors)
+    server.fetcher.client = upstream.client()
+    batch = [{"jsonrpc": "2.0", "id": i, "method": "tools/call",
+              "params": {"name": "fetch_content", "arguments": {"url": url}}}
+             for i, url in enumerate(["https://a.example/", "https://mirror.example/", "https://other.example/"])]
+    texts = [entry["result"]["content"][0]["text"] for entry in mcp.post("/mcp", json=batch).json()]
+    assert texts[0].startswith("The General Data Protection Regulation")
+    assert texts[1].startswith("[Near-duplicate of https://a.example/ (request id 0 in this batch)")
+    assert not texts[2].startswith("[Near-duplicate")
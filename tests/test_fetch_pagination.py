@@ -0,0 +1,73 @@
+import httpx
+import pytest
+
+import standalone_mcp_server as server
+
+pytestmark = pytest.mark.anyio
+
+URL = "https://docs.example/long"
+
+
+def long_page(paragraphs: int = 3000) -> bytes:
+    body = "".join(f"<p>Paragraph {i:05d} of the long policy document.</p>\n" for i in range(paragraphs))
+    return f"<html><body>{body}</body></html>".encode()
+
+
+def serve(body: bytes):
+    return lambda request: httpx.Response(200, content=body, headers={"content-type": "text/html"})
+
+
+@pytest.fixture(autouse=True)
+def small_read_ahead(monkeypatch):
+    monkeypatch.setattr(server, "FETCH_READ_AHEAD_CHARS", 2000)
+
+
+async def test_next_page_is_served_from_the_read_ahead(make_fetcher):
+    fetcher, upstream = make_fetcher(serve(long_page()))
+    first = await fetcher.fetch_content(URL, max_chars=1000)
+    assert "offset=1000 to continue" in first
+    second = await fetcher.fetch_content(URL, max_chars=1000, offset=1000)
+    assert "showing characters 1000-2000" in second
+    assert len(upstream.requests) == 1
+
+
+async def test_reading_past_the_read_ahead_extends_the_document(make_fetcher):
+    fetcher, upstream = make_fetcher(serve(long_page()))
+    await fetcher.fetch_content(URL, max_chars=1000)
+    page = await fetcher.fetch_content(URL, max_chars=1000, offset=5000)
+    assert "showing characters 5000-6000" in page
+    assert len(upstream.requests) == 2
+    # The extended copy covers the following pages too
+    await fetcher.fetch_content(URL, max_chars=1000, offset=6000)
+    assert len(upstream.requests) == 2
+
+
+async def test_complete_document_has_no_continue_hint(make_fetcher):
+    fetcher, upstream = make_fetcher(serve(b"<p>short page</p>"))
+    assert await fetcher.fetch_content(URL, max_chars=1000) == "short page"
+    page = await fetcher.fetch_content(URL, max_chars=1000, offset=50)
+    assert page == "[No content at offset 50; document has 10 characters]"
+    assert len(upstream.requests) == 1
+
+
+async def test_byte_capped_document_is_not_refetched_past_its_end(make_fetcher):
+    fetcher, upstream = make_fetcher(serve(long_page()))
+    first = await fetcher.fetch_content(URL, max_chars=100_000, max_bytes=8192, stream=True)
+    document = fetcher.documents.get(URL)
+    assert document["byte_cap"] == 8192 and not document["complete"]
+    assert "larger max_bytes" in first and "to continue" not in first
+
+    end = len(document["text"])
+    for _ in range(3):
+        page = await fetcher.fetch_content(URL, max_chars=1000, offset=end + 10, max_bytes=8192, stream=True)
+        assert "8192-byte download limit" in page
+    assert len(upstream.requests) == 1
+
+
+async def test_larger_byte_cap_refetches(make_fetcher):
+    fetcher, upstream = make_fetcher(serve(long_page()))
+    await fetcher.fetch_content(URL, max_chars=100_000, max_bytes=8192, stream=True)
+    end = len(fetcher.documents.get(URL)["text"])
+    page = await fetcher.fetch_content(URL, max_chars=1000, offset=end, max_bytes=65536, stream=True)
+    assert "No content" not in page and "showing characters" in page
+    assert len(upstream.requests) == 2
@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from standalone_mcp_server import FetchScheduler, RateLimitExceeded
+
+pytestmark = pytest.mark.anyio
+
+
+async def hold(scheduler, domain, started, release):
+    async with scheduler.slot(domain):
+        started.append(domain)
+        await release.wait()
+
+
+async def test_per_domain_and_global_limits():
+    scheduler = FetchScheduler(max_concurrency=3, domain_max_concurrency=2)
+    started, release = [], asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, domain, started, release))
+             for domain in ["a", "a", "a", "b", "b"]]
+    await asyncio.sleep(0)
+    assert sorted(started) == ["a", "a", "b"]
+    assert scheduler.active == 3 and scheduler.queued == 2
+    release.set()
+    await asyncio.gather(*tasks)
+    assert (scheduler.active, scheduler.queued, scheduler.granted) == (0, 0, 5)
+    assert scheduler.domain_active == {}
+
+
+async def test_waiting_domains_are_served_round_robin():
+    scheduler = FetchScheduler(max_concurrency=1, domain_max_concurrency=1)
+    order = []
+    gate = asyncio.Event()
+
+    async def fetch(domain):
+        async with scheduler.slot(domain):
+            order.append(domain)
+            await gate.wait()
+
+    first = asyncio.create_task(fetch("busy"))
+    await asyncio.sleep(0)
+    # busy.example queues many fetches before quiet.example queues one
+    queued = [asyncio.create_task(fetch(domain)) for domain in ["busy", "busy", "busy", "quiet"]]
+    await asyncio.sleep(0)
+    gate.set()
+    await asyncio.gather(first, *queued)
+    assert order == ["busy", "busy", "quiet", "busy", "busy"]
+
+
+async def test_full_queue_rejects():
+    scheduler = FetchScheduler(max_concurrency=1, domain_max_concurrency=1, max_queued=1)
+    started, release = [], asyncio.Event()
+    tasks = [asyncio.create_task(hold(scheduler, "a", started, release)) for _ in range(2)]
+    await asyncio.sleep(0)
+    with pytest.raises(RateLimitExceeded):
+        async with scheduler.slot("a"):
+            pass
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+async def test_cancelled_waiter_leaves_the_queue():
+    scheduler = FetchScheduler(max_concurrency=1, domain_max_concurrency=1)
+    started, release = [], asyncio.Event()
+    holder = asyncio.create_task(hold(scheduler, "a", started, release))
+    waiter = asyncio.create_task(hold(scheduler, "b", started, release))
+    await asyncio.sleep(0)
+    waiter.cancel()
+    await asyncio.sleep(0)
+    assert scheduler.queued == 0 and "b" not in scheduler.waiting
+    release.set()
+    await holder
+    assert scheduler.active == 0 and started == ["a"]
@@ -0,0 +1,58 @@
+import httpx
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+URL = "https://docs.example/page"
+
+
+def html_page(paragraphs: int) -> bytes:
+    body = "".join(f"<p>Paragraph {i} of the policy text.</p>\n" for i in range(paragraphs))
+    return f"<html><head><script>var x = 1;</script></head><body>{body}</body></html>".encode()
+
+
+def serve(body: bytes, content_type: str = "text/html; charset=utf-8"):
+    return lambda request: httpx.Response(200, content=body, headers={"content-type": content_type})
+
+
+async def test_whole_body_within_both_caps_is_complete(make_fetcher):
+    body = html_page(20)
+    fetcher, _ = make_fetcher(serve(body))
+    text, truncated, byte_capped, _ = await fetcher._fetch_streaming(URL, 10_000, len(body), {})
+    assert text.startswith("Paragraph 0") and "var x" not in text
+    assert (truncated, byte_capped) == (False, False)
+
+
+async def test_byte_cap_truncates_the_stream(make_fetcher):
+    body = html_page(2000)
+    fetcher, _ = make_fetcher(serve(body))
+    text, truncated, byte_capped, _ = await fetcher._fetch_streaming(URL, 1_000_000, 4096, {})
+    assert (truncated, byte_capped) == (True, True)
+    assert "Paragraph 1999" not in text
+
+
+async def test_char_budget_truncates_without_byte_cap(make_fetcher):
+    fetcher, _ = make_fetcher(serve(html_page(2000)))
+    text, truncated, byte_capped, _ = await fetcher._fetch_streaming(URL, 500, 10_000_000, {})
+    assert (truncated, byte_capped) == (True, False)
+    assert len(text) >= 500
+
+
+async def test_plain_text_is_not_parsed_as_html(make_fetcher):
+    fetcher, _ = make_fetcher(serve(b"a <b>literal</b> tag", "text/plain"))
+    text, truncated, _, _ = await fetcher._fetch_streaming(URL, 1000, 1000, {})
+    assert text == "a <b>literal</b> tag"
+    assert not truncated
+
+
+async def test_disallowed_content_type_is_not_read(make_fetcher):
+    fetcher, _ = make_fetcher(serve(b"\x89PNG", "image/png"))
+    with pytest.raises(Exception, match="Unsupported content type"):
+        await fetcher._fetch_streaming(URL, 1000, 1000, {})
+
+
+async def test_byte_capped_fetch_is_reported_as_partial(make_fetcher):
+    fetcher, _ = make_fetcher(serve(html_page(2000)))
+    page = await fetcher.fetch_content(URL, max_chars=100_000, max_bytes=4096, stream=True)
+    assert "[Content truncated" in page
+    assert not fetcher.documents.get(URL)["complete"]
@@ -0,0 +1,233 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+import harvester_agent
+from harvester_agent import InsightCache
+
+pytestmark = pytest.mark.anyio
+
+SCOPE = InsightCache.scope("GDPR", "Acme", "Retail")
+
+
+class FakeDapr:
+    """The Dapr state API as the cache uses it: every write changes a key's
+    ETag and a write carrying a stale ETag is rejected. Replicas share state
+    by sharing the store dict."""
+
+    def __init__(self, store=None):
+        self.store = {} if store is None else store
+        self.saves = 0
+        self.before_save = None
+
+    async def get_state(self, store_name, key):
+        data, version = self.store.get(key, (b"", 0))
+        return SimpleNamespace(data=data, etag=str(version) if version else "")
+
+    async def save_state(self, store_name, key, value, etag=None, state_metadata=None):
+        self.saves += 1
+        if self.before_save:
+            hook, self.before_save = self.before_save, None
+            await hook()
+        data, version = self.store.get(key, (b"", 0))
+        if etag is not None and etag != str(version):
+            raise RuntimeError(f"possible etag mismatch on {key}")
+        self.store[key] = (value.encode(), version + 1)
+
+
+class Persistence:
+    """Writes through at once instead of queueing"""
+
+    def __init__(self, dapr):
+        self.dapr = dapr
+        self.saved = []
+
+    async def save_state(self, store_name, key, value, metadata=None):
+        self.saved.append(key)
+        await self.dapr.save_state(store_name, key, value, state_metadata=metadata)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_700_000_000.0]
+    monkeypatch.setattr(harvester_agent.time, "time", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def store():
+    return {}
+
+
+@pytest.fixture
+def make_cache(store):
+    def make(**settings):
+        dapr = FakeDapr(store)
+        cache = InsightCache(Persistence(dapr))
+        cache.dapr_client = dapr
+        cache.sync_seconds = 0
+        for name, value in settings.items():
+            setattr(cache, name, value)
+        return cache
+
+    return make
+
+
+def harvest(response=None, complete=True, calls=None, delay=0.0):
+    async def create():
+        if calls is not None:
+            calls.append(1)
+        await asyncio.sleep(delay)
+        return response or {"summary": "insights"}, complete
+
+    return create
+
+
+async def test_miss_then_memory_then_other_replica_reads_the_store(make_cache):
+    cache, other = make_cache(), make_cache()
+    entry, status = await cache.get_or_create(SCOPE, harvest())
+    assert status == "miss" and entry["response"] == {"summary": "insights"}
+    assert (await cache.get_or_create(SCOPE, harvest()))[1] == "memory"
+    assert cache.persistence.saved == [InsightCache.key(SCOPE)]
+
+    entry, status = await other.get_or_create(SCOPE, harvest())
+    assert status == "state_store" and entry["response"] == {"summary": "insights"}
+
+
+async def test_concurrent_misses_share_one_harvest(make_cache):
+    cache = make_cache()
+    calls = []
+    results = await asyncio.gather(*(cache.get_or_create(SCOPE, harvest(calls=calls, delay=0.01))
+                                     for _ in range(5)))
+    assert len(calls) == 1
+    assert sorted(status for _, status in results) == ["coalesced"] * 4 + ["miss"]
+    assert len({id(entry) for entry, _ in results}) == 1
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4 and not cache.inflight
+
+
+async def test_cancelled_requester_does_not_fail_the_others(make_cache):
+    cache = make_cache()
+    owner = asyncio.create_task(cache.get_or_create(SCOPE, harvest(delay=0.05)))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(cache.get_or_create(SCOPE, harvest()))
+    await asyncio.sleep(0)
+    owner.cancel()
+    entry, status = await waiter
+    assert status == "coalesced" and entry["response"] == {"summary": "insights"}
+    assert owner.cancelled()
+
+
+async def test_failed_harvest_is_not_cached(make_cache):
+    cache = make_cache()
+
+    async def failing():
+        raise RuntimeError("search backend down")
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_create(SCOPE, failing)
+    assert not cache.entries and not cache.inflight
+    assert (await cache.get_or_create(SCOPE, harvest()))[1] == "miss"
+
+
+async def test_degraded_harvest_stays_local_and_expires_early(make_cache, clock):
+    cache, other = make_cache(degraded_ttl_seconds=30), make_cache()
+    entry, _ = await cache.get_or_create(SCOPE, harvest(complete=False))
+    assert entry["degraded"] and cache.ttl_for(entry) == 30
+    assert cache.persistence.saved == []
+    assert await other.get(SCOPE) is None
+
+    clock[0] += 29
+    assert (await cache.get_or_create(SCOPE, harvest()))[1] == "memory"
+    clock[0] += 1
+    entry, status = await cache.get_or_create(SCOPE, harvest())
+    assert status == "miss" and not entry["degraded"]
+
+
+async def test_entries_expire_after_the_ttl(make_cache, clock):
+    cache = make_cache(ttl_seconds=60)
+    await cache.get_or_create(SCOPE, harvest())
+    clock[0] += 60
+    assert await cache.get(SCOPE) is None
+    assert cache.stats()["stale"] == 2
+
+
+async def test_refresh_harvests_again(make_cache):
+    cache = make_cache()
+    calls = []
+    await cache.get_or_create(SCOPE, harvest(calls=calls))
+    assert (await cache.get_or_create(SCOPE, harvest(calls=calls), refresh=True))[1] == "refresh"
+    assert len(calls) == 2
+
+
+async def test_invalidation_with_empty_fields_covers_every_value(make_cache, clock):
+    cache = make_cache()
+    other_company = InsightCache.scope("GDPR", "Globex", "Retail")
+    other_framework = InsightCache.scope("HIPAA", "Acme", "Retail")
+    for scope in (SCOPE, other_company, other_framework):
+        await cache.get_or_create(scope, harvest())
+
+    clock[0] += 1
+    assert await cache.invalidate(framework="gdpr") == 2
+    assert await cache.get(SCOPE) is None
+    assert await cache.get(other_company) is None
+    assert (await cache.get(other_framework))[1] == "memory"
+
+
+async def test_invalidation_reaches_other_replicas(make_cache, clock):
+    cache, other = make_cache(), make_cache()
+    await cache.get_or_create(SCOPE, harvest())
+    assert (await other.get(SCOPE))[1] == "state_store"
+
+    clock[0] += 1
+    await cache.invalidate(company_name="ACME")
+    assert await other.get(SCOPE) is None
+    # Entries harvested after the invalidation are fresh
+    clock[0] += 1
+    await other.get_or_create(SCOPE, harvest())
+    assert (await cache.get(SCOPE))[1] == "state_store"
+
+
+async def test_concurrent_invalidations_on_two_replicas_both_survive(make_cache, store, clock):
+    cache, other = make_cache(), make_cache()
+    await cache.invalidate(framework="SOX")
+
+    async def other_replica_saves_first():
+        await other.invalidate(framework="HIPAA")
+
+    cache.dapr_client.before_save = other_replica_saves_first
+    await cache.invalidate(framework="GDPR")
+
+    assert cache.dapr_client.saves == 3
+    third = make_cache()
+    await third._sync_watermarks(force=True)
+    assert set(third.watermarks) == {"sox\x1f\x1f", "gdpr\x1f\x1f", "hipaa\x1f\x1f"}
+
+
+async def test_save_gives_up_after_repeated_conflicts(make_cache, monkeypatch, caplog):
+    cache = make_cache()
+    monkeypatch.setattr(harvester_agent.random, "uniform", lambda low, high: 0)
+
+    async def rejected(**kwargs):
+        cache.dapr_client.saves += 1
+        raise RuntimeError("possible etag mismatch")
+
+    monkeypatch.setattr(cache.dapr_client, "save_state", rejected)
+    assert await cache.invalidate(framework="GDPR") == 0
+    assert cache.dapr_client.saves == InsightCache.WATERMARK_SAVE_ATTEMPTS
+    assert "Error saving insight cache invalidation" in caplog.text
+
+
+async def test_watermarks_older_than_the_ttl_are_pruned(make_cache, store, clock):
+    cache = make_cache(ttl_seconds=3600, degraded_ttl_seconds=30)
+    await cache.invalidate(framework="GDPR")
+    clock[0] += 3600
+    await cache.invalidate(framework="HIPAA")
+    assert set(cache.watermarks) == {"gdpr\x1f\x1f", "hipaa\x1f\x1f"}
+
+    clock[0] += 1
+    await cache.invalidate(framework="SOX")
+    assert set(cache.watermarks) == {"hipaa\x1f\x1f", "sox\x1f\x1f"}
+    other = make_cache()
+    await other._sync_watermarks(force=True)
+    assert set(other.watermarks) == {"hipaa\x1f\x1f", "sox\x1f\x1f"}
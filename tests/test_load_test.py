@@ -0,0 +1,43 @@
+import argparse
+import sys
+
+import httpx
+import pytest
+
+from conftest import ROOT
+
+sys.path.insert(0, str(ROOT / "benchmarks"))
+import load_test  # noqa: E402
+
+
+def test_percentile_picks_nearest_rank():
+    ordered = list(range(1, 101))
+    assert load_test.percentile(ordered, 0.50) == 50
+    assert load_test.percentile(ordered, 0.99) == 99
+    assert load_test.percentile([], 0.5) == 0.0
+
+
+@pytest.mark.parametrize("scenario", load_test.SCENARIOS)
+def test_unique_requests_never_repeat(scenario):
+    requests = [load_test.make_request(scenario, i, "http://127.0.0.1:1", True) for i in range(10)]
+    assert len({repr(request) for request in requests}) == 10
+    repeated = {repr(load_test.make_request(scenario, i, "http://127.0.0.1:1", False)[1].get("query"))
+                for i in range(10)}
+    assert len(repeated) == 1
+
+
+def test_json_rpc_errors_count_as_errors():
+    request = httpx.Request("POST", "http://server/mcp")
+    assert load_test.is_error(httpx.Response(200, json={"error": {"code": -32029}}, request=request))
+    assert load_test.is_error(httpx.Response(503, json={}, request=request))
+    assert not load_test.is_error(httpx.Response(200, json={"result": {}}, request=request))
+
+
+def test_server_environment_lifts_limits_and_applies_overrides():
+    args = argparse.Namespace(concurrency=8, env=["PARSE_POOL_KIND=thread", "FETCH_MAX_CONCURRENCY=2"])
+    env = load_test.server_environment(args, "http://127.0.0.1:9", 8000)
+    assert env["DDG_BASE_URL"] == "http://127.0.0.1:9/html"
+    assert env["CACHE_STORE_PATH"] == ""
+    assert env["PARSE_POOL_KIND"] == "thread"
+    assert env["FETCH_MAX_CONCURRENCY"] == "2"
+    assert int(env["SEARCH_RATE_LIMIT_BURST"]) >= 1_000_000
@@ -0,0 +1,73 @@
+import pytest
+
+import standalone_mcp_server as server
+
+
+def call(request_id, name, **arguments):
+    return {"jsonrpc": "2.0", "id": request_id, "method": "tools/call",
+            "params": {"name": name, "arguments": arguments}}
+
+
+def test_single_request_is_answered_as_an_object(mcp):
+    response = mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/list"})
+    assert response.status_code == 200
+    assert {tool["name"] for tool in response.json()["result"]["tools"]} >= {"search", "fetch_content"}
+
+
+def test_batch_answers_each_request_by_id(mcp):
+    batch = [
+        call("a", "fetch_content", url="https://one.example/"),
+        {"jsonrpc": "2.0", "id": "b", "method": "tools/list"},
+        call("c", "no_such_tool"),
+    ]
+    response = mcp.post("/mcp", json=batch)
+    by_id = {entry["id"]: entry for entry in response.json()}
+    assert set(by_id) == {"a", "b", "c"}
+    assert "https://one.example/" in by_id["a"]["result"]["content"][0]["text"]
+    assert "tools" in by_id["b"]["result"]
+    assert by_id["c"]["error"]["code"] == -32601
+
+
+def test_notifications_get_no_entry(mcp):
+    batch = [
+        {"jsonrpc": "2.0", "method": "notifications/initialized"},
+        {"jsonrpc": "2.0", "id": 7, "method": "tools/list"},
+    ]
+    assert [entry["id"] for entry in mcp.post("/mcp", json=batch).json()] == [7]
+
+    only_notifications = [{"jsonrpc": "2.0", "method": "notifications/initialized"}]
+    assert mcp.post("/mcp", json=only_notifications).status_code == 204
+
+
+def test_invalid_entries_fail_alone(mcp):
+    response = mcp.post("/mcp", json=[1, {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}])
+    first, second = response.json()
+    assert first == {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "Invalid Request"}}
+    assert "result" in second
+
+
+@pytest.mark.parametrize("size", [0, server.MCP_BATCH_MAX_SIZE + 1])
+def test_empty_or_oversized_batch_is_rejected(mcp, size):
+    batch = [{"jsonrpc": "2.0", "id": i, "method": "tools/list"} for i in range(size)]
+    assert mcp.post("/mcp", json=batch).json()["error"]["code"] == -32600
+
+
+def test_batch_entries_run_concurrently(mcp, monkeypatch):
+    import asyncio
+
+    running = 0
+    peak = 0
+
+    async def slow_fetch(url, **kwargs):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.05)
+        running -= 1
+        return f"text of {url}"
+
+    monkeypatch.setattr(server.fetcher, "fetch_content", slow_fetch)
+    monkeypatch.setattr(server, "DEDUP_ENABLED", False)
+    batch = [call(i, "fetch_content", url=f"https://site{i}.example/") for i in range(6)]
+    assert len(mcp.post("/mcp", json=batch).json()) == 6
+    assert peak == min(6, server.MCP_BATCH_MAX_CONCURRENCY)
@@ -0,0 +1,183 @@
+import itertools
+import json
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+import harvester_agent
+from harvester_agent import MCPClientPool, MCPError, MCPToolError, MCPUnavailable
+
+pytestmark = pytest.mark.anyio
+
+REPLICAS = ("http://mcp-a/mcp", "http://mcp-b/mcp")
+
+
+class Replicas:
+    """Fake standalone_mcp_server replicas keyed by host. A replica answers
+    tools/call with its host name unless given a status or an error to return"""
+
+    def __init__(self):
+        self.methods = []
+        self.status = {}
+        self.errors = {}
+        self.results = {}
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        message = json.loads(request.content)
+        self.methods.append((host, message["method"]))
+        if host in self.status:
+            return httpx.Response(self.status[host])
+        if "id" not in message:
+            return httpx.Response(204)
+        if message["method"] == "initialize":
+            result = {"protocolVersion": message["params"]["protocolVersion"],
+                      "serverInfo": {"name": "fake-mcp", "version": "1.0.0"}}
+        elif message["method"] == "tools/list":
+            result = {"tools": [{"name": "search", "description": "Search the web"}]}
+        elif host in self.errors:
+            code = self.errors[host]
+            return httpx.Response(200, json={"jsonrpc": "2.0", "id": message["id"],
+                                             "error": {"code": code, "message": "refused"}})
+        else:
+            result = self.results.get(host, {"content": [{"type": "text", "text": host}]})
+        return httpx.Response(200, json={"jsonrpc": "2.0", "id": message["id"], "result": result})
+
+    def calls(self, method):
+        return [host for host, called in self.methods if called == method]
+
+
+@pytest.fixture
+def replicas():
+    return Replicas()
+
+
+@pytest.fixture
+async def pool(monkeypatch, replicas):
+    monkeypatch.setenv("MCP_SERVER_URLS", ",".join(REPLICAS))
+    # Break the least-busy tie in list order so failover is deterministic
+    monkeypatch.setattr(harvester_agent.random, "random", itertools.count().__next__)
+    pool = MCPClientPool()
+    await pool.client.aclose()
+    pool.client = httpx.AsyncClient(transport=httpx.MockTransport(replicas))
+    yield pool
+    await pool.close()
+
+
+async def test_connect_initializes_each_replica_once_and_discovers_tools_once(pool, replicas):
+    await pool.connect()
+    await pool.connect()
+    assert sorted(replicas.calls("initialize")) == ["mcp-a", "mcp-b"]
+    assert len(replicas.calls("notifications/initialized")) == 2
+    assert len(replicas.calls("tools/list")) == 1
+    assert list(pool.tools) == ["search"]
+    assert pool.server_info["name"] == "fake-mcp"
+    assert pool.health() == {url: "connected" for url in REPLICAS}
+
+
+async def test_tool_call_returns_text_and_records_latency(pool, replicas):
+    assert await pool.call_tool("search", {"query": "gdpr"}) == "mcp-a"
+    stats = pool.stats()["tool_calls"]["search"]
+    assert stats["calls"] == 1 and stats["errors"] == 0
+
+
+async def test_failed_replica_is_skipped_and_backs_off(pool, replicas):
+    replicas.status["mcp-a"] = 503
+    assert await pool.call_tool("search", {"query": "gdpr"}) == "mcp-b"
+    replica = pool.replicas[0]
+    assert replica.consecutive_failures == 1 and not replica.initialized
+    assert "503" in replica.last_error
+    assert pool.health() == {REPLICAS[0]: "backing_off", REPLICAS[1]: "connected"}
+
+    # While backing off the replica is not tried at all
+    replicas.methods.clear()
+    assert await pool.call_tool("search", {"query": "gdpr"}) == "mcp-b"
+    assert "mcp-a" not in {host for host, _ in replicas.methods}
+
+
+async def test_replica_is_reinitialized_after_its_backoff(pool, replicas):
+    replicas.status["mcp-a"] = 503
+    await pool.call_tool("search", {"query": "gdpr"})
+    del replicas.status["mcp-a"]
+    pool.replicas[0].retry_at = time.monotonic()
+
+    assert await pool.call_tool("search", {"query": "gdpr"}) == "mcp-a"
+    assert replicas.calls("initialize").count("mcp-a") == 2
+    assert pool.replicas[0].consecutive_failures == 0
+
+
+@pytest.mark.parametrize("code", sorted(MCPClientPool.RETRYABLE_CODES))
+async def test_rate_limited_or_open_circuit_fails_over_without_backoff(pool, replicas, code):
+    replicas.errors["mcp-a"] = code
+    assert await pool.call_tool("search", {"query": "gdpr"}) == "mcp-b"
+    # The replica is healthy, only its limiter or upstream breaker said no
+    assert pool.replicas[0].consecutive_failures == 0
+    assert pool.health()[REPLICAS[0]] == "connected"
+
+
+async def test_retryable_error_on_every_replica_is_raised(pool, replicas):
+    replicas.errors.update({"mcp-a": -32029, "mcp-b": -32030})
+    with pytest.raises(MCPError) as error:
+        await pool.call_tool("search", {"query": "gdpr"})
+    assert error.value.code == -32030
+    assert pool.stats()["tool_calls"]["search"]["errors"] == 1
+
+
+async def test_other_json_rpc_errors_are_not_retried(pool, replicas):
+    replicas.errors["mcp-a"] = -32602
+    with pytest.raises(MCPError) as error:
+        await pool.call_tool("search", {"query": ""})
+    assert error.value.code == -32602
+    assert replicas.calls("tools/call") == ["mcp-a"]
+
+
+async def test_result_flagged_is_error_raises(pool, replicas):
+    replicas.results["mcp-a"] = {"content": [{"type": "text", "text": "Search failed: upstream timeout"}],
+                                 "isError": True}
+    with pytest.raises(MCPToolError, match="upstream timeout"):
+        await pool.call_tool("search", {"query": "gdpr"})
+    assert replicas.calls("tools/call") == ["mcp-a"]
+    assert pool.stats()["tool_calls"]["search"]["errors"] == 1
+
+
+async def test_all_replicas_backing_off_fails_fast(pool, replicas):
+    replicas.status.update({"mcp-a": 503, "mcp-b": 503})
+    with pytest.raises(httpx.HTTPStatusError):
+        await pool.call_tool("search", {"query": "gdpr"})
+    with pytest.raises(MCPUnavailable):
+        await pool.call_tool("search", {"query": "gdpr"})
+    assert not pool.connected
+    with pytest.raises(MCPUnavailable):
+        await pool.connect()
+
+
+async def test_backoff_grows_exponentially_up_to_the_maximum(pool):
+    pool.backoff_base, pool.backoff_max = 1.0, 5.0
+    replica = pool.replicas[0]
+    for expected in (1.0, 2.0, 4.0, 5.0, 5.0):
+        pool._mark_failed(replica, RuntimeError("down"))
+        remaining = replica.retry_at - time.monotonic()
+        # Jitter picks between half and all of the backoff
+        assert expected * 0.5 - 0.01 <= remaining <= expected
+
+
+async def test_health_reports_replica_state(monkeypatch, pool):
+    from fastapi.testclient import TestClient
+
+    await pool.connect()
+    pool._mark_failed(pool.replicas[1], RuntimeError("down"))
+    monkeypatch.setattr(harvester_agent, "harvester_agent", SimpleNamespace(mcp_client=pool, initialized=True))
+
+    health = TestClient(harvester_agent.app).get("/health").json()
+    assert health["mcp_connected"] is True
+    assert health["mcp_replicas"] == {REPLICAS[0]: "connected", REPLICAS[1]: "backing_off"}
+    assert "mcp_available" not in health
+
+
+async def test_health_without_an_agent():
+    from fastapi.testclient import TestClient
+
+    health = TestClient(harvester_agent.app).get("/health").json()
+    assert health["mcp_connected"] is False and health["mcp_replicas"] == {}
@@ -0,0 +1,35 @@
+import pytest
+
+import standalone_mcp_server as server
+
+
+def initialize(mcp, version=None):
+    params = {"capabilities": {}, "clientInfo": {"name": "test", "version": "1"}}
+    if version is not None:
+        params["protocolVersion"] = version
+    return mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "initialize", "params": params}).json()
+
+
+@pytest.mark.parametrize("version", server.MCP_PROTOCOL_VERSIONS)
+def test_supported_version_is_agreed(mcp, version):
+    assert initialize(mcp, version)["result"]["protocolVersion"] == version
+
+
+@pytest.mark.parametrize("version", [None, "2023-01-01", "2099-01-01"])
+def test_unknown_version_gets_the_newest(mcp, version):
+    assert initialize(mcp, version)["result"]["protocolVersion"] == "2025-06-18"
+
+
+def test_tools_declaring_an_output_schema_return_structured_content(mcp):
+    tools = mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/list"}).json()["result"]["tools"]
+    with_schema = {tool["name"] for tool in tools if "outputSchema" in tool}
+    assert with_schema >= {"search", "search_many"}
+
+    for structured in (False, True):
+        response = mcp.post("/mcp", json={
+            "jsonrpc": "2.0", "id": 2, "method": "tools/call",
+            "params": {"name": "search", "arguments": {"query": "gdpr", "structured": structured}}
+        }).json()["result"]
+        assert response["structuredContent"]["query"] == "gdpr"
+        assert response["structuredContent"]["results"]
+        assert response["content"][0]["type"] == "text"
@@ -0,0 +1,73 @@
+import pytest
+
+from standalone_mcp_server import MetricsRegistry
+
+
+def sample(text: str, prefix: str) -> float:
+    """Value of the first exposition line starting with prefix"""
+    for line in text.splitlines():
+        if line.startswith(prefix):
+            return float(line.rsplit(" ", 1)[1])
+    raise AssertionError(f"no sample {prefix!r} in:\n{text}")
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("latency_seconds", "Latency", ("path",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.5, 5.0):
+        histogram.observe(value, path="/mcp")
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert sample(text, 'latency_seconds_bucket{path="/mcp",le="0.1"}') == 1
+    assert sample(text, 'latency_seconds_bucket{path="/mcp",le="1.0"}') == 2
+    assert sample(text, 'latency_seconds_bucket{path="/mcp",le="+Inf"}') == 3
+    assert sample(text, 'latency_seconds_count{path="/mcp"}') == 3
+    assert sample(text, 'latency_seconds_sum{path="/mcp"}') == pytest.approx(5.55)
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("queries_total", "Queries", ("query",)).inc(query='say "hi"\\now')
+    assert 'queries_total{query="say \\"hi\\"\\\\now"} 1.0' in registry.render()
+
+
+def test_failing_collector_does_not_break_the_scrape():
+    registry = MetricsRegistry()
+    registry.gauge("up", "Up").set(1)
+    registry.collectors.append(lambda: 1 / 0)
+    assert "up 1" in registry.render()
+
+
+def test_rpc_and_tool_latency_are_recorded(mcp):
+    before = mcp.get("/metrics/prometheus").text
+    mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                           "params": {"name": "fetch_content", "arguments": {"url": "https://a.example/"}}})
+    text = mcp.get("/metrics/prometheus").text
+    prefix = 'mcp_tool_duration_seconds_count{tool="fetch_content",outcome="ok"}'
+    assert sample(text, prefix) == (sample(before, prefix) if prefix in before else 0) + 1
+    assert 'mcp_http_requests_total{method="POST",path="/mcp",status="200"}' in text
+
+
+@pytest.mark.parametrize("params", [["fetch_content", {"url": "https://a.example/"}], "search"])
+def test_non_object_params_are_invalid_params(mcp, params):
+    message = {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": params}
+    response = mcp.post("/mcp", json=message)
+    assert response.status_code == 200
+    assert response.json()["error"]["code"] == -32602
+
+
+def test_non_object_params_fail_only_their_batch_entry(mcp):
+    batch = [
+        {"jsonrpc": "2.0", "id": 1, "method": "tools/call", "params": ["fetch_content"]},
+        {"jsonrpc": "2.0", "id": 2, "method": "tools/call",
+         "params": {"name": "fetch_content", "arguments": {"url": "https://a.example/"}}},
+        {"jsonrpc": "2.0", "id": 3, "method": "tools/call",
+         "params": {"name": "fetch_content", "arguments": {"url": "https://b.example/"}}},
+        {"jsonrpc": "2.0", "id": 4, "method": "tools/call", "params": {"name": "search", "arguments": []}},
+    ]
+    response = mcp.post("/mcp", json=batch)
+    assert response.status_code == 200
+    by_id = {entry["id"]: entry for entry in response.json()}
+    assert by_id[1]["error"]["code"] == -32602
+    assert by_id[4]["error"]["code"] == -32602
+    assert "result" in by_id[2] and "result" in by_id[3]
@@ -0,0 +1,63 @@
+import asyncio
+import os
+import threading
+
+import pytest
+
+from standalone_mcp_server import ParsePool, ParsePoolSaturated, extract_page_text
+
+pytestmark = pytest.mark.anyio
+
+
+def fail(message):
+    raise ValueError(message)
+
+
+def block(event: threading.Event):
+    event.wait(5)
+    return "done"
+
+
+@pytest.mark.parametrize("kind", ["inline", "thread"])
+async def test_only_successful_parses_count_as_completed(kind):
+    pool = ParsePool(kind=kind, workers=1, max_queue=0)
+    try:
+        assert await pool.run(extract_page_text, "<p>hello</p>") == "hello"
+        with pytest.raises(ValueError):
+            await pool.run(fail, "bad page")
+        stats = pool.stats()
+        assert (stats["completed"], stats["failed"]) == (1, 1)
+    finally:
+        pool.shutdown()
+
+
+async def test_saturated_pool_rejects_fast():
+    pool = ParsePool(kind="thread", workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        jobs = [asyncio.create_task(pool.run(block, release)) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        with pytest.raises(ParsePoolSaturated):
+            await pool.run(block, release)
+        assert pool.stats()["queued"] == 1
+        release.set()
+        assert await asyncio.gather(*jobs) == ["done", "done"]
+        stats = pool.stats()
+        assert (stats["completed"], stats["rejected"], stats["failed"]) == (2, 1, 0)
+    finally:
+        release.set()
+        pool.shutdown()
+
+
+async def test_process_pool_runs_in_workers_and_shuts_down():
+    pool = ParsePool(kind="process", workers=1, max_queue=0)
+    pool.start()
+    try:
+        assert await pool.run(os.getpid) != os.getpid()
+        # run_threaded stays in this process so the function may touch its state
+        assert await pool.run_threaded(os.getpid) == os.getpid()
+    finally:
+        executor = pool._executor
+        pool.shutdown()
+    assert pool._executor is None
+    assert all(not process.is_alive() for process in (executor._processes or {}).values())
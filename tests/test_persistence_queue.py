@@ -0,0 +1,219 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import pytest
+
+import harvester_agent
+from harvester_agent import PersistenceQueue
+
+pytestmark = pytest.mark.anyio
+
+
+def make_queue(**settings) -> PersistenceQueue:
+    queue = PersistenceQueue()
+    queue.put_timeout = 0.05
+    queue.flush_timeout = 1
+    for name, value in settings.items():
+        setattr(queue, name, value)
+    return queue
+
+
+async def test_jobs_run_in_the_background_and_are_flushed():
+    queue = make_queue(worker_count=2)
+    queue.start()
+    done = []
+
+    async def job(i):
+        await asyncio.sleep(0.01)
+        done.append(i)
+
+    for i in range(5):
+        assert await queue.submit(f"job {i}", job, i)
+    assert len(done) < 5
+    await queue.flush_and_stop()
+    assert sorted(done) == list(range(5))
+    assert queue.stats()["processed"] == 5 and queue.stats()["oldest_pending_seconds"] == 0.0
+
+
+async def test_failing_job_is_counted_and_the_worker_survives():
+    queue = make_queue(worker_count=1)
+    queue.start()
+    done = []
+
+    async def boom():
+        raise RuntimeError("sidecar down")
+
+    async def ok():
+        done.append(True)
+
+    await queue.submit("boom", boom)
+    await queue.submit("ok", ok)
+    await queue.flush_and_stop()
+    assert done == [True]
+    assert (queue.failed, queue.processed) == (1, 1)
+
+
+async def test_full_queue_drops_after_put_timeout():
+    queue = make_queue(worker_count=1, max_size=1)
+    queue.start()
+    release = asyncio.Event()
+    await queue.submit("blocker", release.wait)
+    await asyncio.sleep(0)  # the worker takes the blocker
+    assert await queue.submit("fills the queue", release.wait)
+    assert not await queue.submit("dropped", release.wait)
+    assert queue.dropped == 1
+    assert len(queue.enqueued_at) == 1
+    release.set()
+    await queue.flush_and_stop()
+
+
+async def test_cancelled_put_forgets_its_enqueue_time():
+    queue = make_queue(worker_count=1, max_size=1, put_timeout=10)
+    queue.start()
+    release = asyncio.Event()
+    await queue.submit("blocker", release.wait)
+    await asyncio.sleep(0)
+    await queue.submit("fills the queue", release.wait)
+    waiting = asyncio.create_task(queue.submit("waits for space", release.wait))
+    await asyncio.sleep(0.01)
+    waiting.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiting
+    assert len(queue.enqueued_at) == 1
+    release.set()
+    await queue.flush_and_stop()
+
+
+@pytest.mark.parametrize("started", [False, True])
+async def test_inline_failures_are_logged_not_raised(started, caplog):
+    queue = make_queue()
+    if started:
+        # After shutdown jobs run inline again
+        queue.start()
+        await queue.flush_and_stop()
+
+    async def boom():
+        raise RuntimeError("dapr client closed")
+
+    assert not await queue.submit("late write", boom)
+    assert queue.failed == 1
+    assert "late write failed: dapr client closed" in caplog.text
+
+    ran = []
+
+    async def ok():
+        ran.append(True)
+
+    assert await queue.submit("inline", ok)
+    assert ran == [True] and queue.processed == 1
+
+
+class FakeDapr:
+    """The asyncio Dapr client calls the queue makes. Events whose data is
+    in failing are refused by the broker."""
+
+    def __init__(self, failing=()):
+        self.failing = set(failing)
+        self.bulk_states = []
+        self.events = []
+
+    async def save_bulk_state(self, store_name, states):
+        self.bulk_states.append((store_name, {state.key: state.value for state in states}))
+
+    async def publish_event(self, pubsub_name, topic_name, data, data_content_type):
+        if data in self.failing:
+            raise RuntimeError("broker refused the event")
+        self.events.append((topic_name, data))
+
+
+class BulkDapr(FakeDapr):
+    """dapr>=1.18: bulk publish reports failed entries instead of raising"""
+
+    def __init__(self, failing=()):
+        super().__init__(failing)
+        self.bulk_events = []
+
+    async def publish_events(self, pubsub_name, topic_name, data, data_content_type):
+        self.bulk_events.append((topic_name, list(data)))
+        return SimpleNamespace(failed_entries=[
+            SimpleNamespace(entry_id=str(i), error="broker refused the event")
+            for i, event in enumerate(data) if event in self.failing
+        ])
+
+
+@pytest.fixture(autouse=True)
+def state_item(monkeypatch):
+    # The Dapr SDK is optional; stand in for its StateItem
+    monkeypatch.setattr(harvester_agent, "StateItem", SimpleNamespace, raising=False)
+
+
+def event(n):
+    return json.dumps({"n": n})
+
+
+async def run_in_one_batch(queue, *jobs):
+    """Queue the jobs behind a blocker so one worker drains them as one batch"""
+    queue.worker_count = 1
+    queue.start()
+    release = asyncio.Event()
+    await queue.submit("blocker", release.wait)
+    await asyncio.sleep(0)
+    for kind, *args in jobs:
+        assert await getattr(queue, kind)(*args)
+    release.set()
+    await queue.flush_and_stop()
+    assert queue.last_batch_size == len(jobs)
+
+
+async def test_state_writes_to_a_store_are_saved_in_one_call():
+    queue = make_queue()
+    queue.dapr_client = FakeDapr()
+    await run_in_one_batch(queue, ("save_state", "store-a", "k1", "v1"), ("save_state", "store-a", "k2", "v2"),
+                           ("save_state", "store-a", "k1", "v3"), ("save_state", "store-b", "k1", "v4"))
+    assert queue.dapr_client.bulk_states == [("store-a", {"k1": "v3", "k2": "v2"}), ("store-b", {"k1": "v4"})]
+    assert queue.sidecar_calls == 2
+    assert (queue.processed, queue.failed) == (1 + 4, 0)
+
+
+async def test_events_to_a_topic_are_published_in_one_call():
+    queue = make_queue()
+    queue.dapr_client = BulkDapr()
+    await run_in_one_batch(queue, *(("publish", "updates", {"n": n}) for n in range(3)))
+    assert queue.dapr_client.bulk_events == [("updates", [event(0), event(1), event(2)])]
+    assert queue.dapr_client.events == []
+    assert queue.sidecar_calls == 1 and queue.processed == 1 + 3
+
+
+@pytest.mark.parametrize("client", [BulkDapr, FakeDapr])
+async def test_only_refused_events_count_as_failed(client, caplog):
+    queue = make_queue()
+    queue.dapr_client = client(failing={event(1)})
+    await run_in_one_batch(queue, *(("publish", "updates", {"n": n}) for n in range(3)))
+    assert (queue.processed, queue.failed) == (1 + 2, 1)
+    assert "1 of 3 events to topic updates failed: broker refused the event" in caplog.text
+
+
+@pytest.mark.parametrize("client", [BulkDapr, FakeDapr])
+async def test_events_all_refused_count_as_failed(client):
+    queue = make_queue()
+    queue.dapr_client = client(failing={event(n) for n in range(3)})
+    await run_in_one_batch(queue, *(("publish", "updates", {"n": n}) for n in range(3)))
+    assert (queue.processed, queue.failed) == (1, 3)
+
+
+async def test_sdk_without_bulk_publish_is_reported_and_publishes_one_by_one(caplog):
+    queue = make_queue()
+    queue.dapr_client = FakeDapr()
+    await run_in_one_batch(queue, *(("publish", "updates", {"n": n}) for n in range(3)))
+    assert "needs dapr>=1.18" in caplog.text
+    assert queue.dapr_client.events == [("updates", event(n)) for n in range(3)]
+    assert queue.sidecar_calls == 3
+
+
+async def test_bulk_publish_client_is_not_reported(caplog):
+    queue = make_queue()
+    queue.dapr_client = BulkDapr()
+    queue.start()
+    await queue.flush_and_stop()
+    assert "needs dapr>=1.18" not in caplog.text
@@ -0,0 +1,106 @@
+import pytest
+
+import standalone_mcp_server as server
+from conftest import Upstream, web
+from standalone_mcp_server import DuckDuckGoSearcher, PersistentCache, WebContentFetcher
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def cache_path(tmp_path):
+    return str(tmp_path / "cache.sqlite3")
+
+
+@pytest.fixture
+def cache(cache_path):
+    cache = PersistentCache(cache_path)
+    yield cache
+    cache.close()
+
+
+async def test_values_round_trip_and_expire(cache, monkeypatch):
+    await cache.put("search", "gdpr", {"results": [1, 2]}, ttl_seconds=60)
+    value, stored_at, expires_at = await cache.get("search", "gdpr")
+    assert value == {"results": [1, 2]}
+    assert expires_at - stored_at == pytest.approx(60)
+
+    now = server.time.time()
+    monkeypatch.setattr(server.time, "time", lambda: now + 61)
+    assert await cache.get("search", "gdpr") is None
+    assert cache.hits == {"search": 1} and cache.misses == {"search": 1}
+
+
+async def test_least_recently_used_rows_are_evicted_over_the_size_cap(cache, monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr(server.time, "time", lambda: clock[0])
+    blob_size = len(cache._encode({"text": "x" * 50}))
+    cache.max_bytes = blob_size * 3
+    for key in "abc":
+        clock[0] += 1
+        await cache.put("page", key, {"text": "x" * 50}, 3600)
+    clock[0] += 1
+    await cache.get("page", "a")
+    clock[0] += 1
+    await cache.put("page", "d", {"text": "x" * 50}, 3600)
+
+    assert await cache.get("page", "b") is None
+    assert await cache.get("page", "a") is not None
+    assert cache.evictions >= 1
+    assert cache.total_bytes <= cache.max_bytes
+
+
+def test_eviction_scan_uses_an_index(cache):
+    plan = " ".join(row[-1] for row in cache._connect().execute(
+        "EXPLAIN QUERY PLAN SELECT namespace, key, size FROM cache_entries ORDER BY last_access"
+    ))
+    assert "cache_entries_lru" in plan and "TEMP B-TREE" not in plan
+
+
+async def test_stats_count_entries_per_namespace(cache):
+    await cache.put("search", "a", 1, 60)
+    await cache.put("page", "b", 2, 60)
+    await cache.put("page", "c", 3, 60)
+    stats = await cache.stats()
+    assert stats["entries"] == {"search": 1, "page": 2}
+    assert stats["bytes"] > 0
+
+
+async def test_storage_errors_are_misses(tmp_path):
+    cache = PersistentCache(str(tmp_path / "missing" / "cache.sqlite3"))
+    assert await cache.get("search", "a") is None
+    await cache.put("search", "a", 1, 60)
+    assert (await cache.stats())["entries"] is None
+    assert cache.errors == 3
+
+
+async def test_search_results_survive_a_restart(cache_path):
+    upstream = Upstream(web)
+    store = PersistentCache(cache_path)
+    first = await DuckDuckGoSearcher(upstream.client(), store=store).search_results("gdpr", 5)
+    store.close()
+
+    store = PersistentCache(cache_path)
+    restarted = DuckDuckGoSearcher(upstream.client(), store=store)
+    assert await restarted.search_results("GDPR ", 5) == first
+    assert len(upstream.requests) == 1
+    store.close()
+
+
+async def test_warm_loads_recent_entries_into_memory(cache_path):
+    upstream = Upstream(web)
+    store = PersistentCache(cache_path)
+    client = upstream.client()
+    await DuckDuckGoSearcher(client, store=store).search_results("gdpr", 5)
+    await WebContentFetcher(client, store).fetch_content("https://a.example/")
+
+    searcher, fetcher = DuckDuckGoSearcher(client, store=store), WebContentFetcher(client, store)
+    assert (await searcher.warm(), await fetcher.warm()) == (1, 1)
+    assert fetcher.documents.get("https://a.example/") is not None
+    store.close()
+
+
+def test_metrics_endpoint_reports_the_store(mcp, cache, monkeypatch):
+    monkeypatch.setattr(server, "cache_store", cache)
+    stats = mcp.get("/metrics").json()["cache_store"]
+    assert stats["entries"] == {} and stats["errors"] == 0
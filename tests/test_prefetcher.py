@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+from conftest import Upstream, web
+from standalone_mcp_server import DuckDuckGoSearcher, Prefetcher, WebContentFetcher
+
+pytestmark = pytest.mark.anyio
+
+
+def hits(*urls):
+    return [{"link": url} for url in urls]
+
+
+@pytest.fixture
+def prefetch_setup():
+    upstream = Upstream(web)
+    fetcher = WebContentFetcher(upstream.client())
+    prefetcher = Prefetcher(fetcher, top_k=2, max_inflight=4)
+    return fetcher, prefetcher, upstream
+
+
+async def settle(prefetcher):
+    await asyncio.gather(*list(prefetcher.tasks.values()))
+
+
+async def test_top_hits_are_prefetched_and_then_served_from_cache(prefetch_setup):
+    fetcher, prefetcher, upstream = prefetch_setup
+    prefetcher.schedule(hits("https://a.example/", "https://b.example/", "https://c.example/"))
+    await settle(prefetcher)
+    assert prefetcher.counts["completed"] == 2
+    assert [request.url.host for request in upstream.requests] == ["a.example", "b.example"]
+
+    page = await fetcher.fetch_content("https://a.example/")
+    assert "https://a.example/" in page
+    assert len(upstream.requests) == 2
+    assert prefetcher.counts["used"] == 1
+
+
+async def test_fetch_joins_a_prefetch_in_flight(prefetch_setup):
+    fetcher, prefetcher, upstream = prefetch_setup
+    prefetcher.schedule(hits("https://a.example/"))
+    page = await fetcher.fetch_content("https://a.example/")
+    assert "https://a.example/" in page
+    assert len(upstream.requests) == 1
+    assert prefetcher.counts["used"] == 1
+
+
+async def test_cached_failed_and_sponsored_links_are_skipped(prefetch_setup):
+    fetcher, prefetcher, upstream = prefetch_setup
+    await fetcher.fetch_content("https://cached.example/")
+    fetcher.failures.set("https://failed.example/", (0.0, "boom"))
+    prefetcher.top_k = 5
+    prefetcher.schedule(hits("https://cached.example/", "https://failed.example/",
+                             "https://duckduckgo.com/y.js?ad", "javascript:void(0)"))
+    await settle(prefetcher)
+    assert prefetcher.counts["skipped"] == 2
+    assert prefetcher.counts["scheduled"] == 0
+    assert len(upstream.requests) == 1
+
+
+async def test_inflight_limit_drops_extra_prefetches(prefetch_setup):
+    _, prefetcher, _ = prefetch_setup
+    prefetcher.top_k, prefetcher.max_inflight = 5, 2
+    prefetcher.schedule(hits(*(f"https://site{i}.example/" for i in range(5))))
+    assert (prefetcher.counts["scheduled"], prefetcher.counts["dropped"]) == (2, 3)
+    await prefetcher.close()
+
+
+async def test_search_schedules_prefetches():
+    upstream = Upstream(web)
+    client = upstream.client()
+    fetcher = WebContentFetcher(client)
+    prefetcher = Prefetcher(fetcher, top_k=2)
+    searcher = DuckDuckGoSearcher(client, prefetcher)
+    results = await searcher.search_results("gdpr", 5)
+    await settle(prefetcher)
+    # The first hit is a sponsored redirect, so only the second is fetched
+    assert results[0]["link"].startswith("https://duckduckgo.com/")
+    assert fetcher.documents.get(results[1]["link"]) is not None
+    assert prefetcher.counts["completed"] == 1
+    await client.aclose()
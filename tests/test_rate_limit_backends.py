@@ -0,0 +1,102 @@
+import asyncio
+import fcntl
+import os
+
+import pytest
+
+import standalone_mcp_server as server
+from standalone_mcp_server import (
+    RateLimiter,
+    RedisRateLimitBackend,
+    SharedMemoryRateLimitBackend,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+def limiter(name="search", burst=2):
+    return RateLimiter(requests_per_minute=60, burst=burst, name=name)
+
+
+async def test_shm_buckets_are_shared_between_processes(tmp_path):
+    path = str(tmp_path / "buckets")
+    # Separate instances stand in for workers: each opens its own descriptor
+    first = SharedMemoryRateLimitBackend(path, slots=16)
+    second = SharedMemoryRateLimitBackend(path, slots=16)
+
+    assert (await first.reserve([limiter()], 0.0))[2]
+    assert (await second.reserve([limiter()], 0.0))[2]
+    delay, blocking, admitted = await first.reserve([limiter()], 0.0)
+    assert not admitted
+    assert blocking == 0
+    assert 0 < delay <= 1.0
+
+
+async def test_shm_rejection_charges_no_bucket(tmp_path):
+    backend = SharedMemoryRateLimitBackend(str(tmp_path / "buckets"), slots=16)
+    roomy, tight = limiter("global", burst=5), limiter("host:a", burst=1)
+    assert (await backend.reserve([roomy, tight], 0.0))[2]
+    delay, blocking, admitted = await backend.reserve([roomy, tight], 0.0)
+    assert (blocking, admitted) == (1, False)
+    # global was charged once, so four of its five tokens are left
+    results = [(await backend.reserve([limiter("global", burst=5)], 0.0))[2] for _ in range(5)]
+    assert results == [True] * 4 + [False]
+
+
+async def test_shm_lock_contention_does_not_block_the_loop(tmp_path):
+    path = str(tmp_path / "buckets")
+    backend = SharedMemoryRateLimitBackend(path, slots=16)
+    backend._open()
+    holder = os.open(path, os.O_RDWR)
+    fcntl.flock(holder, fcntl.LOCK_EX)
+    try:
+        reserve = asyncio.create_task(backend.reserve([limiter()], 0.0))
+        ticks = 0
+        for _ in range(5):
+            await asyncio.sleep(0.002)
+            ticks += 1
+        assert ticks == 5 and not reserve.done()
+    finally:
+        fcntl.flock(holder, fcntl.LOCK_UN)
+        os.close(holder)
+    assert (await asyncio.wait_for(reserve, 1.0))[2]
+
+
+@pytest.fixture
+def redis_backend(monkeypatch):
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    if not server.REDIS_AVAILABLE:
+        pytest.skip("redis package not installed")
+    client = fakeredis.FakeAsyncRedis()
+    monkeypatch.setattr(server.redis_asyncio, "from_url", lambda url: client)
+    return RedisRateLimitBackend(prefix="test:")
+
+
+async def test_redis_script_enforces_burst(redis_backend):
+    assert (await redis_backend.reserve([limiter()], 0.0))[2]
+    assert (await redis_backend.reserve([limiter()], 0.0))[2]
+    delay, blocking, admitted = await redis_backend.reserve([limiter()], 0.0)
+    assert (blocking, admitted) == (0, False)
+    assert 0 < delay <= 1.0
+    # Within max_delay the request is admitted with the wait it must observe
+    delay, _, admitted = await redis_backend.reserve([limiter()], 5.0)
+    assert admitted and 0 < delay <= 1.0
+
+
+async def test_redis_script_reports_blocking_limiter_and_charges_nothing(redis_backend):
+    roomy, tight = limiter("global", burst=5), limiter("host:a", burst=1)
+    assert (await redis_backend.reserve([roomy, tight], 0.0))[2]
+    tat = float(await redis_backend.client.get("test:global"))
+    _, blocking, admitted = await redis_backend.reserve([roomy, tight], 0.0)
+    assert (blocking, admitted) == (1, False)
+    assert float(await redis_backend.client.get("test:global")) == tat
+    assert await redis_backend.client.pttl("test:host:a") > 0
+
+
+async def test_redis_outage_falls_back_to_local_buckets(redis_backend):
+    async def unavailable(*args, **kwargs):
+        raise ConnectionError("redis down")
+
+    redis_backend.script = unavailable
+    assert (await redis_backend.reserve([limiter(burst=1)], 0.0))[2]
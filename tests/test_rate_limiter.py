@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+import standalone_mcp_server as server
+from standalone_mcp_server import HostRateLimiters, RateLimiter, RateLimitExceeded, admit
+
+pytestmark = pytest.mark.anyio
+
+
+def test_burst_is_admitted_then_paced():
+    limiter = RateLimiter(requests_per_minute=60, burst=3)
+    now = 1000.0
+    for _ in range(3):
+        assert limiter.delay(now) == 0
+        limiter.commit(now)
+    assert limiter.available(now) == 0
+    assert limiter.delay(now) == pytest.approx(1.0)
+    # One token comes back per emission interval
+    assert limiter.available(now + 1.0) == 1
+    assert limiter.delay(now + 1.0) == 0
+
+
+def test_bucket_refills_to_burst_only():
+    limiter = RateLimiter(requests_per_minute=60, burst=2)
+    limiter.commit(1000.0)
+    assert not limiter.idle(1000.0)
+    assert limiter.idle(1001.0)
+    assert limiter.available(5000.0) == 2
+
+
+def test_idle_host_limiters_are_dropped_when_full():
+    limiters = HostRateLimiters(requests_per_minute=60, max_hosts=2)
+    busy = limiters.get("busy.example")
+    busy.commit(time.time() + 60)
+    limiters.get("idle.example")
+    limiters.get("new.example")
+    assert set(limiters.limiters) == {"busy.example", "new.example"}
+    assert limiters.get("busy.example") is busy
+
+
+async def test_reject_mode_reports_retry_after():
+    limiter = RateLimiter(requests_per_minute=60, burst=1, name="search")
+    await admit([limiter], wait=False)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        await admit([limiter], wait=False)
+    assert excinfo.value.limiter == "search"
+    assert 0 < excinfo.value.retry_after <= 1.0
+    assert (limiter.admitted, limiter.rejected) == (1, 1)
+
+
+async def test_rejection_charges_no_limiter():
+    roomy = RateLimiter(requests_per_minute=60, burst=5, name="global")
+    tight = RateLimiter(requests_per_minute=60, burst=1, name="host:a")
+    await admit([roomy, tight], wait=False)
+    with pytest.raises(RateLimitExceeded) as excinfo:
+        await admit([roomy, tight], wait=False)
+    assert excinfo.value.limiter == "host:a"
+    assert roomy.admitted == 1
+    assert roomy.available(time.time()) == 4
+
+
+async def test_wait_mode_sleeps_for_the_next_token():
+    limiter = RateLimiter(requests_per_minute=1200, burst=1)
+    await admit([limiter], wait=True)
+    started = time.monotonic()
+    await admit([limiter], wait=True)
+    assert time.monotonic() - started >= 0.04
+    assert limiter.admitted == 2
+    assert limiter.wait_seconds_total > 0
+
+
+async def test_wait_mode_rejects_beyond_max_wait(monkeypatch):
+    monkeypatch.setattr(server, "RATE_LIMIT_MAX_WAIT_SECONDS", 0.5)
+    limiter = RateLimiter(requests_per_minute=60, burst=1)
+    await admit([limiter], wait=True)
+    with pytest.raises(RateLimitExceeded):
+        await admit([limiter], wait=True)
@@ -0,0 +1,63 @@
+import httpx
+import pytest
+
+from conftest import Upstream
+from standalone_mcp_server import RecordReplayTransport, UpstreamArchive
+
+pytestmark = pytest.mark.anyio
+
+
+def counter_site():
+    count = [0]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if "if-none-match" in request.headers:
+            return httpx.Response(304)
+        count[0] += 1
+        return httpx.Response(200, text=f"visit {count[0]}",
+                              headers={"content-type": "text/plain", "etag": '"e"', "content-length": "7"})
+
+    return handler
+
+
+def client(mode, path, inner=None):
+    transport = RecordReplayTransport(mode, inner, UpstreamArchive(str(path)), latency="0")
+    return httpx.AsyncClient(transport=transport), transport
+
+
+async def test_recorded_sequence_is_replayed_in_order_then_repeats(tmp_path):
+    upstream = Upstream(counter_site())
+    recorder, _ = client("record", tmp_path, httpx.MockTransport(upstream))
+    for _ in range(2):
+        await recorder.get("https://site.example/page")
+
+    replayer, transport = client("replay", tmp_path)
+    texts = [(await replayer.get("https://site.example/page")).text for _ in range(3)]
+    assert texts == ["visit 1", "visit 2", "visit 2"]
+    assert transport.replayed == 3 and len(upstream.requests) == 2
+
+
+async def test_replayed_headers_describe_the_stored_body(tmp_path):
+    recorder, _ = client("record", tmp_path, httpx.MockTransport(counter_site()))
+    await recorder.get("https://site.example/page")
+    replayer, _ = client("replay", tmp_path)
+    response = await replayer.get("https://site.example/page")
+    assert response.headers["etag"] == '"e"'
+    assert response.headers["content-length"] == str(len(b"visit 1"))
+
+
+async def test_conditional_requests_are_archived_separately(tmp_path):
+    recorder, _ = client("record", tmp_path, httpx.MockTransport(counter_site()))
+    await recorder.get("https://site.example/page")
+    await recorder.get("https://site.example/page", headers={"If-None-Match": '"e"'})
+
+    replayer, _ = client("replay", tmp_path)
+    assert (await replayer.get("https://site.example/page")).status_code == 200
+    assert (await replayer.get("https://site.example/page", headers={"If-None-Match": '"e"'})).status_code == 304
+
+
+async def test_unrecorded_request_fails_like_a_dead_host(tmp_path):
+    replayer, transport = client("replay", tmp_path)
+    with pytest.raises(httpx.ConnectError, match="No recorded response"):
+        await replayer.get("https://site.example/never-recorded")
+    assert transport.misses == 1
@@ -0,0 +1,87 @@
+import httpx
+import pytest
+
+from standalone_mcp_server import PersistentCache, RevalidationStore, parse_freshness_rules
+
+pytestmark = pytest.mark.anyio
+
+URL = "https://regulator.example/guidance"
+
+
+@pytest.fixture
+def cache(tmp_path):
+    cache = PersistentCache(str(tmp_path / "cache.sqlite3"))
+    yield cache
+    cache.close()
+
+
+class Site:
+    """Serves one page with an ETag and answers conditional GETs"""
+
+    def __init__(self, text="Original guidance", etag='"v1"'):
+        self.text = text
+        self.etag = etag
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        if request.headers.get("if-none-match") == self.etag:
+            return httpx.Response(304, headers={"etag": self.etag})
+        return httpx.Response(200, text=f"<p>{self.text}</p>",
+                              headers={"content-type": "text/html", "etag": self.etag})
+
+
+def test_freshness_rules_cover_subdomains(cache):
+    store = RevalidationStore(cache, default_freshness=60, rules="example.org=3600, .gov.uk=86400")
+    assert parse_freshness_rules("a.example=5,bogus") == {"a.example": 5.0}
+    assert store.freshness_for("https://www.example.org/x") == 3600
+    assert store.freshness_for("https://ico.gov.uk/") == 86400
+    assert store.freshness_for("https://other.example/") == 60
+
+
+async def test_fresh_stored_page_needs_no_request(cache, make_fetcher):
+    site = Site()
+    fetcher, upstream = make_fetcher(site, cache)
+    assert await fetcher.fetch_content(URL) == "Original guidance"
+
+    # A new fetcher (as after a restart) has an empty document cache
+    restarted, upstream_after_restart = make_fetcher(site, cache)
+    assert await restarted.fetch_content(URL) == "Original guidance"
+    assert len(upstream.requests) == 1 and not upstream_after_restart.requests
+    assert restarted.store.fresh_hits == 1
+
+
+async def test_stale_page_is_revalidated_with_its_etag(cache, make_fetcher):
+    site = Site()
+    fetcher, _ = make_fetcher(site, cache)
+    await fetcher.fetch_content(URL)
+
+    stale, upstream = make_fetcher(site, cache)
+    stale.store.default_freshness = 0
+    assert await stale.fetch_content(URL) == "Original guidance"
+    assert upstream.requests[0].headers["if-none-match"] == '"v1"'
+    assert stale.store.not_modified == 1
+
+
+async def test_changed_page_replaces_the_stored_copy(cache, make_fetcher):
+    site = Site()
+    fetcher, _ = make_fetcher(site, cache)
+    await fetcher.fetch_content(URL)
+
+    site.text, site.etag = "Revised guidance", '"v2"'
+    stale, _ = make_fetcher(site, cache)
+    stale.store.default_freshness = 0
+    assert await stale.fetch_content(URL) == "Revised guidance"
+    assert stale.store.refreshed == 1
+    assert (await stale.store.get(URL))["etag"] == '"v2"'
+
+
+async def test_byte_cap_survives_the_store(cache, make_fetcher):
+    body = "".join(f"<p>Paragraph {i} of a very long page.</p>" for i in range(2000))
+    site = lambda request: httpx.Response(200, text=body, headers={"content-type": "text/html"})
+    fetcher, _ = make_fetcher(site, cache)
+    await fetcher.fetch_content(URL, max_chars=100_000, max_bytes=4096, stream=True)
+
+    restarted, upstream = make_fetcher(site, cache)
+    end = len((await restarted.store.get(URL))["text"])
+    page = await restarted.fetch_content(URL, max_chars=1000, offset=end, max_bytes=4096, stream=True)
+    assert "4096-byte download limit" in page
+    assert not upstream.requests
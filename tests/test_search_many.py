@@ -0,0 +1,87 @@
+import asyncio
+
+import httpx
+import pytest
+
+import standalone_mcp_server as server
+from standalone_mcp_server import DuckDuckGoSearcher, RateLimitExceeded
+
+pytestmark = pytest.mark.anyio
+
+
+def result(position, link):
+    return {"position": position, "title": link, "link": link, "snippet": ""}
+
+
+RESULTS = {
+    "gdpr fines": [result(1, "https://a.example"), result(2, "https://b.example")],
+    "gdpr penalties": [result(1, "https://b.example"), result(2, "https://c.example")],
+    "gdpr enforcement": [result(1, "https://d.example"), result(2, "https://b.example")],
+}
+
+
+@pytest.fixture
+def searcher(monkeypatch):
+    searcher = DuckDuckGoSearcher(httpx.AsyncClient(transport=httpx.MockTransport(lambda r: httpx.Response(500))))
+    searcher.active = searcher.peak = 0
+
+    async def search_results(query, max_results=10, wait=None):
+        searcher.active += 1
+        searcher.peak = max(searcher.peak, searcher.active)
+        await asyncio.sleep(0.01)
+        searcher.active -= 1
+        if query not in RESULTS:
+            raise RateLimitExceeded("search", 2.0)
+        return RESULTS[query][:max_results]
+
+    monkeypatch.setattr(searcher, "search_results", search_results)
+    return searcher
+
+
+async def test_results_are_merged_by_url_and_ranked_by_agreement(searcher):
+    merged = await searcher.search_many(list(RESULTS))
+    links = [entry["link"] for entry in merged["results"]]
+    assert links[0] == "https://b.example"
+    assert merged["results"][0]["positions"] == {"gdpr fines": 2, "gdpr penalties": 1, "gdpr enforcement": 2}
+    # Single-query hits follow, best position first
+    assert set(links[1:3]) == {"https://a.example", "https://d.example"}
+    assert links[3] == "https://c.example"
+    assert merged["errors"] == {}
+
+
+async def test_failed_queries_are_reported_alongside_results(searcher):
+    merged = await searcher.search_many(["gdpr fines", "unknown"])
+    assert [entry["link"] for entry in merged["results"]] == ["https://a.example", "https://b.example"]
+    assert "unknown" in merged["errors"]
+
+
+async def test_all_queries_failing_raises_the_first_error(searcher):
+    with pytest.raises(RateLimitExceeded):
+        await searcher.search_many(["unknown", "also unknown"])
+
+
+async def test_fan_out_is_bounded(searcher):
+    queries = list(RESULTS) * 3
+    await searcher.search_many(queries, max_concurrency=2)
+    assert searcher.peak == 2
+
+
+def test_tool_validates_queries(mcp, monkeypatch):
+    def tool_call(arguments):
+        return mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                      "params": {"name": "search_many", "arguments": arguments}}).json()
+
+    assert "error" in tool_call({"queries": ["", "  "]})
+    monkeypatch.setattr(server, "SEARCH_MANY_MAX_QUERIES", 2)
+    assert "At most 2 queries" in tool_call({"queries": ["a", "b", "c"]})["error"]["message"]
+
+
+def test_tool_returns_structured_merged_results(mcp):
+    response = mcp.post("/mcp", json={"jsonrpc": "2.0", "id": 1, "method": "tools/call",
+                                      "params": {"name": "search_many",
+                                                 "arguments": {"queries": ["gdpr", "gdpr fines"]}}}).json()
+    structured = response["result"]["structuredContent"]
+    assert structured["queries"] == ["gdpr", "gdpr fines"]
+    assert structured["results"]
+    # Both queries hit the same saved page, so every result was found by both
+    assert all(len(entry["positions"]) == 2 for entry in structured["results"])
@@ -0,0 +1,33 @@
+from pathlib import Path
+
+import pytest
+
+import standalone_mcp_server as server
+from standalone_mcp_server import _parse_results_bs4, _parse_results_fast, parse_search_results
+
+FIXTURES = sorted((Path(__file__).resolve().parent.parent / "benchmarks" / "fixtures" / "duckduckgo").glob("*.html"))
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda path: path.name)
+def test_fast_parser_matches_bs4(path):
+    page = path.read_text(encoding="utf-8")
+    assert _parse_results_fast(page, 50) == _parse_results_bs4(page, 50)
+
+
+@pytest.mark.parametrize("max_results", [1, 3])
+def test_max_results_is_respected(max_results):
+    page = FIXTURES[0].read_text(encoding="utf-8")
+    expected = _parse_results_bs4(page, max_results)
+    assert len(expected) == max_results
+    assert _parse_results_fast(page, max_results) == expected
+
+
+def test_parser_can_be_switched_to_bs4(monkeypatch):
+    page = FIXTURES[0].read_text(encoding="utf-8")
+    monkeypatch.setattr(server, "SEARCH_PARSER", "bs4")
+    assert parse_search_results(page, 50) == _parse_results_bs4(page, 50)
+
+
+def test_fixture_corpus_is_present():
+    # An empty glob would turn the parity test into a silent no-op
+    assert FIXTURES
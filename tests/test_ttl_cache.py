@@ -0,0 +1,102 @@
+import asyncio
+
+import pytest
+
+from standalone_mcp_server import TTLCache
+
+pytestmark = pytest.mark.anyio
+
+
+def test_entries_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("standalone_mcp_server.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=4, ttl_seconds=10)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    now[0] += 10
+    assert cache.get("a") is None
+    assert cache.expirations == 1
+
+
+def test_per_entry_ttl_only_shortens(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("standalone_mcp_server.time.monotonic", lambda: now[0])
+    cache = TTLCache(max_entries=4, ttl_seconds=10)
+    cache.set("short", 1, ttl_seconds=2)
+    cache.set("long", 2, ttl_seconds=60)
+    now[0] += 5
+    assert cache.get("short") is None
+    assert cache.get("long") == 2
+    now[0] += 5
+    assert cache.get("long") is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl_seconds=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+async def test_concurrent_loads_are_coalesced():
+    cache = TTLCache()
+    calls = 0
+    release = asyncio.Event()
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return "value"
+
+    waiters = [asyncio.create_task(cache.get_or_load("k", loader)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    assert await asyncio.gather(*waiters) == ["value"] * 5
+    assert calls == 1
+    assert (cache.misses, cache.coalesced) == (1, 4)
+
+    assert await cache.get_or_load("k", loader) == "value"
+    assert calls == 1 and cache.hits == 1
+
+
+async def test_failed_load_is_not_cached():
+    cache = TTLCache()
+    attempts = 0
+
+    async def loader():
+        nonlocal attempts
+        attempts += 1
+        if attempts == 1:
+            raise RuntimeError("upstream down")
+        return "value"
+
+    with pytest.raises(RuntimeError):
+        await cache.get_or_load("k", loader)
+    assert await cache.get_or_load("k", loader) == "value"
+    assert attempts == 2
+
+
+async def test_cancelled_caller_does_not_fail_the_others():
+    cache = TTLCache()
+    release = asyncio.Event()
+
+    async def loader():
+        await release.wait()
+        return "value"
+
+    first = asyncio.create_task(cache.get_or_load("k", loader))
+    await asyncio.sleep(0)
+    second = asyncio.create_task(cache.get_or_load("k", loader))
+    await asyncio.sleep(0)
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    assert await second == "value"
+    assert first.cancelled()
+    assert cache.get("k") == "value"
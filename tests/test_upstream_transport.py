@@ -0,0 +1,103 @@
+import asyncio
+import socket
+
+import httpcore
+import httpx
+import pytest
+
+from standalone_mcp_server import CachingDNSBackend, UpstreamTransport
+
+pytestmark = pytest.mark.anyio
+
+LIMITS = httpx.Limits(max_connections=7, max_keepalive_connections=3, keepalive_expiry=5)
+
+
+def http_response(body: bytes):
+    return [b"HTTP/1.1 200 OK\r\n", b"Content-Type: text/plain\r\n",
+            b"Content-Length: %d\r\n" % len(body), b"\r\n", body]
+
+
+class FailingBackend(httpcore.AsyncMockBackend):
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        raise httpcore.ConnectError(f"refused by {host}")
+
+
+async def test_requests_go_through_the_given_network_backend():
+    transport = UpstreamTransport(httpcore.AsyncMockBackend(http_response(b"hello")), LIMITS, http2=False)
+    async with httpx.AsyncClient(transport=transport) as client:
+        response = await client.get("http://upstream.example/")
+        assert (response.status_code, response.text) == (200, "hello")
+        stats = transport.stats()
+    assert stats["max_connections"] == 7
+    assert stats["connections"] == 1 and stats["idle"] == 1
+    assert stats["utilization"] == 0
+
+
+async def test_streamed_body_is_read_incrementally():
+    body = b"x" * 10_000
+    transport = UpstreamTransport(httpcore.AsyncMockBackend(http_response(body)), LIMITS, http2=False)
+    async with httpx.AsyncClient(transport=transport) as client:
+        async with client.stream("GET", "http://upstream.example/") as response:
+            chunks = [chunk async for chunk in response.aiter_bytes(1024)]
+    assert b"".join(chunks) == body and len(chunks) > 1
+
+
+async def test_httpcore_errors_surface_as_httpx_errors():
+    transport = UpstreamTransport(FailingBackend([]), LIMITS, http2=False)
+    async with httpx.AsyncClient(transport=transport) as client:
+        with pytest.raises(httpx.ConnectError) as excinfo:
+            await client.get("http://upstream.example/")
+    assert excinfo.value.request.url.host == "upstream.example"
+
+
+class RecordingBackend(httpcore.AsyncMockBackend):
+    def __init__(self, refuse=()):
+        super().__init__([])
+        self.refuse = set(refuse)
+        self.connected = []
+
+    async def connect_tcp(self, host, port, timeout=None, local_address=None, socket_options=None):
+        if host in self.refuse:
+            raise httpcore.ConnectError(f"refused by {host}")
+        self.connected.append(host)
+        return await super().connect_tcp(host, port)
+
+
+@pytest.fixture
+async def lookups(monkeypatch):
+    calls = []
+
+    async def getaddrinfo(host, port, type=0):
+        calls.append(host)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.1", port)),
+                (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("10.0.0.2", port))]
+
+    monkeypatch.setattr(asyncio.get_running_loop(), "getaddrinfo", getaddrinfo)
+    return calls
+
+
+async def test_dns_answers_are_cached(lookups):
+    backend = CachingDNSBackend(ttl_seconds=60)
+    backend._backend = RecordingBackend()
+    for _ in range(3):
+        await backend.connect_tcp("upstream.example", 443)
+    assert lookups == ["upstream.example"]
+    assert backend._backend.connected == ["10.0.0.1"] * 3
+    # IP literals skip the resolver
+    await backend.connect_tcp("192.0.2.1", 443)
+    assert lookups == ["upstream.example"]
+
+
+async def test_next_address_is_tried_and_dead_answers_forgotten(lookups):
+    backend = CachingDNSBackend(ttl_seconds=60)
+    backend._backend = RecordingBackend(refuse={"10.0.0.1"})
+    await backend.connect_tcp("upstream.example", 443)
+    assert backend._backend.connected == ["10.0.0.2"]
+
+    backend._backend.refuse.add("10.0.0.2")
+    with pytest.raises(httpcore.ConnectError):
+        await backend.connect_tcp("upstream.example", 443)
+    await asyncio.sleep(0)
+    backend._backend.refuse.clear()
+    await backend.connect_tcp("upstream.example", 443)
+    assert lookups == ["upstream.example", "upstream.example"]